@@ -32,6 +32,7 @@ from bson.max_key import MaxKey
 from bson.min_key import MinKey
 from bson.objectid import ObjectId
 from bson.py3compat import b, binary_type
+from bson.raw_bson import RawBSONDocument
 from bson.son import SON, RE_TYPE
 from bson.timestamp import Timestamp
 from bson.tz_util import utc
@@ -144,8 +145,19 @@ def _get_string(data, position, as_class, tz_aware, uuid_subtype):
     return _get_c_string(data, position, length)
 
 
+def _is_raw_class(as_class):
+    """Is `as_class` :class:`~bson.raw_bson.RawBSONDocument` (or a
+    subclass)?
+    """
+    return isinstance(as_class, type) and issubclass(as_class, RawBSONDocument)
+
+
 def _get_object(data, position, as_class, tz_aware, uuid_subtype):
     obj_size = struct.unpack("<i", data[position:position + 4])[0]
+    if _is_raw_class(as_class):
+        # Embedded documents in a RawBSONDocument stay raw, DBRefs included.
+        return (as_class(data[position:position + obj_size],
+                         tz_aware, uuid_subtype), position + obj_size)
     encoded = data[position + 4:position + obj_size - 1]
     object = _elements_to_dict(encoded, as_class, tz_aware, uuid_subtype)
     position += obj_size
@@ -318,7 +330,12 @@ def _element_to_dict(data, position, as_class, tz_aware, uuid_subtype):
 
 
 def _elements_to_dict(data, as_class, tz_aware, uuid_subtype):
-    result = as_class()
+    if _is_raw_class(as_class):
+        # The top level of a RawBSONDocument is decoded to a SON, so it
+        # keeps the order of the raw bytes.
+        result = SON()
+    else:
+        result = as_class()
     position = 0
     end = len(data) - 1
     while position < end:
@@ -327,13 +344,43 @@ def _elements_to_dict(data, as_class, tz_aware, uuid_subtype):
         result[key] = value
     return result
 
-def _bson_to_dict(data, as_class, tz_aware, uuid_subtype):
+def _get_bytes(data, offset=0, length=None):
+    """Get `length` bytes of `data`, starting at `offset`, as a string.
+
+    `data` can be a string or any object supporting the buffer protocol,
+    and `length` can be ``None`` to get the rest of the data after `offset`.
+    """
+    if isinstance(data, unicode):
+        raise TypeError("BSON data must be a string or an object "
+                        "supporting the buffer protocol")
+    total_size = len(data)
+    if length is None:
+        length = total_size - offset
+    if (offset < 0 or length < 0 or offset > total_size or
+            length > total_size - offset):
+        raise ValueError("offset and length out of range")
+    if (isinstance(data, binary_type) and
+            offset == 0 and length == total_size):
+        return data
+    view = data[offset:offset + length]
+    if hasattr(view, "tobytes"):
+        # memoryview
+        return view.tobytes()
+    return binary_type(view)
+
+
+def _bson_to_dict(data, as_class, tz_aware, uuid_subtype,
+                  offset=0, length=None):
+    data = _get_bytes(data, offset, length)
     obj_size = struct.unpack("<i", data[:4])[0]
     length = len(data)
     if length < obj_size:
         raise InvalidBSON("objsize too large")
     if obj_size != length or data[obj_size - 1:obj_size] != ZERO:
         raise InvalidBSON("bad eoo")
+    if _is_raw_class(as_class):
+        return (as_class(data[:obj_size], tz_aware, uuid_subtype),
+                data[obj_size:])
     elements = data[4:obj_size - 1]
     return (_elements_to_dict(elements, as_class,
                               tz_aware, uuid_subtype), data[obj_size:])
@@ -341,6 +388,23 @@ if _use_c:
     _bson_to_dict = _cbson._bson_to_dict
 
 
+def _raw_to_dict(data, as_class, tz_aware, uuid_subtype):
+    """Decode the top level of a single BSON document to a
+    :class:`~bson.son.SON`.
+
+    Used to inflate a :class:`~bson.raw_bson.RawBSONDocument`.
+    """
+    if len(data) < 5:
+        raise InvalidBSON("not enough data for a BSON document")
+    obj_size = struct.unpack("<i", data[:4])[0]
+    if obj_size != len(data) or data[obj_size - 1:obj_size] != ZERO:
+        raise InvalidBSON("bad eoo")
+    return _elements_to_dict(data[4:obj_size - 1], as_class,
+                             tz_aware, uuid_subtype)
+if _use_c:
+    _raw_to_dict = _cbson._raw_to_dict
+
+
 def _element_to_bson(key, value, check_keys, uuid_subtype):
     if not isinstance(key, basestring):
         raise InvalidDocument("documents must have only string keys, "
@@ -404,6 +468,8 @@ def _element_to_bson(key, value, check_keys, uuid_subtype):
         return BSONSTR + name + length + cstring
     if isinstance(value, dict):
         return BSONOBJ + name + _dict_to_bson(value, check_keys, uuid_subtype, False)
+    if isinstance(value, RawBSONDocument):
+        return BSONOBJ + name + value.raw
     if isinstance(value, (list, tuple)):
         as_dict = SON(zip([str(i) for i in range(len(value))], value))
         return BSONARR + name + _dict_to_bson(as_dict, check_keys, uuid_subtype, False)
@@ -461,21 +527,52 @@ def _element_to_bson(key, value, check_keys, uuid_subtype):
         return BSONMIN + name
     if isinstance(value, MaxKey):
         return BSONMAX + name
+    # Any other mapping is an embedded document.
+    if hasattr(value, "keys"):
+        return BSONOBJ + name + _dict_to_bson(value, check_keys,
+                                              uuid_subtype, False)
 
     raise InvalidDocument("cannot convert value of type %s to bson" %
                           type(value))
 
 
-def _dict_to_bson(dict, check_keys, uuid_subtype, top_level=True):
-    try:
-        elements = []
-        if top_level and "_id" in dict:
-            elements.append(_element_to_bson("_id", dict["_id"], False, uuid_subtype))
-        for (key, value) in dict.iteritems():
-            if not top_level or key != "_id":
-                elements.append(_element_to_bson(key, value, check_keys, uuid_subtype))
-    except AttributeError:
-        raise TypeError("encoder expected a mapping type but got: %r" % dict)
+def _document_items(doc):
+    """Get the ``(key, value)`` pairs of `doc`, a mapping or a list or
+    tuple of pairs.
+    """
+    if isinstance(doc, (list, tuple)):
+        for pair in doc:
+            if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+                raise TypeError("encoder expected (key, value) pairs "
+                                "but got: %r" % (pair,))
+        return doc
+    if hasattr(doc, "iteritems"):
+        return list(doc.iteritems())
+    if hasattr(doc, "keys"):
+        return [(key, doc[key]) for key in doc.keys()]
+    raise TypeError("encoder expected a mapping type but got: %r" % (doc,))
+
+
+def _dict_to_bson(doc, check_keys, uuid_subtype, top_level=True):
+    if isinstance(doc, RawBSONDocument):
+        # Already encoded.
+        return doc.raw
+    elements = []
+    if isinstance(doc, dict):
+        if top_level and "_id" in doc:
+            elements.append(_element_to_bson("_id", doc["_id"], False, uuid_subtype))
+        items = doc.iteritems()
+    else:
+        items = _document_items(doc)
+        if top_level:
+            for key, value in items:
+                if key == "_id":
+                    elements.append(_element_to_bson("_id", value, False,
+                                                     uuid_subtype))
+                    break
+    for (key, value) in items:
+        if not top_level or key != "_id":
+            elements.append(_element_to_bson(key, value, check_keys, uuid_subtype))
 
     encoded = EMPTY.join(elements)
     length = len(encoded) + 5
@@ -486,39 +583,129 @@ if _use_c:
 
 
 def decode_all(data, as_class=dict,
-               tz_aware=True, uuid_subtype=OLD_UUID_SUBTYPE):
+               tz_aware=True, uuid_subtype=OLD_UUID_SUBTYPE,
+               offset=0, length=None):
     """Decode BSON data to multiple documents.
 
     `data` must be a string of concatenated, valid, BSON-encoded
-    documents.
+    documents, or any object supporting the buffer protocol (like
+    :class:`bytearray` or :class:`memoryview`) containing them. With the C
+    extension, the documents are decoded in place, without copying `data`.
 
     :Parameters:
       - `data`: BSON data
       - `as_class` (optional): the class to use for the resulting
-        documents
+        documents. Pass :class:`~bson.raw_bson.RawBSONDocument` to defer
+        decoding each document until it is accessed.
       - `tz_aware` (optional): if ``True``, return timezone-aware
         :class:`~datetime.datetime` instances
-
+      - `offset` (optional): where the documents start in `data`
+      - `length` (optional): the number of bytes of documents in `data`,
+        or ``None`` for all the data after `offset`
+
+    .. versionchanged:: 2.5+
+       Added support for :class:`~bson.raw_bson.RawBSONDocument`, for
+       objects supporting the buffer protocol, and the `offset` and
+       `length` parameters.
     .. versionadded:: 1.9
     """
+    data = _get_bytes(data, offset, length)
     docs = []
     position = 0
     end = len(data) - 1
+    raw = _is_raw_class(as_class)
     while position < end:
         obj_size = struct.unpack("<i", data[position:position + 4])[0]
         if len(data) - position < obj_size:
             raise InvalidBSON("objsize too large")
         if data[position + obj_size - 1:position + obj_size] != ZERO:
             raise InvalidBSON("bad eoo")
-        elements = data[position + 4:position + obj_size - 1]
+        if raw:
+            docs.append(as_class(data[position:position + obj_size],
+                                 tz_aware, uuid_subtype))
+        else:
+            elements = data[position + 4:position + obj_size - 1]
+            docs.append(_elements_to_dict(elements, as_class,
+                                          tz_aware, uuid_subtype))
         position += obj_size
-        docs.append(_elements_to_dict(elements, as_class,
-                                      tz_aware, uuid_subtype))
     return docs
 if _use_c:
     decode_all = _cbson.decode_all
 
 
+def decode_iter(data, as_class=dict,
+                tz_aware=True, uuid_subtype=OLD_UUID_SUBTYPE,
+                offset=0, length=None):
+    """Decode BSON data to multiple documents as a generator.
+
+    Works like :func:`decode_all`, but yields one document at a time
+    instead of building a list, so the decoded documents don't all have to
+    be held in memory at once.
+
+    `data` must be a string of concatenated, valid, BSON-encoded
+    documents, or any object supporting the buffer protocol containing
+    them.
+
+    :Parameters:
+      - `data`: BSON data
+      - `as_class` (optional): the class to use for the resulting
+        documents
+      - `tz_aware` (optional): if ``True``, return timezone-aware
+        :class:`~datetime.datetime` instances
+      - `offset` (optional): where the documents start in `data`
+      - `length` (optional): the number of bytes of documents in `data`,
+        or ``None`` for all the data after `offset`
+
+    .. versionadded:: 2.5+
+    """
+    if length is None:
+        end = len(data)
+    else:
+        end = offset + length
+    position = offset
+    while position < end:
+        if end - position < 5:
+            raise InvalidBSON("not enough data for a BSON document")
+        obj_size = struct.unpack("<i", _get_bytes(data, position, 4))[0]
+        if obj_size < 5 or obj_size > end - position:
+            raise InvalidBSON("invalid object size")
+        yield _bson_to_dict(data, as_class, tz_aware, uuid_subtype,
+                            position, obj_size)[0]
+        position += obj_size
+
+
+def decode_file_iter(file_obj, as_class=dict,
+                     tz_aware=True, uuid_subtype=OLD_UUID_SUBTYPE):
+    """Decode BSON data from a file to multiple documents as a generator.
+
+    Works like :func:`decode_iter`, but reads the documents from a
+    file-like object (anything with a `read` method), one document at a
+    time.
+
+    :Parameters:
+      - `file_obj`: a file-like object containing concatenated, valid,
+        BSON-encoded documents
+      - `as_class` (optional): the class to use for the resulting
+        documents
+      - `tz_aware` (optional): if ``True``, return timezone-aware
+        :class:`~datetime.datetime` instances
+
+    .. versionadded:: 2.5+
+    """
+    while True:
+        size_data = file_obj.read(4)
+        if not size_data:
+            # End of the file.
+            break
+        if len(size_data) != 4:
+            raise InvalidBSON("cut off in middle of objsize")
+        obj_size = struct.unpack("<i", size_data)[0]
+        if obj_size < 5:
+            raise InvalidBSON("invalid object size")
+        elements = size_data + file_obj.read(obj_size - 4)
+        yield _bson_to_dict(elements, as_class, tz_aware, uuid_subtype)[0]
+
+
 def is_valid(bson):
     """Check that the given string represents valid :class:`BSON` data.
 
@@ -548,9 +735,12 @@ class BSON(binary_type):
     def encode(cls, document, check_keys=False, uuid_subtype=OLD_UUID_SUBTYPE):
         """Encode a document to a new :class:`BSON` instance.
 
-        A document can be any mapping type (like :class:`dict`).
+        A document can be any mapping type (like :class:`dict`), or a
+        list or tuple of ``(key, value)`` pairs. Mappings other than
+        :class:`dict` need a ``keys()`` method and ``__getitem__``.
 
-        Raises :class:`TypeError` if `document` is not a mapping type,
+        Raises :class:`TypeError` if `document` is not a mapping type
+        or a sequence of pairs,
         or contains keys that are not instances of
         :class:`basestring` (:class:`str` in python 3). Raises
         :class:`~bson.errors.InvalidDocument` if `document` cannot be
@@ -562,6 +752,10 @@ class BSON(binary_type):
             contain '.', raising :class:`~bson.errors.InvalidDocument` in
             either case
 
+        .. versionchanged:: 2.5+
+           `document` can be any mapping with ``keys()`` and
+           ``__getitem__``, or a sequence of ``(key, value)`` pairs, and
+           such mappings can be embedded in documents.
         .. versionadded:: 1.9
         """
         return cls(_dict_to_bson(document, check_keys, uuid_subtype))
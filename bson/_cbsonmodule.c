@@ -23,6 +23,15 @@
 #include "Python.h"
 #include "datetime.h"
 
+#include <time.h>
+#if defined(WIN32) || defined(_MSC_VER)
+#include <process.h>
+#define getpid _getpid
+#else
+#include <pthread.h>
+#include <unistd.h>
+#endif
+
 #include "buffer.h"
 #include "time64.h"
 #include "encoding_helpers.h"
@@ -41,6 +50,8 @@ struct module_state {
     PyObject* Binary;
     PyObject* Code;
     PyObject* ObjectId;
+    /* The descriptor of ObjectId's __id slot, or NULL. */
+    PyObject* ObjectIdSlot;
     PyObject* DBRef;
     PyObject* RECompile;
     PyObject* UUID;
@@ -49,6 +60,8 @@ struct module_state {
     PyObject* MaxKey;
     PyObject* UTC;
     PyTypeObject* REType;
+    PyObject* RawBSONDocument;
+    PyObject* SON;
 };
 
 #if PY_MAJOR_VERSION >= 3
@@ -106,6 +119,13 @@ static struct module_state _state;
 #define JAVA_LEGACY   5
 #define CSHARP_LEGACY 6
 
+/* ObjectId generation state, shared by every thread in the process. It is
+ * only used with the GIL held, so the counter needs no lock. */
+static char _oid_machine[3];
+static unsigned long _oid_pid;
+static unsigned long _oid_inc;
+static int _oid_initialized = 0;
+
 
 static PyObject* elements_to_dict(PyObject* self, const char* string, int max,
                                   PyObject* as_class, unsigned char tz_aware,
@@ -257,6 +277,83 @@ static PyObject* _error(char* name) {
     return error;
 }
 
+/* Refresh the cached pid, e.g. in a child process after a fork. */
+static void _oid_reset_pid(void) {
+    _oid_pid = (unsigned long)getpid() % 0xFFFF;
+}
+
+/* Create an ObjectId from its 12 bytes.
+ *
+ * Sets the ObjectId's __id slot directly rather than calling
+ * ObjectId.__init__, which would validate the bytes again.
+ *
+ * Returns a new reference or NULL on failure. */
+static PyObject* _new_object_id(struct module_state* state,
+                                const char* bytes) {
+    PyTypeObject* type = (PyTypeObject*)state->ObjectId;
+    PyObject* args;
+    PyObject* oid;
+    PyObject* binary;
+
+    if (!state->ObjectIdSlot) {
+#if PY_MAJOR_VERSION >= 3
+        return PyObject_CallFunction(state->ObjectId, "y#", bytes, 12);
+#else
+        return PyObject_CallFunction(state->ObjectId, "s#", bytes, 12);
+#endif
+    }
+    args = PyTuple_New(0);
+    if (!args) {
+        return NULL;
+    }
+    oid = type->tp_new(type, args, NULL);
+    Py_DECREF(args);
+    if (!oid) {
+        return NULL;
+    }
+#if PY_MAJOR_VERSION >= 3
+    binary = PyBytes_FromStringAndSize(bytes, 12);
+#else
+    binary = PyString_FromStringAndSize(bytes, 12);
+#endif
+    if (!binary) {
+        Py_DECREF(oid);
+        return NULL;
+    }
+    if (Py_TYPE(state->ObjectIdSlot)->tp_descr_set(state->ObjectIdSlot,
+                                                    oid, binary) < 0) {
+        Py_DECREF(binary);
+        Py_DECREF(oid);
+        return NULL;
+    }
+    Py_DECREF(binary);
+    return oid;
+}
+
+/* Reserve `count` consecutive counter values, returning the first. */
+static unsigned long _reserve_oid_inc(unsigned long count) {
+    unsigned long inc = _oid_inc;
+
+    _oid_inc = (_oid_inc + count) % 0xFFFFFF;
+    return inc;
+}
+
+/* Write the 12 bytes of an ObjectId with counter value `inc` to `oid`. */
+static void _generate_object_id(char* oid, unsigned long timestamp,
+                                unsigned long inc) {
+    inc %= 0xFFFFFF;
+    oid[0] = (char)(timestamp >> 24);
+    oid[1] = (char)(timestamp >> 16);
+    oid[2] = (char)(timestamp >> 8);
+    oid[3] = (char)timestamp;
+    memcpy(oid + 4, _oid_machine, 3);
+    oid[7] = (char)(_oid_pid >> 8);
+    oid[8] = (char)_oid_pid;
+    oid[9] = (char)(inc >> 16);
+    oid[10] = (char)(inc >> 8);
+    oid[11] = (char)inc;
+}
+
 /* Reload a cached Python object.
  *
  * Returns non-zero on failure. */
@@ -288,9 +385,21 @@ static int _reload_python_objects(PyObject* module) {
         _reload_object(&state->MinKey, "bson.min_key", "MinKey") ||
         _reload_object(&state->MaxKey, "bson.max_key", "MaxKey") ||
         _reload_object(&state->UTC, "bson.tz_util", "utc") ||
+        _reload_object(&state->RawBSONDocument, "bson.raw_bson", "RawBSONDocument") ||
+        _reload_object(&state->SON, "bson.son", "SON") ||
         _reload_object(&state->RECompile, "re", "compile")) {
         return 1;
     }
+    /* Use the slot holding an ObjectId's bytes directly, if it's a slot. */
+    Py_XDECREF(state->ObjectIdSlot);
+    state->ObjectIdSlot = PyObject_GetAttrString(state->ObjectId,
+                                                 "_ObjectId__id");
+    if (!state->ObjectIdSlot) {
+        PyErr_Clear();
+    } else if (!Py_TYPE(state->ObjectIdSlot)->tp_descr_get ||
+               !Py_TYPE(state->ObjectIdSlot)->tp_descr_set) {
+        Py_CLEAR(state->ObjectIdSlot);
+    }
     /* If we couldn't import uuid then we must be on 2.4. Just ignore. */
     if (_reload_object(&state->UUID, "uuid", "UUID") == 1) {
         state->UUID = NULL;
@@ -306,6 +415,59 @@ static int _reload_python_objects(PyObject* module) {
     return 0;
 }
 
+/* Is `as_class` RawBSONDocument, or a subclass of it? */
+static int _is_raw_class(struct module_state* state, PyObject* as_class) {
+    return (PyType_Check(as_class) &&
+            PyType_IsSubtype((PyTypeObject*)as_class,
+                             (PyTypeObject*)state->RawBSONDocument));
+}
+
+/* Create an instance of the RawBSONDocument class `as_class` holding a copy
+ * of `size` bytes of BSON at `string`.
+ *
+ * Returns a new reference or NULL on failure. */
+static PyObject* _raw_document(PyObject* as_class, const char* string,
+                               int size, unsigned char tz_aware,
+                               unsigned char uuid_subtype) {
+#if PY_MAJOR_VERSION >= 3
+    return PyObject_CallFunction(as_class, "y#bb", string, size,
+                                 tz_aware, uuid_subtype);
+#else
+    return PyObject_CallFunction(as_class, "s#bb", string, size,
+                                 tz_aware, uuid_subtype);
+#endif
+}
+
+/* Copy the bytes of a RawBSONDocument to the buffer.
+ *
+ * Returns 0 on failure */
+static int write_raw_document(buffer_t buffer, PyObject* raw_doc) {
+    int result;
+    PyObject* raw = PyObject_GetAttrString(raw_doc, "raw");
+    if (!raw) {
+        return 0;
+    }
+#if PY_MAJOR_VERSION >= 3
+    if (!PyBytes_Check(raw)) {
+#else
+    if (!PyString_Check(raw)) {
+#endif
+        PyErr_SetString(PyExc_TypeError,
+                        "RawBSONDocument.raw must be a string");
+        Py_DECREF(raw);
+        return 0;
+    }
+#if PY_MAJOR_VERSION >= 3
+    result = buffer_write_bytes(buffer, PyBytes_AsString(raw),
+                                (int)PyBytes_Size(raw));
+#else
+    result = buffer_write_bytes(buffer, PyString_AsString(raw),
+                                (int)PyString_Size(raw));
+#endif
+    Py_DECREF(raw);
+    return result;
+}
+
 static int write_element_to_buffer(PyObject* self, buffer_t buffer, int type_byte,
                                    PyObject* value, unsigned char check_keys,
                                    unsigned char uuid_subtype,
@@ -396,6 +558,10 @@ static int _write_element_to_buffer(PyObject* self, buffer_t buffer, int type_by
     } else if (PyDict_Check(value)) {
         *(buffer_get_buffer(buffer) + type_byte) = 0x03;
         return write_dict(self, buffer, value, check_keys, uuid_subtype, 0);
+    } else if (PyObject_TypeCheck(value,
+                                  (PyTypeObject*)state->RawBSONDocument)) {
+        *(buffer_get_buffer(buffer) + type_byte) = 0x03;
+        return write_raw_document(buffer, value);
     } else if (PyList_Check(value) || PyTuple_Check(value)) {
         int start_position,
             length_location,
@@ -671,7 +837,13 @@ static int _write_element_to_buffer(PyObject* self, buffer_t buffer, int type_by
         *(buffer_get_buffer(buffer) + type_byte) = 0x09;
         return buffer_write_bytes(buffer, (const char*)&millis, 8);
     } else if (PyObject_IsInstance(value, state->ObjectId)) {
-        PyObject* pystring = PyObject_GetAttrString(value, "_ObjectId__id");
+        PyObject* pystring;
+        if (state->ObjectIdSlot) {
+            pystring = Py_TYPE(state->ObjectIdSlot)->tp_descr_get(
+                state->ObjectIdSlot, value, (PyObject*)Py_TYPE(value));
+        } else {
+            pystring = PyObject_GetAttrString(value, "_ObjectId__id");
+        }
         if (!pystring) {
             return 0;
         }
@@ -846,6 +1018,10 @@ static int _write_element_to_buffer(PyObject* self, buffer_t buffer, int type_by
     } else if (PyObject_IsInstance(value, state->MaxKey)) {
         *(buffer_get_buffer(buffer) + type_byte) = 0x7F;
         return 1;
+    } else if (PyObject_HasAttrString(value, "keys")) {
+        /* Any other mapping is an embedded document. */
+        *(buffer_get_buffer(buffer) + type_byte) = 0x03;
+        return write_dict(self, buffer, value, check_keys, uuid_subtype, 0);
     } else if (first_attempt) {
         /* Try reloading the modules and having one more go at it. */
         if (WARN(PyExc_RuntimeWarning, "couldn't encode - reloading python "
@@ -1032,16 +1208,284 @@ int decode_and_write_pair(PyObject* self, buffer_t buffer,
     return 1;
 }
 
+/* Get a new list of the keys of a SON in order, reading them from the
+ * SON's key order directly instead of through its Python __iter__.
+ *
+ * Returns NULL, without an exception set, if the order can't be read
+ * this way; then the SON should be iterated. Python 3's OrderedDict
+ * iterates in C already. */
+static PyObject* _son_keys(PyObject* son) {
+#if PY_MAJOR_VERSION >= 3
+    return NULL;
+#else
+    PyObject* keys;
+    PyObject* root;
+    PyObject* link;
+    Py_ssize_t size = PyDict_Size(son);
+
+    /* Python < 2.7: SON's own _OrderedDict keeps a list of keys. */
+    keys = PyObject_GetAttrString(son, "_OrderedDict__keys");
+    if (keys) {
+        if (PyList_Check(keys) && PyList_GET_SIZE(keys) == size) {
+            PyObject* copy = PyList_GetSlice(keys, 0, size);
+            Py_DECREF(keys);
+            return copy;
+        }
+        Py_DECREF(keys);
+        return NULL;
+    }
+    PyErr_Clear();
+
+    /* Python 2.7's OrderedDict keeps a circular doubly linked list of
+     * [PREV, NEXT, KEY] lists. */
+    root = PyObject_GetAttrString(son, "_OrderedDict__root");
+    if (!root) {
+        PyErr_Clear();
+        return NULL;
+    }
+    keys = PyList_New(0);
+    if (!keys) {
+        Py_DECREF(root);
+        PyErr_Clear();
+        return NULL;
+    }
+    link = root;
+    while (1) {
+        if (!PyList_Check(link) || PyList_GET_SIZE(link) != 3) {
+            goto unknown;
+        }
+        link = PyList_GET_ITEM(link, 1);
+        if (link == root) {
+            break;
+        }
+        if (PyList_GET_SIZE(keys) >= size ||
+            !PyList_Check(link) || PyList_GET_SIZE(link) != 3 ||
+            PyList_Append(keys, PyList_GET_ITEM(link, 2)) < 0) {
+            goto unknown;
+        }
+    }
+    Py_DECREF(root);
+    if (PyList_GET_SIZE(keys) != size) {
+        Py_DECREF(keys);
+        return NULL;
+    }
+    return keys;
+
+unknown:
+    Py_DECREF(root);
+    Py_DECREF(keys);
+    PyErr_Clear();
+    return NULL;
+#endif
+}
+
+/* Write the null byte ending a document and fill in its length.
+ * Returns 0 on failure. */
+static int write_document_end(buffer_t buffer, int length_location) {
+    char zero = 0;
+    int length;
+
+    if (!buffer_write_bytes(buffer, &zero, 1)) {
+        return 0;
+    }
+    length = buffer_get_position(buffer) - length_location;
+    memcpy(buffer_get_buffer(buffer) + length_location, &length, 4);
+    return 1;
+}
+
+/* Is `key` the string "_id"? Returns -1 on failure. */
+static int _is_id_key(PyObject* key) {
+    int result;
+#if PY_MAJOR_VERSION >= 3
+    PyObject* id_name = PyUnicode_FromString("_id");
+#else
+    PyObject* id_name = PyString_FromString("_id");
+#endif
+    if (!id_name) {
+        return -1;
+    }
+    result = PyObject_RichCompareBool(key, id_name, Py_EQ);
+    Py_DECREF(id_name);
+    return result;
+}
+
+/* Write a document given as a list of (key, value) pairs.
+ * Returns 0 on failure. */
+static int write_pairs(PyObject* self, buffer_t buffer, PyObject* pairs,
+                       unsigned char check_keys, unsigned char uuid_subtype,
+                       unsigned char top_level) {
+    Py_ssize_t size = PySequence_Fast_GET_SIZE(pairs);
+    Py_ssize_t i;
+    int length_location;
+
+    for (i = 0; i < size; i++) {
+        PyObject* pair = PySequence_Fast_GET_ITEM(pairs, i);
+        if (!(PyTuple_Check(pair) || PyList_Check(pair)) ||
+            PySequence_Fast_GET_SIZE(pair) != 2) {
+            PyObject* repr = PyObject_Repr(pair);
+            if (repr) {
+#if PY_MAJOR_VERSION >= 3
+                PyErr_Format(PyExc_TypeError,
+                             "encoder expected (key, value) pairs but got: %U",
+                             repr);
+#else
+                PyErr_Format(PyExc_TypeError,
+                             "encoder expected (key, value) pairs but got: %s",
+                             PyString_AsString(repr));
+#endif
+                Py_DECREF(repr);
+            }
+            return 0;
+        }
+    }
+
+    length_location = buffer_save_space(buffer, 4);
+    if (length_location == -1) {
+        PyErr_NoMemory();
+        return 0;
+    }
+
+    /* Write _id first if this is a top level doc. */
+    if (top_level) {
+        for (i = 0; i < size; i++) {
+            PyObject* pair = PySequence_Fast_GET_ITEM(pairs, i);
+            int is_id = _is_id_key(PySequence_Fast_GET_ITEM(pair, 0));
+            if (is_id == -1) {
+                return 0;
+            }
+            if (is_id) {
+                if (!write_pair(self, buffer, "_id", 3,
+                                PySequence_Fast_GET_ITEM(pair, 1),
+                                0, uuid_subtype, 1)) {
+                    return 0;
+                }
+                break;
+            }
+        }
+    }
+
+    for (i = 0; i < size; i++) {
+        PyObject* pair = PySequence_Fast_GET_ITEM(pairs, i);
+        if (!decode_and_write_pair(self, buffer,
+                                   PySequence_Fast_GET_ITEM(pair, 0),
+                                   PySequence_Fast_GET_ITEM(pair, 1),
+                                   check_keys, uuid_subtype, top_level)) {
+            return 0;
+        }
+    }
+    return write_document_end(buffer, length_location);
+}
+
+/* Write a mapping other than a dict, using its keys() and __getitem__.
+ * Returns 0 on failure. */
+static int write_mapping(PyObject* self, buffer_t buffer, PyObject* mapping,
+                         unsigned char check_keys, unsigned char uuid_subtype,
+                         unsigned char top_level) {
+    PyObject* keys;
+    PyObject* key_list;
+    Py_ssize_t size;
+    Py_ssize_t i;
+    int length_location;
+
+    keys = PyObject_CallMethod(mapping, "keys", NULL);
+    if (!keys) {
+        return 0;
+    }
+    key_list = PySequence_Fast(keys, "keys() must return an iterable");
+    Py_DECREF(keys);
+    if (!key_list) {
+        return 0;
+    }
+    size = PySequence_Fast_GET_SIZE(key_list);
+
+    length_location = buffer_save_space(buffer, 4);
+    if (length_location == -1) {
+        Py_DECREF(key_list);
+        PyErr_NoMemory();
+        return 0;
+    }
+
+    /* Write _id first if this is a top level doc. */
+    if (top_level) {
+        for (i = 0; i < size; i++) {
+            PyObject* key = PySequence_Fast_GET_ITEM(key_list, i);
+            int is_id = _is_id_key(key);
+            if (is_id == -1) {
+                Py_DECREF(key_list);
+                return 0;
+            }
+            if (is_id) {
+                PyObject* value = PyObject_GetItem(mapping, key);
+                int written;
+                if (!value) {
+                    Py_DECREF(key_list);
+                    return 0;
+                }
+                written = write_pair(self, buffer, "_id", 3, value,
+                                     0, uuid_subtype, 1);
+                Py_DECREF(value);
+                if (!written) {
+                    Py_DECREF(key_list);
+                    return 0;
+                }
+                break;
+            }
+        }
+    }
+
+    for (i = 0; i < size; i++) {
+        PyObject* key = PySequence_Fast_GET_ITEM(key_list, i);
+        PyObject* value;
+        int written;
+
+        value = PyObject_GetItem(mapping, key);
+        if (!value) {
+            Py_DECREF(key_list);
+            return 0;
+        }
+        written = decode_and_write_pair(self, buffer, key, value,
+                                        check_keys, uuid_subtype, top_level);
+        Py_DECREF(value);
+        if (!written) {
+            Py_DECREF(key_list);
+            return 0;
+        }
+    }
+    Py_DECREF(key_list);
+    return write_document_end(buffer, length_location);
+}
+
 /* returns 0 on failure */
 int write_dict(PyObject* self, buffer_t buffer, PyObject* dict,
                unsigned char check_keys, unsigned char uuid_subtype, unsigned char top_level) {
     PyObject* key;
     PyObject* iter;
-    char zero = 0;
-    int length;
     int length_location;
 
     if (!PyDict_Check(dict)) {
+        /* A RawBSONDocument is already encoded - copy its bytes as is. */
+        struct module_state *state = GETSTATE(self);
+        if (PyObject_TypeCheck(dict, (PyTypeObject*)state->RawBSONDocument)) {
+            return write_raw_document(buffer, dict);
+        }
+        /* A list or tuple of (key, value) pairs. */
+        if (PyList_Check(dict) || PyTuple_Check(dict)) {
+            int written;
+            PyObject* pairs = PySequence_Fast(dict, "expected a sequence");
+            if (!pairs) {
+                return 0;
+            }
+            written = write_pairs(self, buffer, pairs, check_keys,
+                                  uuid_subtype, top_level);
+            Py_DECREF(pairs);
+            return written;
+        }
+        /* Any other mapping, through its keys() and __getitem__. */
+        if (PyObject_HasAttrString(dict, "keys")) {
+            return write_mapping(self, buffer, dict, check_keys,
+                                 uuid_subtype, top_level);
+        }
+
         PyObject* repr = PyObject_Repr(dict);
 #if PY_MAJOR_VERSION >= 3
         PyObject* errmsg = PyUnicode_FromString("encoder expected a mapping type but got: ");
@@ -1076,7 +1520,40 @@ int write_dict(PyObject* self, buffer_t buffer, PyObject* dict,
         }
     }
 
-    iter = PyObject_GetIter(dict);
+    if (PyDict_CheckExact(dict)) {
+        /* A plain dict: walk its entries without an iterator or lookups. */
+        PyObject* value;
+        Py_ssize_t pos = 0;
+        while (PyDict_Next(dict, &pos, &key, &value)) {
+            int written;
+            /* Keep the pair alive in case encoding it changes the dict. */
+            Py_INCREF(key);
+            Py_INCREF(value);
+            written = decode_and_write_pair(self, buffer, key, value,
+                                            check_keys, uuid_subtype,
+                                            top_level);
+            Py_DECREF(key);
+            Py_DECREF(value);
+            if (!written) {
+                return 0;
+            }
+        }
+        return write_document_end(buffer, length_location);
+    }
+
+    /* Iterate over dict subclasses like SON, which define the order of
+     * their keys. Their values are stored in the dict itself. */
+    if (Py_TYPE(dict) == (PyTypeObject*)GETSTATE(self)->SON) {
+        PyObject* keys = _son_keys(dict);
+        if (keys) {
+            iter = PyObject_GetIter(keys);
+            Py_DECREF(keys);
+        } else {
+            iter = PyObject_GetIter(dict);
+        }
+    } else {
+        iter = PyObject_GetIter(dict);
+    }
     if (iter == NULL) {
         return 0;
     }
@@ -1097,14 +1574,10 @@ int write_dict(PyObject* self, buffer_t buffer, PyObject* dict,
         Py_DECREF(key);
     }
     Py_DECREF(iter);
-
-    /* write null byte and fill in length */
-    if (!buffer_write_bytes(buffer, &zero, 1)) {
+    if (PyErr_Occurred()) {
         return 0;
     }
-    length = buffer_get_position(buffer) - length_location;
-    memcpy(buffer_get_buffer(buffer) + length_location, &length, 4);
-    return 1;
+    return write_document_end(buffer, length_location);
 }
 
 static PyObject* _cbson_dict_to_bson(PyObject* self, PyObject* args) {
@@ -1187,6 +1660,17 @@ static PyObject* get_value(PyObject* self, const char* buffer, int* position,
             if (max < size) {
                 goto invalid;
             }
+            /* Embedded documents in a RawBSONDocument stay raw, DBRefs
+             * included. */
+            if (_is_raw_class(state, as_class)) {
+                value = _raw_document(as_class, buffer + *position, size,
+                                      tz_aware, uuid_subtype);
+                if (!value) {
+                    return NULL;
+                }
+                *position += size;
+                break;
+            }
             value = elements_to_dict(self, buffer + *position + 4,
                                      size - 5, as_class, tz_aware, uuid_subtype);
             if (!value) {
@@ -1373,11 +1857,7 @@ static PyObject* get_value(PyObject* self, const char* buffer, int* position,
             if (max < 12) {
                 goto invalid;
             }
-#if PY_MAJOR_VERSION >= 3
-            value = PyObject_CallFunction(state->ObjectId, "y#", buffer + *position, 12);
-#else
-            value = PyObject_CallFunction(state->ObjectId, "s#", buffer + *position, 12);
-#endif
+            value = _new_object_id(state, buffer + *position);
             if (!value) {
                 return NULL;
             }
@@ -1498,7 +1978,7 @@ static PyObject* get_value(PyObject* self, const char* buffer, int* position,
                 Py_DECREF(collection);
                 goto invalid;
             }
-            id = PyObject_CallFunction(state->ObjectId, "s#", buffer + *position, 12);
+            id = _new_object_id(state, buffer + *position);
             if (!id) {
                 Py_DECREF(collection);
                 return NULL;
@@ -1637,7 +2117,18 @@ static PyObject* elements_to_dict(PyObject* self, const char* string, int max,
                                   PyObject* as_class, unsigned char tz_aware,
                                   unsigned char uuid_subtype) {
     int position = 0;
-    PyObject* dict = PyObject_CallObject(as_class, NULL);
+    int is_dict = 0;
+    PyObject* dict;
+    /* The top level of a RawBSONDocument is decoded to a SON, so it keeps
+     * the order of the raw bytes. */
+    if (_is_raw_class(GETSTATE(self), as_class)) {
+        dict = PyObject_CallObject(GETSTATE(self)->SON, NULL);
+    } else if (as_class == (PyObject*)&PyDict_Type) {
+        is_dict = 1;
+        dict = PyDict_New();
+    } else {
+        dict = PyObject_CallObject(as_class, NULL);
+    }
     if (!dict) {
         return NULL;
     }
@@ -1667,13 +2158,110 @@ static PyObject* elements_to_dict(PyObject* self, const char* string, int max,
             return NULL;
         }
 
-        PyObject_SetItem(dict, name, value);
+        /* SON and other classes may define __setitem__. */
+        if ((is_dict ? PyDict_SetItem(dict, name, value) :
+             PyObject_SetItem(dict, name, value)) < 0) {
+            Py_DECREF(name);
+            Py_DECREF(value);
+            Py_DECREF(dict);
+            return NULL;
+        }
         Py_DECREF(name);
         Py_DECREF(value);
     }
     return dict;
 }
 
+/* A read-only view of some BSON data passed in from Python. */
+typedef struct {
+    const char* string;
+    Py_ssize_t size;
+#if PY_VERSION_HEX >= 0x02060000
+    Py_buffer view;
+    int has_view;
+#endif
+} input_t;
+
+/* Release a view obtained from get_input. */
+static void release_input(input_t* input) {
+#if PY_VERSION_HEX >= 0x02060000
+    if (input->has_view) {
+        PyBuffer_Release(&input->view);
+        input->has_view = 0;
+    }
+#endif
+}
+
+/* Get a view of the `length` bytes of `bson`, starting at `offset`. `bson`
+ * can be any object supporting the buffer protocol, and `length` can be
+ * Py_None to use the rest of the data after `offset`. The data is not
+ * copied: call release_input when done with the view.
+ *
+ * Returns 0 on failure. */
+static int get_input(PyObject* bson, Py_ssize_t offset, PyObject* length,
+                     input_t* input, const char* func_name) {
+    Py_ssize_t total_size;
+#if PY_VERSION_HEX >= 0x02060000
+    input->has_view = 0;
+#endif
+    if (PyUnicode_Check(bson)) {
+        goto not_buffer;
+    }
+#if PY_VERSION_HEX >= 0x02060000
+    if (PyObject_CheckBuffer(bson)) {
+        if (PyObject_GetBuffer(bson, &input->view, PyBUF_SIMPLE) == -1) {
+            return 0;
+        }
+        input->has_view = 1;
+        input->string = (const char*)input->view.buf;
+        total_size = input->view.len;
+    } else
+#endif
+#if PY_MAJOR_VERSION >= 3
+    {
+        goto not_buffer;
+    }
+#else
+    {
+        /* Old-style buffers, e.g. the buffer type. */
+        const void* string;
+        if (PyObject_AsReadBuffer(bson, &string, &total_size) == -1) {
+            PyErr_Clear();
+            goto not_buffer;
+        }
+        input->string = (const char*)string;
+    }
+#endif
+
+    if (length == Py_None) {
+        input->size = total_size - offset;
+    } else {
+#if PY_MAJOR_VERSION >= 3
+        input->size = PyLong_AsSsize_t(length);
+#else
+        input->size = PyInt_AsSsize_t(length);
+#endif
+        if (input->size == -1 && PyErr_Occurred()) {
+            release_input(input);
+            return 0;
+        }
+    }
+    if (offset < 0 || input->size < 0 || offset > total_size ||
+        input->size > total_size - offset) {
+        PyErr_SetString(PyExc_ValueError, "offset and length out of range");
+        release_input(input);
+        return 0;
+    }
+    input->string += offset;
+    return 1;
+
+not_buffer:
+    PyErr_Format(PyExc_TypeError,
+                 "argument to %s must be a string or an object "
+                 "supporting the buffer protocol", func_name);
+    return 0;
+}
+
 static PyObject* _cbson_bson_to_dict(PyObject* self, PyObject* args) {
     unsigned int size;
     Py_ssize_t total_size;
@@ -1682,44 +2270,32 @@ static PyObject* _cbson_bson_to_dict(PyObject* self, PyObject* args) {
     PyObject* as_class;
     unsigned char tz_aware;
     unsigned char uuid_subtype;
+    Py_ssize_t offset = 0;
+    PyObject* length = Py_None;
+    input_t input;
     PyObject* dict;
     PyObject* remainder;
     PyObject* result;
 
-    if (!PyArg_ParseTuple(args, "OObb", &bson, &as_class, &tz_aware, &uuid_subtype)) {
+    if (!PyArg_ParseTuple(args, "OObb|nO", &bson, &as_class, &tz_aware,
+                          &uuid_subtype, &offset, &length)) {
         return NULL;
     }
 
-#if PY_MAJOR_VERSION >= 3
-    if (!PyBytes_Check(bson)) {
-        PyErr_SetString(PyExc_TypeError, "argument to _bson_to_dict must be a bytes object");
-#else
-    if (!PyString_Check(bson)) {
-        PyErr_SetString(PyExc_TypeError, "argument to _bson_to_dict must be a string");
-#endif
+    if (!get_input(bson, offset, length, &input, "_bson_to_dict")) {
         return NULL;
     }
-#if PY_MAJOR_VERSION >= 3
-    total_size = PyBytes_Size(bson);
-#else
-    total_size = PyString_Size(bson);
-#endif
+    string = input.string;
+    total_size = input.size;
     if (total_size < 5) {
         PyObject* InvalidBSON = _error("InvalidBSON");
         PyErr_SetString(InvalidBSON,
                         "not enough data for a BSON document");
         Py_DECREF(InvalidBSON);
+        release_input(&input);
         return NULL;
     }
 
-#if PY_MAJOR_VERSION >= 3
-    string = PyBytes_AsString(bson);
-#else
-    string = PyString_AsString(bson);
-#endif
-    if (!string) {
-        return NULL;
-    }
     memcpy(&size, string, 4);
 
     if (total_size < size) {
@@ -1727,6 +2303,7 @@ static PyObject* _cbson_bson_to_dict(PyObject* self, PyObject* args) {
         PyErr_SetString(InvalidBSON,
                         "objsize too large");
         Py_DECREF(InvalidBSON);
+        release_input(&input);
         return NULL;
     }
 
@@ -1735,11 +2312,18 @@ static PyObject* _cbson_bson_to_dict(PyObject* self, PyObject* args) {
         PyErr_SetString(InvalidBSON,
                         "bad eoo");
         Py_DECREF(InvalidBSON);
+        release_input(&input);
         return NULL;
     }
 
-    dict = elements_to_dict(self, string + 4, size - 5, as_class, tz_aware, uuid_subtype);
+    if (_is_raw_class(GETSTATE(self), as_class)) {
+        dict = _raw_document(as_class, string, size, tz_aware, uuid_subtype);
+    } else {
+        dict = elements_to_dict(self, string + 4, size - 5,
+                                as_class, tz_aware, uuid_subtype);
+    }
     if (!dict) {
+        release_input(&input);
         return NULL;
     }
 #if PY_MAJOR_VERSION >= 3
@@ -1747,6 +2331,7 @@ static PyObject* _cbson_bson_to_dict(PyObject* self, PyObject* args) {
 #else
     remainder = PyString_FromStringAndSize(string + size, total_size - size);
 #endif
+    release_input(&input);
     if (!remainder) {
         Py_DECREF(dict);
         return NULL;
@@ -1757,27 +2342,27 @@ static PyObject* _cbson_bson_to_dict(PyObject* self, PyObject* args) {
     return result;
 }
 
-static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
+/* Decode the top level of a single BSON document to a SON. Used to inflate
+ * a RawBSONDocument. */
+static PyObject* _cbson_raw_to_dict(PyObject* self, PyObject* args) {
     unsigned int size;
     Py_ssize_t total_size;
     const char* string;
     PyObject* bson;
-    PyObject* dict;
-    PyObject* result;
-    PyObject* as_class = (PyObject*)&PyDict_Type;
-    unsigned char tz_aware = 1;
-    unsigned char uuid_subtype = 3;
+    PyObject* as_class;
+    unsigned char tz_aware;
+    unsigned char uuid_subtype;
 
-    if (!PyArg_ParseTuple(args, "O|Obb", &bson, &as_class, &tz_aware, &uuid_subtype)) {
+    if (!PyArg_ParseTuple(args, "OObb", &bson, &as_class, &tz_aware, &uuid_subtype)) {
         return NULL;
     }
 
 #if PY_MAJOR_VERSION >= 3
     if (!PyBytes_Check(bson)) {
-        PyErr_SetString(PyExc_TypeError, "argument to decode_all must be a bytes object");
+        PyErr_SetString(PyExc_TypeError, "argument to _raw_to_dict must be a bytes object");
 #else
     if (!PyString_Check(bson)) {
-        PyErr_SetString(PyExc_TypeError, "argument to decode_all must be a string");
+        PyErr_SetString(PyExc_TypeError, "argument to _raw_to_dict must be a string");
 #endif
         return NULL;
     }
@@ -1791,8 +2376,59 @@ static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
     if (!string) {
         return NULL;
     }
+    if (total_size < 5) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        PyErr_SetString(InvalidBSON,
+                        "not enough data for a BSON document");
+        Py_DECREF(InvalidBSON);
+        return NULL;
+    }
+
+    memcpy(&size, string, 4);
+    if (size != total_size || string[size - 1]) {
+        PyObject* InvalidBSON = _error("InvalidBSON");
+        PyErr_SetString(InvalidBSON,
+                        "bad eoo");
+        Py_DECREF(InvalidBSON);
+        return NULL;
+    }
+
+    return elements_to_dict(self, string + 4, size - 5,
+                            as_class, tz_aware, uuid_subtype);
+}
+
+static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
+    unsigned int size;
+    Py_ssize_t total_size;
+    const char* string;
+    PyObject* bson;
+    PyObject* dict;
+    PyObject* result;
+    PyObject* as_class = (PyObject*)&PyDict_Type;
+    unsigned char tz_aware = 1;
+    unsigned char uuid_subtype = 3;
+    Py_ssize_t offset = 0;
+    PyObject* length = Py_None;
+    input_t input;
+    int raw;
+
+    if (!PyArg_ParseTuple(args, "O|ObbnO", &bson, &as_class, &tz_aware,
+                          &uuid_subtype, &offset, &length)) {
+        return NULL;
+    }
+    raw = _is_raw_class(GETSTATE(self), as_class);
+
+    if (!get_input(bson, offset, length, &input, "decode_all")) {
+        return NULL;
+    }
+    string = input.string;
+    total_size = input.size;
 
     result = PyList_New(0);
+    if (!result) {
+        release_input(&input);
+        return NULL;
+    }
 
     while (total_size > 0) {
         if (total_size < 5) {
@@ -1800,8 +2436,7 @@ static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
             PyErr_SetString(InvalidBSON,
                             "not enough data for a BSON document");
             Py_DECREF(InvalidBSON);
-            Py_DECREF(result);
-            return NULL;
+            goto fail;
         }
 
         memcpy(&size, string, 4);
@@ -1811,24 +2446,26 @@ static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
             PyErr_SetString(InvalidBSON,
                             "objsize too large");
             Py_DECREF(InvalidBSON);
-            Py_DECREF(result);
-            return NULL;
+            goto fail;
         }
 
-        if (string[size - 1]) {
+        if (size < 5 || string[size - 1]) {
             PyObject* InvalidBSON = _error("InvalidBSON");
             PyErr_SetString(InvalidBSON,
                             "bad eoo");
             Py_DECREF(InvalidBSON);
-            Py_DECREF(result);
-            return NULL;
+            goto fail;
         }
 
-        dict = elements_to_dict(self, string + 4, size - 5,
-                                as_class, tz_aware, uuid_subtype);
+        if (raw) {
+            dict = _raw_document(as_class, string, size,
+                                 tz_aware, uuid_subtype);
+        } else {
+            dict = elements_to_dict(self, string + 4, size - 5,
+                                    as_class, tz_aware, uuid_subtype);
+        }
         if (!dict) {
-            Py_DECREF(result);
-            return NULL;
+            goto fail;
         }
         PyList_Append(result, dict);
         Py_DECREF(dict);
@@ -1836,16 +2473,213 @@ static PyObject* _cbson_decode_all(PyObject* self, PyObject* args) {
         total_size -= size;
     }
 
+    release_input(&input);
+    return result;
+
+fail:
+    release_input(&input);
+    Py_DECREF(result);
+    return NULL;
+}
+
+static PyObject* _cbson_init_object_id(PyObject* self, PyObject* args) {
+    PyObject* machine;
+    unsigned long inc;
+
+    if (!PyArg_ParseTuple(args, "Ok", &machine, &inc)) {
+        return NULL;
+    }
+#if PY_MAJOR_VERSION >= 3
+    if (!PyBytes_Check(machine) || PyBytes_Size(machine) != 3) {
+#else
+    if (!PyString_Check(machine) || PyString_Size(machine) != 3) {
+#endif
+        PyErr_SetString(PyExc_ValueError, "machine bytes must be 3 bytes");
+        return NULL;
+    }
+#if PY_MAJOR_VERSION >= 3
+    memcpy(_oid_machine, PyBytes_AsString(machine), 3);
+#else
+    memcpy(_oid_machine, PyString_AsString(machine), 3);
+#endif
+    _oid_inc = inc % 0xFFFFFF;
+    _oid_reset_pid();
+#if !defined(WIN32) && !defined(_MSC_VER)
+    if (!_oid_initialized) {
+        /* ObjectIds made in a child process must have its pid. */
+        pthread_atfork(NULL, NULL, _oid_reset_pid);
+    }
+#endif
+    _oid_initialized = 1;
+    Py_RETURN_NONE;
+}
+
+static PyObject* _cbson_generate_object_id(PyObject* self, PyObject* args) {
+    char oid[12];
+
+    if (!_oid_initialized) {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "ObjectId generation isn't initialized");
+        return NULL;
+    }
+    _generate_object_id(oid, (unsigned long)time(NULL), _reserve_oid_inc(1));
+#if PY_MAJOR_VERSION >= 3
+    return PyBytes_FromStringAndSize(oid, 12);
+#else
+    return PyString_FromStringAndSize(oid, 12);
+#endif
+}
+
+static PyObject* _cbson_generate_object_ids(PyObject* self, PyObject* args) {
+    struct module_state *state = GETSTATE(self);
+    int count;
+    int i;
+    unsigned long timestamp;
+    unsigned long inc;
+    char oid[12];
+    PyObject* result;
+
+    if (!PyArg_ParseTuple(args, "i", &count)) {
+        return NULL;
+    }
+    if (!_oid_initialized) {
+        PyErr_SetString(PyExc_RuntimeError,
+                        "ObjectId generation isn't initialized");
+        return NULL;
+    }
+    if (count < 0 || count > 0xFFFFFF) {
+        PyErr_SetString(PyExc_ValueError,
+                        "can't generate less than 0 or more than "
+                        "16777215 ObjectIds at once");
+        return NULL;
+    }
+    result = PyList_New(count);
+    if (!result) {
+        return NULL;
+    }
+    /* One timestamp and one counter range for the whole batch. */
+    timestamp = (unsigned long)time(NULL);
+    inc = _reserve_oid_inc((unsigned long)count);
+    for (i = 0; i < count; i++) {
+        PyObject* value;
+        _generate_object_id(oid, timestamp, inc + (unsigned long)i);
+        value = _new_object_id(state, oid);
+        if (!value) {
+            Py_DECREF(result);
+            return NULL;
+        }
+        PyList_SET_ITEM(result, i, value);
+    }
     return result;
 }
 
+static int _hex_value(char c) {
+    if (c >= '0' && c <= '9') {
+        return c - '0';
+    }
+    if (c >= 'a' && c <= 'f') {
+        return c - 'a' + 10;
+    }
+    if (c >= 'A' && c <= 'F') {
+        return c - 'A' + 10;
+    }
+    return -1;
+}
+
+static PyObject* _cbson_object_id_from_hex(PyObject* self, PyObject* hex) {
+    PyObject* ascii = NULL;
+    const char* string;
+    char oid[12];
+    int i;
+
+    if (PyUnicode_Check(hex)) {
+        ascii = PyUnicode_AsASCIIString(hex);
+        if (!ascii) {
+            return NULL;
+        }
+        hex = ascii;
+    }
+#if PY_MAJOR_VERSION >= 3
+    if (!PyBytes_Check(hex) || PyBytes_Size(hex) != 24) {
+#else
+    if (!PyString_Check(hex) || PyString_Size(hex) != 24) {
+#endif
+        Py_XDECREF(ascii);
+        PyErr_SetString(PyExc_ValueError, "expected 24 hex digits");
+        return NULL;
+    }
+#if PY_MAJOR_VERSION >= 3
+    string = PyBytes_AsString(hex);
+#else
+    string = PyString_AsString(hex);
+#endif
+    for (i = 0; i < 12; i++) {
+        int high = _hex_value(string[2 * i]);
+        int low = _hex_value(string[2 * i + 1]);
+        if (high < 0 || low < 0) {
+            Py_XDECREF(ascii);
+            PyErr_SetString(PyExc_ValueError, "expected 24 hex digits");
+            return NULL;
+        }
+        oid[i] = (char)(high << 4 | low);
+    }
+    Py_XDECREF(ascii);
+#if PY_MAJOR_VERSION >= 3
+    return PyBytes_FromStringAndSize(oid, 12);
+#else
+    return PyString_FromStringAndSize(oid, 12);
+#endif
+}
+
+static PyObject* _cbson_object_id_to_hex(PyObject* self, PyObject* binary) {
+    static const char digits[] = "0123456789abcdef";
+    const unsigned char* string;
+    char hex[24];
+    int i;
+
+#if PY_MAJOR_VERSION >= 3
+    if (!PyBytes_Check(binary) || PyBytes_Size(binary) != 12) {
+#else
+    if (!PyString_Check(binary) || PyString_Size(binary) != 12) {
+#endif
+        PyErr_SetString(PyExc_ValueError, "expected 12 bytes");
+        return NULL;
+    }
+#if PY_MAJOR_VERSION >= 3
+    string = (const unsigned char*)PyBytes_AsString(binary);
+#else
+    string = (const unsigned char*)PyString_AsString(binary);
+#endif
+    for (i = 0; i < 12; i++) {
+        hex[2 * i] = digits[string[i] >> 4];
+        hex[2 * i + 1] = digits[string[i] & 0x0F];
+    }
+#if PY_MAJOR_VERSION >= 3
+    return PyUnicode_FromStringAndSize(hex, 24);
+#else
+    return PyString_FromStringAndSize(hex, 24);
+#endif
+}
+
 static PyMethodDef _CBSONMethods[] = {
     {"_dict_to_bson", _cbson_dict_to_bson, METH_VARARGS,
      "convert a dictionary to a string containing its BSON representation."},
     {"_bson_to_dict", _cbson_bson_to_dict, METH_VARARGS,
      "convert a BSON string to a SON object."},
+    {"_raw_to_dict", _cbson_raw_to_dict, METH_VARARGS,
+     "decode the top level of a BSON string to a SON object."},
     {"decode_all", _cbson_decode_all, METH_VARARGS,
      "convert binary data to a sequence of documents."},
+    {"_init_object_id", _cbson_init_object_id, METH_VARARGS,
+     "set the machine bytes and first counter value of new ObjectIds."},
+    {"_generate_object_id", _cbson_generate_object_id, METH_NOARGS,
+     "get the 12 bytes of a new ObjectId."},
+    {"_generate_object_ids", _cbson_generate_object_ids, METH_VARARGS,
+     "get a list of new ObjectIds sharing one timestamp."},
+    {"_object_id_from_hex", _cbson_object_id_from_hex, METH_O,
+     "get the 12 bytes of an ObjectId from 24 hex digits."},
+    {"_object_id_to_hex", _cbson_object_id_to_hex, METH_O,
+     "get the 24 hex digits of an ObjectId from its 12 bytes."},
     {NULL, NULL, 0, NULL}
 };
 
@@ -1855,6 +2689,7 @@ static int _cbson_traverse(PyObject *m, visitproc visit, void *arg) {
     Py_VISIT(GETSTATE(m)->Binary);
     Py_VISIT(GETSTATE(m)->Code);
     Py_VISIT(GETSTATE(m)->ObjectId);
+    Py_VISIT(GETSTATE(m)->ObjectIdSlot);
     Py_VISIT(GETSTATE(m)->DBRef);
     Py_VISIT(GETSTATE(m)->RECompile);
     Py_VISIT(GETSTATE(m)->UUID);
@@ -1863,6 +2698,8 @@ static int _cbson_traverse(PyObject *m, visitproc visit, void *arg) {
     Py_VISIT(GETSTATE(m)->MaxKey);
     Py_VISIT(GETSTATE(m)->UTC);
     Py_VISIT(GETSTATE(m)->REType);
+    Py_VISIT(GETSTATE(m)->RawBSONDocument);
+    Py_VISIT(GETSTATE(m)->SON);
     return 0;
 }
 
@@ -1870,6 +2707,7 @@ static int _cbson_clear(PyObject *m) {
     Py_CLEAR(GETSTATE(m)->Binary);
     Py_CLEAR(GETSTATE(m)->Code);
     Py_CLEAR(GETSTATE(m)->ObjectId);
+    Py_CLEAR(GETSTATE(m)->ObjectIdSlot);
     Py_CLEAR(GETSTATE(m)->DBRef);
     Py_CLEAR(GETSTATE(m)->RECompile);
     Py_CLEAR(GETSTATE(m)->UUID);
@@ -1878,6 +2716,8 @@ static int _cbson_clear(PyObject *m) {
     Py_CLEAR(GETSTATE(m)->MaxKey);
     Py_CLEAR(GETSTATE(m)->UTC);
     Py_CLEAR(GETSTATE(m)->REType);
+    Py_CLEAR(GETSTATE(m)->RawBSONDocument);
+    Py_CLEAR(GETSTATE(m)->SON);
     return 0;
 }
 
@@ -78,8 +78,8 @@ static int buffer_grow(buffer_t buffer, int min_length) {
     }
     buffer->buffer = (char*)realloc(buffer->buffer, sizeof(char) * size);
     if (buffer->buffer == NULL) {
-        free(old_buffer);
-        free(buffer);
+        /* Leave `buffer` as it was, the caller frees it. */
+        buffer->buffer = old_buffer;
         return 1;
     }
     buffer->size = size;
@@ -132,6 +132,10 @@ int buffer_write_at_position(buffer_t buffer, buffer_position position,
     return 0;
 }
 
+/* Empty `buffer` so it can be reused, keeping its allocated memory. */
+void buffer_reset(buffer_t buffer) {
+    buffer->position = 0;
+}
 
 int buffer_get_position(buffer_t buffer) {
     return buffer->position;
@@ -140,3 +144,7 @@ int buffer_get_position(buffer_t buffer) {
 char* buffer_get_buffer(buffer_t buffer) {
     return buffer->buffer;
 }
+
+int buffer_get_size(buffer_t buffer) {
+    return buffer->size;
+}
@@ -46,10 +46,14 @@ int buffer_write(buffer_t buffer, const char* data, int size);
  * Return non-zero if buffer isn't large enough for write. */
 int buffer_write_at_position(buffer_t buffer, buffer_position position, const char* data, int size);
 
+/* Empty `buffer` so it can be reused, keeping its allocated memory. */
+void buffer_reset(buffer_t buffer);
+
 /* Getters for the internals of a buffer_t.
  * Should try to avoid using these as much as possible
  * since they break the abstraction. */
 buffer_position buffer_get_position(buffer_t buffer);
 char* buffer_get_buffer(buffer_t buffer);
+int buffer_get_size(buffer_t buffer);
 
 #endif
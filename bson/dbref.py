@@ -23,6 +23,8 @@ class DBRef(object):
     """A reference to a document stored in MongoDB.
     """
 
+    __slots__ = ('__collection', '__id', '__database', '__kwargs')
+
     def __init__(self, collection, id, database=None, _extra={}, **kwargs):
         """Initialize a new :class:`DBRef`.
 
@@ -82,16 +84,28 @@ class DBRef(object):
         return self.__database
 
     def __getattr__(self, key):
+        # Don't recurse if __kwargs isn't set yet, e.g. while unpickling.
+        if key == '_DBRef__kwargs':
+            raise AttributeError(key)
         try:
             return self.__kwargs[key]
         except KeyError:
             raise AttributeError(key)
 
-    # Have to provide __setstate__ to avoid
-    # infinite recursion since we override
-    # __getattr__.
+    def __getstate__(self):
+        """Get the state of this DBRef for pickling.
+
+        The state is the dict DBRefs had before __slots__ were defined,
+        so pickles can be read by either version.
+        """
+        return {'_DBRef__collection': self.__collection,
+                '_DBRef__id': self.__id,
+                '_DBRef__database': self.__database,
+                '_DBRef__kwargs': self.__kwargs}
+
     def __setstate__(self, state):
-        self.__dict__.update(state)
+        for name, value in state.items():
+            setattr(self, name, value)
 
     def as_doc(self):
         """Get the SON document representation of this DBRef.
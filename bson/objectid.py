@@ -54,6 +54,64 @@ def _machine_bytes():
     return machine_hash.digest()[0:3]
 
 
+def _generate():
+    """Get the 12 bytes of a new ObjectId.
+    """
+    oid = EMPTY
+
+    # 4 bytes current time
+    oid += struct.pack(">i", int(time.time()))
+
+    # 3 bytes machine
+    oid += ObjectId._machine_bytes
+
+    # 2 bytes pid
+    oid += struct.pack(">H", os.getpid() % 0xFFFF)
+
+    # 3 bytes inc
+    ObjectId._inc_lock.acquire()
+    oid += struct.pack(">i", ObjectId._inc)[1:4]
+    ObjectId._inc = (ObjectId._inc + 1) % 0xFFFFFF
+    ObjectId._inc_lock.release()
+
+    return oid
+
+
+def _generate_batch(count):
+    """Get a list of `count` new ObjectIds sharing one timestamp, with
+    consecutive counter values.
+    """
+    if count < 0 or count > 0xFFFFFF:
+        raise ValueError("can't generate less than 0 or more than "
+                         "16777215 ObjectIds at once")
+    prefix = (struct.pack(">i", int(time.time())) +
+              ObjectId._machine_bytes +
+              struct.pack(">H", os.getpid() % 0xFFFF))
+
+    ObjectId._inc_lock.acquire()
+    try:
+        inc = ObjectId._inc
+        ObjectId._inc = (inc + count) % 0xFFFFFF
+    finally:
+        ObjectId._inc_lock.release()
+
+    pack = struct.pack
+    oids = []
+    for i in xrange(count):
+        oid = ObjectId.__new__(ObjectId)
+        oid._ObjectId__id = prefix + pack(">i", (inc + i) % 0xFFFFFF)[1:4]
+        oids.append(oid)
+    return oids
+
+
+def _to_hex(binary):
+    """Get the 24 hex digits of an ObjectId from its 12 bytes.
+    """
+    if PY3:
+        return binascii.hexlify(binary).decode()
+    return binascii.hexlify(binary)
+
+
 class ObjectId(object):
     """A MongoDB ObjectId.
     """
@@ -85,7 +143,7 @@ class ObjectId(object):
         .. mongodoc:: objectids
         """
         if oid is None:
-            self.__generate()
+            self.__id = _generate()
         else:
             self.__validate(oid)
 
@@ -129,6 +187,27 @@ class ObjectId(object):
         oid = struct.pack(">i", int(ts)) + ZERO * 8
         return cls(oid)
 
+    @classmethod
+    def generate_batch(cls, count):
+        """Create `count` new ObjectIds at once.
+
+        The ObjectIds share one timestamp and take a range of consecutive
+        counter values, reserved in one step, so this is much faster than
+        calling :class:`ObjectId` `count` times. `count` must be at most
+        ``0xFFFFFF``, the size of the counter.
+
+        :Parameters:
+          - `count`: the number of ObjectIds to create
+
+        .. versionadded:: 2.5+
+        """
+        if not isinstance(count, (int, long)):
+            raise TypeError("count must be an integer")
+        oids = _generate_batch(count)
+        if cls is not ObjectId:
+            return [cls(oid) for oid in oids]
+        return oids
+
     @classmethod
     def is_valid(cls, oid):
         """Checks if a `oid` string is valid or not.
@@ -144,28 +223,6 @@ class ObjectId(object):
         except (InvalidId, TypeError):
             return False
 
-    def __generate(self):
-        """Generate a new value for this ObjectId.
-        """
-        oid = EMPTY
-
-        # 4 bytes current time
-        oid += struct.pack(">i", int(time.time()))
-
-        # 3 bytes machine
-        oid += ObjectId._machine_bytes
-
-        # 2 bytes pid
-        oid += struct.pack(">H", os.getpid() % 0xFFFF)
-
-        # 3 bytes inc
-        ObjectId._inc_lock.acquire()
-        oid += struct.pack(">i", ObjectId._inc)[1:4]
-        ObjectId._inc = (ObjectId._inc + 1) % 0xFFFFFF
-        ObjectId._inc_lock.release()
-
-        self.__id = oid
-
     def __validate(self, oid):
         """Validate and use the given id for this ObjectId.
 
@@ -187,7 +244,7 @@ class ObjectId(object):
                     raise InvalidId("%s is not a valid ObjectId" % oid)
             elif len(oid) == 24:
                 try:
-                    self.__id = bytes_from_hex(oid)
+                    self.__id = _from_hex(oid)
                 except (TypeError, ValueError):
                     raise InvalidId("%s is not a valid ObjectId" % oid)
             else:
@@ -244,9 +301,7 @@ class ObjectId(object):
             self.__id = oid
 
     def __str__(self):
-        if PY3:
-            return binascii.hexlify(self.__id).decode()
-        return binascii.hexlify(self.__id)
+        return _to_hex(self.__id)
 
     def __repr__(self):
         return "ObjectId('%s')" % (str(self),)
@@ -287,3 +342,18 @@ class ObjectId(object):
         .. versionadded:: 1.1
         """
         return hash(self.__id)
+
+
+_from_hex = bytes_from_hex
+
+# Generate, parse and format ObjectIds in C, if it's available. This is
+# at the end of the module because _cbson imports ObjectId.
+try:
+    from bson import _cbson
+    _cbson._init_object_id(ObjectId._machine_bytes, ObjectId._inc)
+    _generate = _cbson._generate_object_id
+    _generate_batch = _cbson._generate_object_ids
+    _from_hex = _cbson._object_id_from_hex
+    _to_hex = _cbson._object_id_to_hex
+except ImportError:
+    pass
@@ -0,0 +1,131 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tools for representing raw BSON documents.
+
+A :class:`RawBSONDocument` can be passed as the `as_class` of
+:func:`~bson.decode_all` or :meth:`~bson.BSON.decode`, or as the
+`document_class` / `as_class` of a client, collection or cursor::
+
+  >>> from bson.raw_bson import RawBSONDocument
+  >>> client = MongoClient(document_class=RawBSONDocument)
+
+Documents are kept as the BSON bytes they were received as. Nothing is
+decoded until a field is accessed, and then only the top level of the
+document is decoded: embedded documents stay :class:`RawBSONDocument`
+instances until they are accessed in turn. A :class:`RawBSONDocument` is
+encoded by copying its bytes, so documents read from one collection can be
+inserted into another without being re-encoded.
+
+.. versionadded:: 2.5+
+"""
+
+from bson.binary import OLD_UUID_SUBTYPE
+
+
+class RawBSONDocument(object):
+    """Read-only mapping backed by the raw BSON bytes of a document.
+
+    :Parameters:
+      - `bson_bytes`: the BSON bytes that compose this document
+      - `tz_aware` (optional): if ``True``, decoded
+        :class:`~datetime.datetime` instances are timezone-aware
+      - `uuid_subtype` (optional): the BSON binary subtype used to decode
+        UUIDs
+    """
+
+    def __init__(self, bson_bytes,
+                 tz_aware=False, uuid_subtype=OLD_UUID_SUBTYPE):
+        self.__raw = bson_bytes
+        self.__inflated_doc = None
+        self.__tz_aware = tz_aware
+        self.__uuid_subtype = uuid_subtype
+
+    @property
+    def raw(self):
+        """The BSON bytes composing this document."""
+        return self.__raw
+
+    def __inflated(self):
+        if self.__inflated_doc is None:
+            # Imported here since bson imports this module. Embedded
+            # documents are decoded as RawBSONDocuments, so this only
+            # decodes the top level of the document.
+            from bson import _raw_to_dict
+            self.__inflated_doc = _raw_to_dict(self.__raw,
+                                               RawBSONDocument,
+                                               self.__tz_aware,
+                                               self.__uuid_subtype)
+        return self.__inflated_doc
+
+    def __getitem__(self, key):
+        return self.__inflated()[key]
+
+    def __contains__(self, key):
+        return key in self.__inflated()
+
+    def has_key(self, key):
+        return key in self.__inflated()
+
+    def get(self, key, default=None):
+        return self.__inflated().get(key, default)
+
+    def __iter__(self):
+        return iter(self.__inflated())
+
+    def __len__(self):
+        return len(self.__inflated())
+
+    def keys(self):
+        return self.__inflated().keys()
+
+    def values(self):
+        return self.__inflated().values()
+
+    def items(self):
+        return self.__inflated().items()
+
+    def iterkeys(self):
+        return self.__inflated().iterkeys()
+
+    def itervalues(self):
+        return self.__inflated().itervalues()
+
+    def iteritems(self):
+        return self.__inflated().iteritems()
+
+    def to_dict(self):
+        """Decode this document, and any embedded documents, to a
+        :class:`dict`.
+        """
+        def transform_value(value):
+            if isinstance(value, RawBSONDocument):
+                return value.to_dict()
+            elif isinstance(value, list):
+                return [transform_value(v) for v in value]
+            return value
+
+        return dict([(key, transform_value(value))
+                     for key, value in self.iteritems()])
+
+    def __eq__(self, other):
+        if isinstance(other, RawBSONDocument):
+            return self.__raw == other.raw
+        return self.__inflated() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "RawBSONDocument(%r)" % (self.__raw,)
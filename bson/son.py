@@ -21,17 +21,103 @@ dictionary."""
 import copy
 import re
 
+try:
+    from collections import OrderedDict as _OrderedDict
+except ImportError:  # Python < 2.7
+    _OrderedDict = None
+
 # This sort of sucks, but seems to be as good as it gets...
 RE_TYPE = type(re.compile(""))
 
 
-class SON(dict):
+if _OrderedDict is None:
+    class _OrderedDict(dict):
+        """The parts of :class:`collections.OrderedDict` SON uses, for
+        Python versions that don't have it. Deleting a key takes linear
+        time.
+        """
+
+        def __init__(self):
+            try:
+                self.__keys
+            except AttributeError:
+                self.__keys = []
+
+        def __setitem__(self, key, value):
+            if key not in self:
+                self.__keys.append(key)
+            dict.__setitem__(self, key, value)
+
+        def __delitem__(self, key):
+            dict.__delitem__(self, key)
+            self.__keys.remove(key)
+
+        def __iter__(self):
+            return iter(self.__keys)
+
+        def keys(self):
+            return list(self.__keys)
+
+        def iterkeys(self):
+            return iter(self.__keys)
+
+        def itervalues(self):
+            for key in self.__keys:
+                yield self[key]
+
+        def values(self):
+            return [self[key] for key in self.__keys]
+
+        def iteritems(self):
+            for key in self.__keys:
+                yield (key, self[key])
+
+        def items(self):
+            return [(key, self[key]) for key in self.__keys]
+
+        def clear(self):
+            dict.clear(self)
+            del self.__keys[:]
+
+        def setdefault(self, key, default=None):
+            if key not in self:
+                self[key] = default
+            return self[key]
+
+        def pop(self, key, *args):
+            if len(args) > 1:
+                raise TypeError("pop expected at most 2 arguments, got "
+                                + repr(1 + len(args)))
+            if key not in self:
+                if args:
+                    return args[0]
+                raise KeyError(key)
+            value = self[key]
+            del self[key]
+            return value
+
+        def popitem(self, last=True):
+            if not self:
+                raise KeyError('dictionary is empty')
+            if last:
+                key = self.__keys[-1]
+            else:
+                key = self.__keys[0]
+            return (key, self.pop(key))
+
+
+class SON(_OrderedDict):
     """SON data.
 
     A subclass of dict that maintains ordering of keys and provides a
     few extra niceties for dealing with SON. SON objects can be
     converted to and from BSON.
 
+    SON is a :class:`collections.OrderedDict` where that is available
+    (Python 2.7 and later), so adding, looking up and deleting keys take
+    constant time. Unlike ``OrderedDict.popitem``, :meth:`popitem` removes
+    the first item by default.
+
     The mapping from Python types to BSON types is as follows:
 
     ===================================  =============  ===================
@@ -74,105 +160,39 @@ class SON(dict):
        subtype 0. In Python 3.x it will be decoded back to bytes. In Python 2.x
        it will be decoded to an instance of :class:`~bson.binary.Binary` with
        subtype 0.
-    """
 
-    def __init__(self, data=None, **kwargs):
-        self.__keys = []
-        dict.__init__(self)
-        self.update(data)
-        self.update(kwargs)
+    .. versionchanged:: 2.5+
+       SON is a subclass of :class:`collections.OrderedDict` where that
+       is available.
+    """
 
     def __new__(cls, *args, **kwargs):
         instance = super(SON, cls).__new__(cls, *args, **kwargs)
-        instance.__keys = []
+        # Set up the key order here rather than in __init__, which
+        # unpickling doesn't call.
+        _OrderedDict.__init__(instance)
         return instance
 
+    def __init__(self, data=None, **kwargs):
+        self.update(data)
+        self.update(kwargs)
+
     def __repr__(self):
         result = []
-        for key in self.__keys:
-            result.append("(%r, %r)" % (key, self[key]))
+        for key, value in self.iteritems():
+            result.append("(%r, %r)" % (key, value))
         return "SON([%s])" % ", ".join(result)
 
-    def __setitem__(self, key, value):
-        if key not in self:
-            self.__keys.append(key)
-        dict.__setitem__(self, key, value)
-
-    def __delitem__(self, key):
-        self.__keys.remove(key)
-        dict.__delitem__(self, key)
-
-    def keys(self):
-        return list(self.__keys)
-
     def copy(self):
         other = SON()
         other.update(self)
         return other
 
-    # TODO this is all from UserDict.DictMixin. it could probably be made more
-    # efficient.
-    # second level definitions support higher levels
-    def __iter__(self):
-        for k in self.keys():
-            yield k
-
-    def has_key(self, key):
-        return key in self.keys()
-
-    def __contains__(self, key):
-        return key in self.keys()
-
-    # third level takes advantage of second level definitions
-    def iteritems(self):
-        for k in self:
-            yield (k, self[k])
-
-    def iterkeys(self):
-        return self.__iter__()
-
-    # fourth level uses definitions from lower levels
-    def itervalues(self):
-        for _, v in self.iteritems():
-            yield v
-
-    def values(self):
-        return [v for _, v in self.iteritems()]
-
-    def items(self):
-        return [(key, self[key]) for key in self]
-
-    def clear(self):
-        for key in self.keys():
-            del self[key]
-
-    def setdefault(self, key, default=None):
-        try:
-            return self[key]
-        except KeyError:
-            self[key] = default
-        return default
-
-    def pop(self, key, *args):
-        if len(args) > 1:
-            raise TypeError("pop expected at most 2 arguments, got "\
-                                + repr(1 + len(args)))
-        try:
-            value = self[key]
-        except KeyError:
-            if args:
-                return args[0]
-            raise
-        del self[key]
-        return value
-
-    def popitem(self):
-        try:
-            k, v = self.iteritems().next()
-        except StopIteration:
-            raise KeyError('container is empty')
-        del self[k]
-        return (k, v)
+    def popitem(self, last=False):
+        """Remove and return the first ``(key, value)`` pair, or the last
+        one if `last` is ``True``.
+        """
+        return _OrderedDict.popitem(self, last)
 
     def update(self, other=None, **kwargs):
         # Make progressively weaker assumptions about "other"
@@ -190,11 +210,25 @@ class SON(dict):
         if kwargs:
             self.update(kwargs)
 
-    def get(self, key, default=None):
-        try:
-            return self[key]
-        except KeyError:
-            return default
+    def __reduce__(self):
+        # The items are set after the SON is created, so a SON that
+        # contains itself can be pickled.
+        state = dict([(k, v) for k, v in vars(self).items()
+                      if not k.startswith('_OrderedDict__')])
+        return (self.__class__, (), state or None, None, self.iteritems())
+
+    def __setstate__(self, state):
+        # SONs pickled before SON was an OrderedDict were unpickled
+        # without calling __new__: their items are in the dict, in the
+        # order of _SON__keys.
+        keys = state.pop('_SON__keys', None)
+        if keys is not None:
+            items = [(key, dict.__getitem__(self, key)) for key in keys]
+            _OrderedDict.__init__(self)
+            _OrderedDict.clear(self)
+            for key, value in items:
+                self[key] = value
+        self.__dict__.update(state)
 
     def __eq__(self, other):
         """Comparison to another SON is order-sensitive while comparison to a
@@ -207,9 +241,6 @@ class SON(dict):
     def __ne__(self, other):
         return not self == other
 
-    def __len__(self):
-        return len(self.keys())
-
     def to_dict(self):
         """Convert a SON document to a normal Python dictionary instance.
 
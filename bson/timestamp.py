@@ -26,6 +26,8 @@ class Timestamp(object):
     """MongoDB internal timestamps used in the opLog.
     """
 
+    __slots__ = ('__time', '__inc')
+
     def __init__(self, time, inc):
         """Create a new :class:`Timestamp`.
 
@@ -63,6 +65,19 @@ class Timestamp(object):
         self.__time = time
         self.__inc = inc
 
+    def __getstate__(self):
+        """Get the state of this Timestamp for pickling.
+
+        The state is the dict Timestamps had before __slots__ were
+        defined, so pickles can be read by either version.
+        """
+        return {'_Timestamp__time': self.__time,
+                '_Timestamp__inc': self.__inc}
+
+    def __setstate__(self, state):
+        self.__time = state['_Timestamp__time']
+        self.__inc = state['_Timestamp__inc']
+
     @property
     def time(self):
         """Get the time portion of this :class:`Timestamp`.
@@ -43,6 +43,43 @@ static struct module_state _state;
 #define BYTES_FORMAT_STRING "s#"
 #endif
 
+/* Buffers are kept in a small free list between messages, so building
+ * a message doesn't pay for allocating a buffer and growing it from
+ * INITIAL_BUFFER_SIZE every time. The free list is only touched while
+ * holding the GIL, and a buffer is taken off it for as long as a message
+ * is being built, so threads building messages at the same time (or
+ * releasing the GIL while encoding a document) never share a buffer.
+ * Buffers that grew larger than MAX_POOLED_BUFFER_SIZE are freed rather
+ * than kept around. */
+#define BUFFER_POOL_SIZE 8
+#define MAX_POOLED_BUFFER_SIZE (1024 * 1024)
+static buffer_t _buffer_pool[BUFFER_POOL_SIZE];
+static int _buffer_pool_count = 0;
+
+/* Get an empty buffer from the pool, or a new one if the pool is empty.
+ * Return NULL on allocation failure. */
+static buffer_t pool_get_buffer(void) {
+    buffer_t buffer;
+    if (_buffer_pool_count > 0) {
+        buffer = _buffer_pool[--_buffer_pool_count];
+        buffer_reset(buffer);
+        return buffer;
+    }
+    return buffer_new();
+}
+
+/* Give a buffer back to the pool once we are done with it.
+ * Buffers are only returned on success, on failure they are freed since
+ * they may be in an inconsistent state. */
+static void pool_return_buffer(buffer_t buffer) {
+    if (_buffer_pool_count < BUFFER_POOL_SIZE &&
+        buffer_get_size(buffer) <= MAX_POOLED_BUFFER_SIZE) {
+        _buffer_pool[_buffer_pool_count++] = buffer;
+    } else {
+        buffer_free(buffer);
+    }
+}
+
 /* Get an error class from the pymongo.errors module.
  *
  * Returns a new ref */
@@ -164,7 +201,7 @@ static PyObject* _cbson_insert_message(PyObject* self, PyObject* args) {
         options += 1;
     }
 
-    buffer = buffer_new();
+    buffer = pool_get_buffer();
     if (!buffer) {
         PyErr_NoMemory();
         PyMem_Free(collection_name);
@@ -175,6 +212,7 @@ static PyObject* _cbson_insert_message(PyObject* self, PyObject* args) {
     length_location = buffer_save_space(buffer, 4);
     if (length_location == -1) {
         PyMem_Free(collection_name);
+        buffer_free(buffer);
         PyErr_NoMemory();
         return NULL;
     }
@@ -250,7 +288,7 @@ static PyObject* _cbson_insert_message(PyObject* self, PyObject* args) {
                            buffer_get_buffer(buffer),
                            buffer_get_position(buffer),
                            max_size);
-    buffer_free(buffer);
+    pool_return_buffer(buffer);
     return result;
 }
 
@@ -291,7 +329,7 @@ static PyObject* _cbson_update_message(PyObject* self, PyObject* args) {
     if (multi) {
         options += 2;
     }
-    buffer = buffer_new();
+    buffer = pool_get_buffer();
     if (!buffer) {
         PyErr_NoMemory();
         PyMem_Free(collection_name);
@@ -302,6 +340,7 @@ static PyObject* _cbson_update_message(PyObject* self, PyObject* args) {
     length_location = buffer_save_space(buffer, 4);
     if (length_location == -1) {
         PyMem_Free(collection_name);
+        buffer_free(buffer);
         PyErr_NoMemory();
         return NULL;
     }
@@ -356,7 +395,7 @@ static PyObject* _cbson_update_message(PyObject* self, PyObject* args) {
                            buffer_get_buffer(buffer),
                            buffer_get_position(buffer),
                            max_size);
-    buffer_free(buffer);
+    pool_return_buffer(buffer);
     return result;
 }
 
@@ -387,7 +426,7 @@ static PyObject* _cbson_query_message(PyObject* self, PyObject* args) {
                           &query, &field_selector, &uuid_subtype)) {
         return NULL;
     }
-    buffer = buffer_new();
+    buffer = pool_get_buffer();
     if (!buffer) {
         PyErr_NoMemory();
         PyMem_Free(collection_name);
@@ -398,6 +437,7 @@ static PyObject* _cbson_query_message(PyObject* self, PyObject* args) {
     length_location = buffer_save_space(buffer, 4);
     if (length_location == -1) {
         PyMem_Free(collection_name);
+        buffer_free(buffer);
         PyErr_NoMemory();
         return NULL;
     }
@@ -442,7 +482,7 @@ static PyObject* _cbson_query_message(PyObject* self, PyObject* args) {
                            buffer_get_buffer(buffer),
                            buffer_get_position(buffer),
                            max_size);
-    buffer_free(buffer);
+    pool_return_buffer(buffer);
     return result;
 }
 
@@ -465,7 +505,7 @@ static PyObject* _cbson_get_more_message(PyObject* self, PyObject* args) {
                           &cursor_id)) {
         return NULL;
     }
-    buffer = buffer_new();
+    buffer = pool_get_buffer();
     if (!buffer) {
         PyErr_NoMemory();
         PyMem_Free(collection_name);
@@ -476,6 +516,7 @@ static PyObject* _cbson_get_more_message(PyObject* self, PyObject* args) {
     length_location = buffer_save_space(buffer, 4);
     if (length_location == -1) {
         PyMem_Free(collection_name);
+        buffer_free(buffer);
         PyErr_NoMemory();
         return NULL;
     }
@@ -503,7 +544,166 @@ static PyObject* _cbson_get_more_message(PyObject* self, PyObject* args) {
     result = Py_BuildValue("i" BYTES_FORMAT_STRING, request_id,
                            buffer_get_buffer(buffer),
                            buffer_get_position(buffer));
-    buffer_free(buffer);
+    pool_return_buffer(buffer);
+    return result;
+}
+
+static PyObject* _cbson_delete_message(PyObject* self, PyObject* args) {
+    /* NOTE just using a random number as the request_id */
+    struct module_state *state = GETSTATE(self);
+
+    int request_id = rand();
+    char* collection_name = NULL;
+    int collection_name_length;
+    int before, max_size;
+    PyObject* spec;
+    unsigned char safe;
+    unsigned char uuid_subtype;
+    PyObject* last_error_args;
+    buffer_t buffer;
+    int length_location, message_length;
+    PyObject* result;
+
+    if (!PyArg_ParseTuple(args, "et#ObOb",
+                          "utf-8",
+                          &collection_name,
+                          &collection_name_length,
+                          &spec, &safe,
+                          &last_error_args, &uuid_subtype)) {
+        return NULL;
+    }
+    buffer = pool_get_buffer();
+    if (!buffer) {
+        PyErr_NoMemory();
+        PyMem_Free(collection_name);
+        return NULL;
+    }
+
+    // save space for message length
+    length_location = buffer_save_space(buffer, 4);
+    if (length_location == -1) {
+        PyMem_Free(collection_name);
+        buffer_free(buffer);
+        PyErr_NoMemory();
+        return NULL;
+    }
+    if (!buffer_write_bytes(buffer, (const char*)&request_id, 4) ||
+        !buffer_write_bytes(buffer,
+                            "\x00\x00\x00\x00"
+                            "\xd6\x07\x00\x00"
+                            "\x00\x00\x00\x00",
+                            12) ||
+        !buffer_write_bytes(buffer,
+                            collection_name,
+                            collection_name_length + 1) ||
+        !buffer_write_bytes(buffer, "\x00\x00\x00\x00", 4)) {
+        buffer_free(buffer);
+        PyMem_Free(collection_name);
+        return NULL;
+    }
+
+    before = buffer_get_position(buffer);
+    if (!write_dict(state->_cbson, buffer, spec, 0, uuid_subtype, 1)) {
+        buffer_free(buffer);
+        PyMem_Free(collection_name);
+        return NULL;
+    }
+    max_size = buffer_get_position(buffer) - before;
+
+    message_length = buffer_get_position(buffer) - length_location;
+    memcpy(buffer_get_buffer(buffer) + length_location, &message_length, 4);
+
+    if (safe) {
+        if (!add_last_error(self, buffer, request_id, collection_name,
+                            collection_name_length, last_error_args)) {
+            buffer_free(buffer);
+            PyMem_Free(collection_name);
+            return NULL;
+        }
+    }
+
+    PyMem_Free(collection_name);
+
+    /* objectify buffer */
+    result = Py_BuildValue("i" BYTES_FORMAT_STRING "i", request_id,
+                           buffer_get_buffer(buffer),
+                           buffer_get_position(buffer),
+                           max_size);
+    pool_return_buffer(buffer);
+    return result;
+}
+
+static PyObject* _cbson_kill_cursors_message(PyObject* self, PyObject* args) {
+    /* NOTE just using a random number as the request_id */
+    int request_id = rand();
+    PyObject* cursor_ids;
+    PyObject* sequence;
+    Py_ssize_t i;
+    int num_cursors;
+    long long cursor_id;
+    buffer_t buffer;
+    int length_location, message_length;
+    PyObject* result;
+
+    if (!PyArg_ParseTuple(args, "O", &cursor_ids)) {
+        return NULL;
+    }
+    sequence = PySequence_Fast(cursor_ids, "cursor_ids must be a sequence");
+    if (!sequence) {
+        return NULL;
+    }
+    num_cursors = (int)PySequence_Fast_GET_SIZE(sequence);
+
+    buffer = pool_get_buffer();
+    if (!buffer) {
+        PyErr_NoMemory();
+        Py_DECREF(sequence);
+        return NULL;
+    }
+
+    // save space for message length
+    length_location = buffer_save_space(buffer, 4);
+    if (length_location == -1) {
+        Py_DECREF(sequence);
+        buffer_free(buffer);
+        PyErr_NoMemory();
+        return NULL;
+    }
+    if (!buffer_write_bytes(buffer, (const char*)&request_id, 4) ||
+        !buffer_write_bytes(buffer,
+                            "\x00\x00\x00\x00"
+                            "\xd7\x07\x00\x00"
+                            "\x00\x00\x00\x00",
+                            12) ||
+        !buffer_write_bytes(buffer, (const char*)&num_cursors, 4)) {
+        buffer_free(buffer);
+        Py_DECREF(sequence);
+        return NULL;
+    }
+
+    for (i = 0; i < num_cursors; i++) {
+        cursor_id = PyLong_AsLongLong(PySequence_Fast_GET_ITEM(sequence, i));
+        if (cursor_id == -1 && PyErr_Occurred()) {
+            buffer_free(buffer);
+            Py_DECREF(sequence);
+            return NULL;
+        }
+        if (!buffer_write_bytes(buffer, (const char*)&cursor_id, 8)) {
+            buffer_free(buffer);
+            Py_DECREF(sequence);
+            return NULL;
+        }
+    }
+    Py_DECREF(sequence);
+
+    message_length = buffer_get_position(buffer) - length_location;
+    memcpy(buffer_get_buffer(buffer) + length_location, &message_length, 4);
+
+    /* objectify buffer */
+    result = Py_BuildValue("i" BYTES_FORMAT_STRING, request_id,
+                           buffer_get_buffer(buffer),
+                           buffer_get_position(buffer));
+    pool_return_buffer(buffer);
     return result;
 }
 
@@ -516,6 +716,10 @@ static PyMethodDef _CMessageMethods[] = {
      "create a query message to be sent to MongoDB"},
     {"_get_more_message", _cbson_get_more_message, METH_VARARGS,
      "create a get more message to be sent to MongoDB"},
+    {"_delete_message", _cbson_delete_message, METH_VARARGS,
+     "create a delete message to be sent to MongoDB"},
+    {"_kill_cursors_message", _cbson_kill_cursors_message, METH_VARARGS,
+     "create a kill cursors message to be sent to MongoDB"},
     {NULL, NULL, 0, NULL}
 };
 
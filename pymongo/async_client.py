@@ -0,0 +1,1048 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Asynchronous client for use with :mod:`asyncio`.
+
+Every operation returns an :class:`asyncio.Future`, so it can be awaited
+in a coroutine without blocking the event loop::
+
+  >>> client = AsyncMongoClient()
+  >>> async def count_hellos():
+  ...     await client.test.test.insert({"hello": "world"})
+  ...     return await client.test.test.find({"hello": "world"}).count()
+
+Messages are framed with :mod:`pymongo.message` and responses are
+decoded with :mod:`bson`, as they are for
+:class:`~pymongo.mongo_client.MongoClient`. Connections are asyncio
+transports kept in a pool, and responses are matched to requests by
+their ``responseTo`` field, so a single event loop can keep many
+operations in flight at once.
+
+On Python 2 the `trollius <https://pypi.python.org/pypi/trollius>`_
+backport of asyncio is used if it is installed.
+
+.. versionadded:: 2.5+
+"""
+
+import struct
+import sys
+from collections import deque
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+from bson.binary import ALL_UUID_SUBTYPES, OLD_UUID_SUBTYPE
+from bson.objectid import ObjectId
+from bson.son import SON
+from pymongo import common, helpers, message, uri_parser
+from pymongo.errors import (AutoReconnect,
+                            ConfigurationError,
+                            InvalidDocument,
+                            InvalidName,
+                            InvalidOperation,
+                            OperationFailure)
+
+HAS_ASYNCIO = asyncio is not None
+
+
+def _new_future(loop):
+    """Get a new Future attached to `loop`.
+    """
+    create_future = getattr(loop, "create_future", None)
+    if create_future is not None:
+        return create_future()
+    return asyncio.Future(loop=loop)
+
+
+def _copy_state(source, target):
+    """Resolve `target` the same way as the done Future `source`.
+    """
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _then(future, callback, loop):
+    """Get a Future for the result of calling `callback` with the result
+    of `future`. `callback` may return another Future to wait for.
+    """
+    result = _new_future(loop)
+
+    def on_done(done):
+        if result.done():
+            return
+        if done.cancelled() or done.exception() is not None:
+            _copy_state(done, result)
+            return
+        try:
+            value = callback(done.result())
+        except Exception:
+            result.set_exception(sys.exc_info()[1])
+            return
+        if isinstance(value, asyncio.Future):
+            value.add_done_callback(lambda f: _copy_state(f, result))
+        else:
+            result.set_result(value)
+
+    future.add_done_callback(on_done)
+    return result
+
+
+def _resolved(value, loop):
+    """Get a Future already resolved to `value`.
+    """
+    future = _new_future(loop)
+    future.set_result(value)
+    return future
+
+
+def _gather(futures, loop):
+    """Get a Future for the list of results of `futures`.
+
+    Waits for all of `futures`, then raises the first error if any of
+    them failed.
+    """
+    result = _new_future(loop)
+    remaining = [len(futures)]
+
+    def on_done(_):
+        remaining[0] -= 1
+        if remaining[0] or result.done():
+            return
+        for future in futures:
+            if future.cancelled() or future.exception() is not None:
+                _copy_state(future, result)
+                return
+        result.set_result([future.result() for future in futures])
+
+    if not futures:
+        result.set_result([])
+    for future in futures:
+        future.add_done_callback(on_done)
+    return result
+
+
+if HAS_ASYNCIO:
+    _Protocol = asyncio.Protocol
+else:
+    _Protocol = object
+
+
+class _Connection(_Protocol):
+    """A connection to the server.
+
+    Responses are matched to the Futures waiting for them by their
+    ``responseTo`` field.
+    """
+
+    def __init__(self, loop):
+        self.__loop = loop
+        self.__transport = None
+        self.__buffer = bytearray()
+        self.__pending = {}
+        self.closed = False
+
+    def connection_made(self, transport):
+        self.__transport = transport
+
+    def data_received(self, data):
+        buf = self.__buffer
+        buf.extend(data)
+        while len(buf) >= 16:
+            length, _, response_to, _ = struct.unpack("<iiii",
+                                                      bytes(buf[:16]))
+            if len(buf) < length:
+                break
+            response = bytes(buf[16:length])
+            del buf[:length]
+            future = self.__pending.pop(response_to, None)
+            if future is not None and not future.done():
+                future.set_result(response)
+
+    def connection_lost(self, exc):
+        self.closed = True
+        error = AutoReconnect(str(exc or "connection closed"))
+        pending, self.__pending = self.__pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def send(self, request_id, data, with_response):
+        """Send a message, returning a Future for its response if
+        `with_response` is ``True``.
+        """
+        if self.closed:
+            raise AutoReconnect("connection closed")
+        future = None
+        if with_response:
+            future = _new_future(self.__loop)
+            self.__pending[request_id] = future
+        if isinstance(data, list):
+            self.__transport.writelines(data)
+        else:
+            self.__transport.write(data)
+        return future
+
+    def close(self):
+        self.closed = True
+        if self.__transport is not None:
+            self.__transport.close()
+
+
+class _Pool(object):
+    """A pool of connections to one server.
+
+    An operation has a connection to itself until it gives it back, when
+    it is handed to the next operation waiting for one.
+    """
+
+    def __init__(self, host, port, max_size, loop):
+        self.__host = host
+        self.__port = port
+        self.__max_size = max_size
+        self.__loop = loop
+        self.__idle = []
+        self.__count = 0
+        self.__waiters = deque()
+
+    def __connect(self):
+        self.__count += 1
+        loop = self.__loop
+        connecting = loop.create_task(loop.create_connection(
+            lambda: _Connection(loop), self.__host, self.__port))
+        result = _new_future(loop)
+
+        def on_connect(done):
+            if done.cancelled() or done.exception() is not None:
+                self.__count -= 1
+                error = (not done.cancelled() and done.exception() or
+                         "connection cancelled")
+                if not result.done():
+                    result.set_exception(AutoReconnect(
+                        "could not connect to %s:%d: %s" %
+                        (self.__host, self.__port, error)))
+            elif result.done():
+                # Our caller went away.
+                self.release(done.result()[1])
+            else:
+                result.set_result(done.result()[1])
+
+        connecting.add_done_callback(on_connect)
+        return result
+
+    def acquire(self):
+        """Get a Future for a connection.
+        """
+        while self.__idle:
+            connection = self.__idle.pop()
+            if not connection.closed:
+                return _resolved(connection, self.__loop)
+            self.__count -= 1
+        if self.__count < self.__max_size:
+            return self.__connect()
+        waiter = _new_future(self.__loop)
+        self.__waiters.append(waiter)
+        return waiter
+
+    def release(self, connection):
+        """Give back a connection we are done with.
+        """
+        if connection.closed:
+            self.__count -= 1
+            while self.__waiters:
+                waiter = self.__waiters.popleft()
+                if not waiter.done():
+                    self.__connect().add_done_callback(
+                        lambda f: _copy_state(f, waiter))
+                    return
+            return
+        while self.__waiters:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(connection)
+                return
+        self.__idle.append(connection)
+
+    def close(self):
+        """Close the idle connections.
+        """
+        idle, self.__idle = self.__idle, []
+        for connection in idle:
+            self.__count -= 1
+            connection.close()
+
+
+class AsyncMongoClient(common.BaseObject):
+    """Asynchronous connection to a single MongoDB instance.
+    """
+
+    HOST = "localhost"
+    PORT = 27017
+
+    def __init__(self, host=None, port=None, max_pool_size=100,
+                 document_class=dict, tz_aware=False, loop=None, **kwargs):
+        """Create a new asynchronous client for the MongoDB instance at
+        *host:port*.
+
+        Connections are only made when operations need them, so
+        creating a client never blocks. Write concern options can be
+        passed as keyword arguments, as for
+        :class:`~pymongo.mongo_client.MongoClient`.
+
+        :Parameters:
+          - `host` (optional): hostname or IP address of the instance,
+            or a mongodb URI
+          - `port` (optional): port number on which to connect
+          - `max_pool_size` (optional): The maximum number of
+            connections the pool will open at once. Operations wait for
+            a connection once the limit is reached.
+          - `document_class` (optional): default class to use for
+            documents returned from queries on this client
+          - `tz_aware` (optional): if ``True``,
+            :class:`~datetime.datetime` instances returned as values
+            in a document by this client will be timezone aware
+          - `loop` (optional): the event loop to use, defaults to
+            :func:`asyncio.get_event_loop`
+        """
+        if not HAS_ASYNCIO:
+            raise ConfigurationError("The asyncio module is not available. "
+                                     "Install the trollius package from "
+                                     "PyPI on Python 2.")
+        if host is None:
+            host = self.HOST
+        if port is None:
+            port = self.PORT
+        if not isinstance(port, int):
+            raise TypeError("port must be an instance of int")
+
+        options = {}
+        if host.startswith(uri_parser.SCHEME):
+            res = uri_parser.parse_uri(host, port)
+            host, port = res["nodelist"][0]
+            options = res["options"]
+        for option, value in kwargs.iteritems():
+            option, value = common.validate(option, value)
+            options[option] = value
+
+        if loop is None:
+            loop = asyncio.get_event_loop()
+
+        self.__host = host
+        self.__port = port
+        self.__loop = loop
+        self.__document_class = document_class
+        self.__tz_aware = common.validate_boolean('tz_aware', tz_aware)
+        self.__max_pool_size = common.validate_positive_integer(
+            'max_pool_size', max_pool_size)
+        self.__pool = _Pool(host, port, self.__max_pool_size, loop)
+
+        super(AsyncMongoClient, self).__init__(**options)
+
+    @property
+    def host(self):
+        """Hostname of the connected instance.
+        """
+        return self.__host
+
+    @property
+    def port(self):
+        """Port of the connected instance.
+        """
+        return self.__port
+
+    @property
+    def loop(self):
+        """The event loop this client runs on.
+        """
+        return self.__loop
+
+    @property
+    def max_pool_size(self):
+        """The maximum number of connections this client opens at once.
+        """
+        return self.__max_pool_size
+
+    @property
+    def document_class(self):
+        """Default class to use for documents returned from this client.
+        """
+        return self.__document_class
+
+    @property
+    def tz_aware(self):
+        """Does this client return timezone-aware datetimes?
+        """
+        return self.__tz_aware
+
+    @property
+    def max_bson_size(self):
+        """The largest BSON document sent to the server, 16MB.
+        """
+        return 16 * 1024 * 1024
+
+    @property
+    def max_message_size(self):
+        """The largest message sent to the server, 48MB.
+        """
+        return 48 * 1024 * 1024
+
+    @property
+    def max_write_batch_size(self):
+        """The most documents sent to the server in one insert message.
+        """
+        return common.MAX_WRITE_BATCH_SIZE
+
+    def __repr__(self):
+        return "AsyncMongoClient(%r, %r)" % (self.__host, self.__port)
+
+    def __getattr__(self, name):
+        """Get a database by name.
+
+        :Parameters:
+          - `name`: the name of the database to get
+        """
+        return AsyncDatabase(self, name)
+
+    def __getitem__(self, name):
+        """Get a database by name.
+
+        :Parameters:
+          - `name`: the name of the database to get
+        """
+        return self.__getattr__(name)
+
+    def close(self):
+        """Close the idle connections in the pool.
+
+        Connections in use are closed when they are given back.
+        """
+        self.__pool.close()
+
+    def _send_messages(self, messages):
+        """Send several messages back to back on one connection.
+
+        `messages` is a list of ``(message, with_response)`` pairs.
+        Returns a Future for the list of responses, with ``None`` for
+        messages sent without waiting for a response.
+        """
+        loop = self.__loop
+        pool = self.__pool
+
+        def send(connection):
+            futures = []
+            try:
+                for msg, with_response in messages:
+                    if len(msg) == 3:
+                        (request_id, data, max_doc_size) = msg
+                        if max_doc_size > self.max_bson_size:
+                            raise InvalidDocument(
+                                "BSON document too large (%d bytes)"
+                                " - the connected server supports"
+                                " BSON document sizes up to %d"
+                                " bytes." %
+                                (max_doc_size, self.max_bson_size))
+                    else:
+                        (request_id, data) = msg
+                    futures.append(connection.send(request_id, data,
+                                                   with_response))
+            except:
+                connection.close()
+                pool.release(connection)
+                raise
+
+            waiting = [future for future in futures if future is not None]
+            gathered = _gather(waiting, loop)
+
+            def on_done(_):
+                pool.release(connection)
+            gathered.add_done_callback(on_done)
+
+            def responses(received):
+                received = iter(received)
+                return [future is not None and received.next() or None
+                        for future in futures]
+            return _then(gathered, responses, loop)
+
+        return _then(pool.acquire(), send, loop)
+
+    def _send_message(self, msg, with_last_error=False):
+        """Send a write message, returning a Future for the response
+        from lastError, or ``None`` if `with_last_error` is ``False``.
+        """
+        def check(responses):
+            if not with_last_error:
+                return None
+            return helpers._check_response_to_last_error(responses[0],
+                                                         None)
+        return _then(self._send_messages([(msg, with_last_error)]),
+                     check, self.__loop)
+
+    def _send_message_with_response(self, msg):
+        """Send a query or getmore message, returning a Future for the
+        response.
+        """
+        return _then(self._send_messages([(msg, True)]),
+                     lambda responses: responses[0], self.__loop)
+
+
+class AsyncDatabase(common.BaseObject):
+    """A MongoDB database used through an :class:`AsyncMongoClient`.
+    """
+
+    def __init__(self, client, name):
+        """Get a database by client and name.
+
+        :Parameters:
+          - `client`: an :class:`AsyncMongoClient`
+          - `name`: database name
+        """
+        super(AsyncDatabase,
+              self).__init__(safe=client.safe, **client.write_concern)
+
+        if not isinstance(name, basestring):
+            raise TypeError("name must be an instance "
+                            "of %s" % (basestring.__name__,))
+        if not name or "." in name or " " in name or "$" in name:
+            raise InvalidName("database name %r is invalid" % (name,))
+
+        self.__name = unicode(name)
+        self.__client = client
+
+    @property
+    def name(self):
+        """The name of this database.
+        """
+        return self.__name
+
+    @property
+    def client(self):
+        """The :class:`AsyncMongoClient` for this database.
+        """
+        return self.__client
+
+    def __repr__(self):
+        return "AsyncDatabase(%r, %r)" % (self.__client, self.__name)
+
+    def __getattr__(self, name):
+        """Get a collection of this database by name.
+
+        :Parameters:
+          - `name`: the name of the collection to get
+        """
+        return AsyncCollection(self, name)
+
+    def __getitem__(self, name):
+        """Get a collection of this database by name.
+
+        :Parameters:
+          - `name`: the name of the collection to get
+        """
+        return self.__getattr__(name)
+
+    def command(self, command, value=1, check=True, **kwargs):
+        """Issue a MongoDB command.
+
+        Takes the same arguments as
+        :meth:`~pymongo.database.Database.command`, except for read
+        preferences. Returns a Future for the response to the command.
+        """
+        if isinstance(command, basestring):
+            command = SON([(command, value)])
+        command.update(kwargs)
+        msg = message.query(0, self.__name + ".$cmd", 0, -1, command)
+
+        def unpack(response):
+            result = helpers._unpack_response(response)["data"][0]
+            if check:
+                msg = "command %s failed: %%s" % repr(command).replace("%",
+                                                                      "%%")
+                helpers._check_command_response(result, None, msg)
+            return result
+        return _then(self.__client._send_message_with_response(msg),
+                     unpack, self.__client.loop)
+
+
+class AsyncCollection(common.BaseObject):
+    """A MongoDB collection used through an :class:`AsyncMongoClient`.
+    """
+
+    def __init__(self, database, name):
+        """Get a collection by database and name.
+
+        :Parameters:
+          - `database`: the :class:`AsyncDatabase` the collection is in
+          - `name`: the name of the collection
+        """
+        super(AsyncCollection,
+              self).__init__(safe=database.safe, **database.write_concern)
+
+        if not isinstance(name, basestring):
+            raise TypeError("name must be an instance "
+                            "of %s" % (basestring.__name__,))
+        if not name or ".." in name or "$" in name:
+            raise InvalidName("collection name %r is invalid" % (name,))
+
+        self.__database = database
+        self.__name = unicode(name)
+        self.__uuid_subtype = OLD_UUID_SUBTYPE
+        self.__full_name = u"%s.%s" % (database.name, self.__name)
+
+    @property
+    def name(self):
+        """The name of this collection.
+        """
+        return self.__name
+
+    @property
+    def full_name(self):
+        """The full name of this collection, ``<database>.<name>``.
+        """
+        return self.__full_name
+
+    @property
+    def database(self):
+        """The :class:`AsyncDatabase` this collection is in.
+        """
+        return self.__database
+
+    def __get_uuid_subtype(self):
+        return self.__uuid_subtype
+
+    def __set_uuid_subtype(self, subtype):
+        if subtype not in ALL_UUID_SUBTYPES:
+            raise ConfigurationError("Not a valid setting for uuid_subtype.")
+        self.__uuid_subtype = subtype
+
+    uuid_subtype = property(__get_uuid_subtype, __set_uuid_subtype,
+                            doc="""The BSON Binary subtype used when storing
+                            UUIDs, as for
+                            :attr:`~pymongo.collection.Collection.uuid_subtype`.
+                            """)
+
+    def __repr__(self):
+        return "AsyncCollection(%r, %r)" % (self.__database, self.__name)
+
+    def __getattr__(self, name):
+        """Get a sub-collection of this collection by name.
+
+        :Parameters:
+          - `name`: the name of the collection to get
+        """
+        return AsyncCollection(self.__database,
+                               u"%s.%s" % (self.__name, name))
+
+    def __getitem__(self, name):
+        return self.__getattr__(name)
+
+    def insert(self, doc_or_docs, manipulate=True, check_keys=True,
+               continue_on_error=False, **kwargs):
+        """Insert a document(s) into this collection.
+
+        Takes the same arguments as
+        :meth:`~pymongo.collection.Collection.insert`. If `manipulate`
+        is ``True`` an ``"_id"`` is added to documents without one.
+        Returns a Future for the ``"_id"`` (or list of ``"_id"`` values)
+        of `doc_or_docs`.
+
+        Documents are split into batches the same way as
+        :meth:`~pymongo.collection.Collection.insert`. Unless
+        `continue_on_error` is ``True``, each batch waits for lastError
+        before the next is sent, and no more are sent after a failure.
+        """
+        docs = doc_or_docs
+        return_one = False
+        if isinstance(docs, dict):
+            return_one = True
+            docs = [docs]
+        docs = list(docs)
+        if manipulate:
+            for doc in docs:
+                if "_id" not in doc:
+                    doc["_id"] = ObjectId()
+        if not docs:
+            raise InvalidOperation("cannot do an empty bulk insert")
+
+        ids = [doc.get("_id") for doc in docs]
+        if return_one:
+            result = ids[0]
+        else:
+            result = ids
+
+        safe, options = self._get_write_mode(None, **kwargs)
+        client = self.__database.client
+        batches = message._insert_batches(self.__full_name, docs,
+                                          check_keys, safe, options,
+                                          continue_on_error,
+                                          self.uuid_subtype, client)
+
+        # Like message._do_batched_insert, but waiting for each batch's
+        # lastError response before sending the next batch.
+        last_error = [None]
+
+        def send_next(responses):
+            if responses and responses[0] is not None:
+                try:
+                    helpers._check_response_to_last_error(responses[0],
+                                                          None)
+                except OperationFailure, e:
+                    if continue_on_error:
+                        last_error[0] = e
+                    elif not safe:
+                        return result
+                    else:
+                        raise
+            try:
+                batch = batches.next()
+            except StopIteration:
+                if last_error[0] is not None:
+                    raise last_error[0]
+                return result
+            return _then(client._send_messages([batch]), send_next,
+                         client.loop)
+        return send_next([])
+
+    def update(self, spec, document, upsert=False, multi=False,
+               check_keys=True, **kwargs):
+        """Update a document(s) in this collection.
+
+        Takes the same arguments as
+        :meth:`~pymongo.collection.Collection.update`, except
+        `manipulate`. Returns a Future for the response to lastError, or
+        for ``None`` if write acknowledgement is disabled.
+        """
+        if not isinstance(spec, dict):
+            raise TypeError("spec must be an instance of dict")
+        if not isinstance(document, dict):
+            raise TypeError("document must be an instance of dict")
+        if not isinstance(upsert, bool):
+            raise TypeError("upsert must be an instance of bool")
+
+        safe, options = self._get_write_mode(None, **kwargs)
+        if document:
+            # Skip key validation for modify operations, as
+            # Collection.update does.
+            first = (document.iterkeys()).next()
+            if first.startswith('$'):
+                check_keys = False
+
+        return self.__database.client._send_message(
+            message.update(self.__full_name, upsert, multi,
+                           spec, document, safe, options,
+                           check_keys, self.uuid_subtype), safe)
+
+    def remove(self, spec_or_id=None, **kwargs):
+        """Remove a document(s) from this collection.
+
+        Takes the same arguments as
+        :meth:`~pymongo.collection.Collection.remove`. Returns a Future
+        for the response to lastError, or for ``None`` if write
+        acknowledgement is disabled.
+        """
+        if spec_or_id is None:
+            spec_or_id = {}
+        if not isinstance(spec_or_id, dict):
+            spec_or_id = {"_id": spec_or_id}
+
+        safe, options = self._get_write_mode(None, **kwargs)
+        return self.__database.client._send_message(
+            message.delete(self.__full_name, spec_or_id, safe,
+                           options, self.uuid_subtype), safe)
+
+    def find(self, *args, **kwargs):
+        """Query the database.
+
+        Takes the same `spec`, `fields`, `skip`, `limit`, `sort` and
+        `as_class` arguments as :meth:`~pymongo.collection.Collection.find`.
+        Returns an :class:`AsyncCursor`.
+        """
+        return AsyncCursor(self, *args, **kwargs)
+
+    def find_one(self, spec_or_id=None, *args, **kwargs):
+        """Get a single document from the database.
+
+        Takes the same arguments as :meth:`find`. Returns a Future for
+        the document, or for ``None`` if no document matches.
+        """
+        if spec_or_id is not None and not isinstance(spec_or_id, dict):
+            spec_or_id = {"_id": spec_or_id}
+
+        cursor = self.find(spec_or_id, *args, **kwargs).limit(-1)
+
+        def first(docs):
+            if docs:
+                return docs[0]
+            return None
+        return _then(cursor.to_list(), first,
+                     self.__database.client.loop)
+
+    def count(self):
+        """Get a Future for the number of documents in this collection.
+        """
+        return self.find().count()
+
+
+class AsyncCursor(object):
+    """An asynchronous cursor over query results.
+
+    Iterate with :meth:`fetch_next` and :meth:`next_object`::
+
+      >>> cursor = collection.find()
+      >>> while await cursor.fetch_next():
+      ...     doc = cursor.next_object()
+
+    or get all the results at once with :meth:`to_list`.
+    """
+
+    def __init__(self, collection, spec=None, fields=None, skip=0, limit=0,
+                 sort=None, as_class=None, batch_size=0):
+        """Create a new cursor.
+
+        Should not be called directly by application developers - see
+        :meth:`AsyncCollection.find` instead.
+        """
+        if spec is None:
+            spec = {}
+        if not isinstance(spec, dict):
+            raise TypeError("spec must be an instance of dict")
+        if not isinstance(skip, int):
+            raise TypeError("skip must be an instance of int")
+        if not isinstance(limit, int):
+            raise TypeError("limit must be an instance of int")
+
+        if fields is not None:
+            if not fields:
+                fields = {"_id": 1}
+            if not isinstance(fields, dict):
+                fields = helpers._fields_list_to_dict(fields)
+
+        client = collection.database.client
+        if as_class is None:
+            as_class = client.document_class
+
+        self.__collection = collection
+        self.__client = client
+        self.__spec = spec
+        self.__fields = fields
+        self.__skip = skip
+        self.__limit = limit
+        self.__batch_size = batch_size
+        self.__ordering = sort and helpers._index_document(sort) or None
+        self.__as_class = as_class
+        self.__tz_aware = client.tz_aware
+        self.__uuid_subtype = collection.uuid_subtype
+
+        self.__id = None
+        self.__data = deque()
+        self.__retrieved = 0
+        self.__killed = False
+        self.__fetching = None
+
+    @property
+    def collection(self):
+        """The :class:`AsyncCollection` this cursor queries.
+        """
+        return self.__collection
+
+    @property
+    def alive(self):
+        """Does this cursor have the potential to return more data?
+        """
+        return bool(len(self.__data) or (not self.__killed))
+
+    def __check_okay_to_chain(self):
+        if self.__id is not None or self.__fetching is not None:
+            raise InvalidOperation("cannot set options after executing query")
+
+    def limit(self, limit):
+        """Limits the number of results to be returned by this cursor.
+        """
+        if not isinstance(limit, int):
+            raise TypeError("limit must be an int")
+        self.__check_okay_to_chain()
+        self.__limit = limit
+        return self
+
+    def skip(self, skip):
+        """Skips the first `skip` results of this cursor.
+        """
+        if not isinstance(skip, int):
+            raise TypeError("skip must be an int")
+        self.__check_okay_to_chain()
+        self.__skip = skip
+        return self
+
+    def batch_size(self, batch_size):
+        """Limits the number of documents returned in one batch.
+        """
+        if not isinstance(batch_size, int):
+            raise TypeError("batch_size must be an int")
+        if batch_size < 0:
+            raise ValueError("batch_size must be >= 0")
+        self.__check_okay_to_chain()
+        self.__batch_size = batch_size == 1 and 2 or batch_size
+        return self
+
+    def sort(self, key_or_list, direction=None):
+        """Sorts this cursor's results.
+
+        Takes the same arguments as :meth:`~pymongo.cursor.Cursor.sort`.
+        """
+        self.__check_okay_to_chain()
+        keys = helpers._index_list(key_or_list, direction)
+        self.__ordering = helpers._index_document(keys)
+        return self
+
+    def count(self):
+        """Get a Future for the number of documents matching this
+        cursor's query, ignoring `skip` and `limit`.
+        """
+        command = SON([("count", self.__collection.name),
+                       ("query", self.__spec),
+                       ("fields", self.__fields)])
+
+        def get_count(result):
+            return int(result.get("n", 0))
+        database = self.__collection.database
+        return _then(database.command(command,
+                                      allowable_errors=["ns missing"]),
+                     get_count, self.__client.loop)
+
+    def __query_spec(self):
+        if self.__ordering:
+            return SON([("$query", self.__spec),
+                        ("$orderby", self.__ordering)])
+        return self.__spec
+
+    def fetch_next(self):
+        """Get a Future for whether there is another document to get with
+        :meth:`next_object`, fetching the next batch from the server if
+        needed.
+        """
+        loop = self.__client.loop
+        if len(self.__data) or self.__killed:
+            return _resolved(bool(len(self.__data)), loop)
+        if self.__fetching is not None:
+            # Don't send another message until we have this response.
+            return _then(self.__fetching, lambda _: self.fetch_next(), loop)
+
+        if self.__id is None:  # Query
+            ntoreturn = self.__batch_size
+            if self.__limit:
+                if self.__batch_size:
+                    ntoreturn = min(self.__limit, self.__batch_size)
+                else:
+                    ntoreturn = self.__limit
+            msg = message.query(0, self.__collection.full_name,
+                                self.__skip, ntoreturn,
+                                self.__query_spec(), self.__fields,
+                                self.__uuid_subtype)
+        else:  # Get More
+            if self.__limit:
+                limit = self.__limit - self.__retrieved
+                if self.__batch_size:
+                    limit = min(limit, self.__batch_size)
+            else:
+                limit = self.__batch_size
+            msg = message.get_more(self.__collection.full_name,
+                                   limit, self.__id)
+        def unpack(response):
+            try:
+                response = helpers._unpack_response(response, self.__id,
+                                                    self.__as_class,
+                                                    self.__tz_aware,
+                                                    self.__uuid_subtype)
+            except:
+                self.__killed = True
+                raise
+            self.__id = response["cursor_id"]
+            self.__retrieved += response["number_returned"]
+            self.__data = deque(response["data"])
+            if not self.__id:
+                self.__killed = True
+            elif self.__limit and self.__limit <= self.__retrieved:
+                return _then(self.close(),
+                             lambda _: bool(len(self.__data)), loop)
+            return bool(len(self.__data))
+
+        def on_error(future):
+            if future.exception() is not None:
+                self.__killed = True
+
+        def on_fetched(_):
+            self.__fetching = None
+
+        sent = self.__client._send_message_with_response(msg)
+        sent.add_done_callback(on_error)
+        fetching = _then(sent, unpack, loop)
+        fetching.add_done_callback(on_fetched)
+        self.__fetching = fetching
+        return fetching
+
+    def next_object(self):
+        """Get the next document fetched by :meth:`fetch_next`, or
+        ``None`` if there isn't one.
+        """
+        if not self.__data:
+            return None
+        return self.__data.popleft()
+
+    def to_list(self, length=None):
+        """Get a Future for a list of the remaining documents, or of at
+        most `length` documents.
+        """
+        loop = self.__client.loop
+        docs = []
+        result = _new_future(loop)
+
+        def fetch():
+            while len(self.__data) and (length is None or
+                                        len(docs) < length):
+                docs.append(self.__data.popleft())
+            if length is not None and len(docs) >= length:
+                result.set_result(docs)
+                return
+            self.fetch_next().add_done_callback(on_fetched)
+
+        def on_fetched(future):
+            if future.exception() is not None:
+                result.set_exception(future.exception())
+            elif not future.result():
+                result.set_result(docs)
+            else:
+                fetch()
+
+        fetch()
+        return result
+
+    def close(self):
+        """Kill this cursor on the server. Returns a Future that is done
+        once the message is sent.
+        """
+        loop = self.__client.loop
+        cursor_id, self.__killed = self.__id, True
+        if not cursor_id:
+            return _resolved(None, loop)
+        return _then(self.__client._send_messages(
+                         [(message.kill_cursors([cursor_id]), False)]),
+                     lambda _: None, loop)
@@ -14,16 +14,23 @@
 
 """Collection level utilities for Mongo."""
 
+import calendar
+import datetime
+import itertools
 import warnings
 
+import pymongo
 from bson.binary import ALL_UUID_SUBTYPES, OLD_UUID_SUBTYPE
 from bson.code import Code
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
 from bson.son import SON
 from pymongo import (common,
                      helpers,
                      message)
 from pymongo.cursor import Cursor
 from pymongo.errors import ConfigurationError, InvalidName
+from pymongo.write_batch import WriteBatch
 
 
 try:
@@ -33,6 +40,10 @@ except ImportError:
     ordered_types = SON
 
 
+# The number of documents given new ObjectIds at once by insert.
+_ID_BATCH_SIZE = 1000
+
+
 def _gen_index_name(keys):
     """Generate an index name from the set of fields it is over.
     """
@@ -297,7 +308,10 @@ class Collection(common.BaseObject):
           - `doc_or_docs`: a document or list of documents to be
             inserted
           - `manipulate` (optional): If ``True`` manipulate the documents
-            before inserting.
+            before inserting. Instances of
+            :class:`~bson.raw_bson.RawBSONDocument` are read-only and are
+            never manipulated; they are sent without being re-encoded and
+            must already include an ``'_id'`` field.
           - `safe` (optional): **DEPRECATED** - Use `w` instead.
           - `check_keys` (optional): If ``True`` check if keys start with '$'
             or contain '.', raising :class:`~pymongo.errors.InvalidName` in
@@ -331,6 +345,14 @@ class Collection(common.BaseObject):
 
         .. note:: `continue_on_error` requires server version **>= 1.9.1**
 
+        .. versionchanged:: 2.5+
+           Support for inserting :class:`~bson.raw_bson.RawBSONDocument`.
+           Documents are read from `doc_or_docs` 1000 at a time, so that
+           new ``'_id'`` values can be generated in one batch, or one at
+           a time if SON manipulators other than the default ``'_id'``
+           injector are in use. They are sent in as many insert messages
+           as needed to stay within the server's maximum message size and
+           write batch size.
         .. versionadded:: 2.1
            Support for continue_on_error.
         .. versionadded:: 1.8
@@ -341,24 +363,75 @@ class Collection(common.BaseObject):
 
         .. mongodoc:: insert
         """
+        safe, options = self._get_write_mode(safe, **kwargs)
+        return self._insert(doc_or_docs, manipulate, check_keys, safe,
+                            options, continue_on_error,
+                            self.__database.connection)
+
+    def _insert(self, doc_or_docs, manipulate, check_keys, safe, options,
+                continue_on_error, sender):
+        """Insert `doc_or_docs`, sending the messages with
+        `sender._send_message`.
+        """
         docs = doc_or_docs
         return_one = False
-        if isinstance(docs, dict):
+        if isinstance(docs, (dict, RawBSONDocument)):
             return_one = True
             docs = [docs]
 
-        if manipulate:
-            docs = [self.__database._fix_incoming(doc, self) for doc in docs]
-
-        safe, options = self._get_write_mode(safe, **kwargs)
-        self.__database.connection._send_message(
-            message.insert(self.__full_name, docs,
-                           check_keys, safe, options,
-                           continue_on_error, self.__uuid_subtype), safe)
+        ids = []
+
+        def gen():
+            if not manipulate:
+                for doc in docs:
+                    ids.append(doc.get("_id", None))
+                    yield doc
+                return
+
+            if not self.__database._only_injects_ids():
+                # Other manipulators may set the "_id" themselves.
+                for doc in docs:
+                    doc = self.__fix_incoming(doc)
+                    ids.append(doc.get("_id", None))
+                    yield doc
+                return
+
+            iterator = iter(docs)
+            while True:
+                chunk = list(itertools.islice(iterator, _ID_BATCH_SIZE))
+                if not chunk:
+                    return
+                self.__add_ids(chunk)
+                for doc in chunk:
+                    doc = self.__fix_incoming(doc)
+                    ids.append(doc.get("_id", None))
+                    yield doc
+
+        message._do_batched_insert(self.__full_name, gen(), check_keys,
+                                   safe, options, continue_on_error,
+                                   self.__uuid_subtype, sender)
 
-        ids = [doc.get("_id", None) for doc in docs]
         return return_one and ids[0] or ids
 
+    def __add_ids(self, docs):
+        """Give the documents in `docs` that have no ``"_id"`` a new
+        :class:`~bson.objectid.ObjectId`, generating them in one batch.
+        """
+        missing = [doc for doc in docs if not
+                   isinstance(doc, RawBSONDocument) and "_id" not in doc]
+        if len(missing) > 1:
+            oids = ObjectId.generate_batch(len(missing))
+            for doc, oid in zip(missing, oids):
+                doc["_id"] = oid
+
+    def __fix_incoming(self, doc):
+        """Apply incoming SON manipulators to `doc`, unless it is a
+        :class:`~bson.raw_bson.RawBSONDocument`.
+        """
+        if isinstance(doc, RawBSONDocument):
+            return doc
+        return self.__database._fix_incoming(doc, self)
+
     def update(self, spec, document, upsert=False, manipulate=False,
                safe=None, multi=False, check_keys=True, **kwargs):
         """Update a document(s) in this collection.
@@ -451,6 +524,16 @@ class Collection(common.BaseObject):
 
         .. mongodoc:: update
         """
+        safe, options = self._get_write_mode(safe, **kwargs)
+        return self._update(spec, document, upsert, manipulate, safe,
+                            options, multi, check_keys,
+                            self.__database.connection)
+
+    def _update(self, spec, document, upsert, manipulate, safe, options,
+                multi, check_keys, sender):
+        """Update documents matching `spec`, sending the message with
+        `sender._send_message`.
+        """
         if not isinstance(spec, dict):
             raise TypeError("spec must be an instance of dict")
         if not isinstance(document, dict):
@@ -461,8 +544,6 @@ class Collection(common.BaseObject):
         if manipulate:
             document = self.__database._fix_incoming(document, self)
 
-        safe, options = self._get_write_mode(safe, **kwargs)
-
         if document:
             # If a top level key begins with '$' this is a modify operation
             # and we should skip key validation. It doesn't matter which key
@@ -473,11 +554,31 @@ class Collection(common.BaseObject):
             if first.startswith('$'):
                 check_keys = False
 
-        return self.__database.connection._send_message(
+        return sender._send_message(
             message.update(self.__full_name, upsert, multi,
                            spec, document, safe, options,
                            check_keys, self.__uuid_subtype), safe)
 
+    def write_batch(self, safe=None, **kwargs):
+        """Get a :class:`~pymongo.write_batch.WriteBatch` to pipeline
+        writes to this collection.
+
+        Inserts, updates and removes queued on the batch are sent back to
+        back on one socket when the ``with`` block exits, and are
+        acknowledged in a single round trip::
+
+          >>> with db.test.write_batch(w=1) as batch:
+          ...     for doc in docs:
+          ...         batch.update({"_id": doc["_id"]}, doc, upsert=True)
+
+        Write concern options can be passed as keyword arguments,
+        overriding any global defaults, and apply to every write in the
+        batch. See :meth:`insert` for the valid options.
+
+        .. versionadded:: 2.5+
+        """
+        return WriteBatch(self, safe, **kwargs)
+
     def drop(self):
         """Alias for :meth:`~pymongo.database.Database.drop_collection`.
 
@@ -552,13 +653,20 @@ class Collection(common.BaseObject):
 
         .. mongodoc:: remove
         """
+        safe, options = self._get_write_mode(safe, **kwargs)
+        return self._remove(spec_or_id, safe, options,
+                            self.__database.connection)
+
+    def _remove(self, spec_or_id, safe, options, sender):
+        """Remove documents matching `spec_or_id`, sending the message
+        with `sender._send_message`.
+        """
         if spec_or_id is None:
             spec_or_id = {}
         if not isinstance(spec_or_id, dict):
             spec_or_id = {"_id": spec_or_id}
 
-        safe, options = self._get_write_mode(safe, **kwargs)
-        return self.__database.connection._send_message(
+        return sender._send_message(
             message.delete(self.__full_name, spec_or_id, safe,
                            options, self.__uuid_subtype), safe)
 
@@ -716,6 +824,94 @@ class Collection(common.BaseObject):
                 self.secondary_acceptable_latency_ms)
         return Cursor(self, *args, **kwargs)
 
+    def parallel_find(self, n, spec=None, *args, **kwargs):
+        """Query the database with `n` cursors, each over a different
+        range of ``"_id"`` values.
+
+        Returns a list of at most `n` :class:`~pymongo.cursor.Cursor`
+        instances that together return every document matching `spec`,
+        and can be iterated at the same time, e.g. each in its own
+        thread. Use :func:`~pymongo.parallel.merge_cursors` to iterate
+        over all of them at once.
+
+        If ``"_id"`` values are all :class:`~bson.objectid.ObjectId`
+        instances the ranges split the time span over which they were
+        generated. Otherwise the ranges are found by skipping through the
+        documents matching `spec` in ``"_id"`` order, so they hold about
+        the same number of documents.
+
+        The ranges are set with :meth:`~pymongo.cursor.Cursor.min` and
+        :meth:`~pymongo.cursor.Cursor.max`, so the cursors can't be
+        given a `hint` for an index other than the ``"_id"`` index.
+
+        :Parameters:
+          - `n`: the number of cursors to split the query into
+          - `spec` (optional): a SON object specifying elements which
+            must be present for a document to be included in the
+            result set
+          - `*args` (optional): any additional positional arguments
+            are the same as the arguments to :meth:`find`.
+          - `**kwargs` (optional): any additional keyword arguments
+            are the same as the arguments to :meth:`find`.
+
+        .. versionadded:: 2.5+
+        """
+        if not isinstance(n, (int, long)):
+            raise TypeError("n must be an instance of int")
+        if n < 1:
+            raise ValueError("n must be >= 1")
+
+        bounds = self.__split_ids(n, spec)
+        cursors = []
+        for lower, upper in zip([None] + bounds, bounds + [None]):
+            cursor = self.find(spec, *args, **kwargs)
+            if lower is not None:
+                cursor.min([("_id", lower)])
+            if upper is not None:
+                cursor.max([("_id", upper)])
+            cursors.append(cursor)
+        return cursors
+
+    def __split_ids(self, n, spec):
+        """Get the ``"_id"`` values splitting the documents matching
+        `spec` into at most `n` ranges.
+        """
+        if n == 1:
+            return []
+
+        def find_id(direction, skip=0):
+            cursor = self.find(spec, ["_id"], as_class=dict)
+            for doc in cursor.sort("_id", direction).skip(skip).limit(-1):
+                return doc["_id"]
+            return None
+
+        lowest = find_id(pymongo.ASCENDING)
+        if lowest is None:
+            return []
+        highest = find_id(pymongo.DESCENDING)
+
+        if isinstance(lowest, ObjectId) and isinstance(highest, ObjectId):
+            start = calendar.timegm(lowest.generation_time.timetuple())
+            end = calendar.timegm(highest.generation_time.timetuple())
+            if end - start >= n:
+                step = (end - start) / float(n)
+                return [ObjectId.from_datetime(
+                            datetime.datetime.utcfromtimestamp(
+                                start + int(step * i)))
+                        for i in range(1, n)]
+
+        count = self.find(spec).count()
+        bounds = []
+        for i in range(1, n):
+            skip = count * i // n
+            if not skip:
+                continue
+            _id = find_id(pymongo.ASCENDING, skip)
+            if _id is None or (bounds and bounds[-1] == _id):
+                continue
+            bounds.append(_id)
+        return bounds
+
     def count(self):
         """Get the number of documents in this collection.
 
@@ -16,12 +16,17 @@
 """Functions and classes common to multiple pymongo modules."""
 import sys
 import warnings
-from pymongo import read_preferences
+from pymongo import monitoring, read_preferences
 
 from pymongo.auth import MECHANISMS
 from pymongo.read_preferences import ReadPreference
 from pymongo.errors import ConfigurationError
 
+# Defaults until we connect to a server and get updated limits.
+MAX_BSON_SIZE = 4 * (1024 ** 2)
+MAX_MESSAGE_SIZE = 2 * MAX_BSON_SIZE
+MAX_WRITE_BATCH_SIZE = 1000
+
 HAS_SSL = True
 try:
     import ssl
@@ -172,6 +177,17 @@ def validate_read_preference(dummy, value):
         raise ConfigurationError("Not a valid read preference")
 
 
+def validate_event_listeners(option, value):
+    """Validate a list of event listeners.
+    """
+    if not isinstance(value, (list, tuple)):
+        raise ConfigurationError("%s must be a list of "
+                                 "listeners" % (option,))
+    for listener in value:
+        monitoring.validate_listener(option, listener)
+    return list(value)
+
+
 def validate_tag_sets(dummy, value):
     """Validate tag sets for a ReplicaSetConnection.
     """
@@ -247,6 +263,10 @@ VALIDATORS = {
     'sockettimeoutms': validate_timeout_or_none,
     'waitqueuetimeoutms': validate_timeout_or_none,
     'waitqueuemultiple': validate_positive_integer_or_none,
+    'min_pool_size': validate_positive_integer,
+    'maxidletimems': validate_timeout_or_none,
+    'event_listeners': validate_event_listeners,
+    'latency_histograms': validate_boolean,
     'ssl': validate_boolean,
     'ssl_keyfile': validate_readable,
     'ssl_certfile': validate_readable,
@@ -14,12 +14,15 @@
 
 """Cursor class to iterate over Mongo query results."""
 import copy
+import sys
+import threading
+import time
 from collections import deque
 
 from bson import RE_TYPE
 from bson.code import Code
 from bson.son import SON
-from pymongo import helpers, message, read_preferences
+from pymongo import helpers, message, read_preferences, thread_util
 from pymongo.read_preferences import ReadPreference, secondary_ok_commands
 from pymongo.errors import (InvalidOperation,
                             AutoReconnect)
@@ -34,6 +37,106 @@ _QUERY_OPTIONS = {
     "partial": 128}
 
 
+class _Prefetch(object):
+    """Sends a message in the background and holds on to the response.
+    """
+
+    def __init__(self, send, message, thread_support_module):
+        self.__response = None
+        self.__error = None
+        self.__lock = threading.Lock()
+        self.__done = False
+        self.__on_done = None
+        self.__worker = thread_util.spawn(thread_support_module,
+                                          self.__run, send, message)
+
+    def __run(self, send, message):
+        try:
+            self.__response = send(message)
+        except Exception:
+            self.__error = sys.exc_info()[1]
+
+        self.__lock.acquire()
+        try:
+            self.__done = True
+            on_done = self.__on_done
+        finally:
+            self.__lock.release()
+        if on_done is not None:
+            _call_quietly(on_done)
+
+    def get(self):
+        """Wait for the response, raising any error sending the message.
+        """
+        self.__worker.join()
+        if self.__error is not None:
+            raise self.__error
+        return self.__response
+
+    def discard(self, on_done=None):
+        """Drop the response without waiting for it.
+
+        `on_done`, if given, is called once the response has arrived: in
+        the background, or right away if it already has.
+        """
+        self.__lock.acquire()
+        try:
+            if not self.__done:
+                self.__on_done = on_done
+                return
+        finally:
+            self.__lock.release()
+        if on_done is not None:
+            _call_quietly(on_done)
+
+
+def _call_quietly(function):
+    try:
+        function()
+    except Exception:
+        pass
+
+
+class CursorStats(object):
+    """Where the time iterating a :class:`Cursor` went.
+
+      - `queries`, `get_mores`: the number of OP_QUERY and OP_GET_MORE
+        round trips to the server
+      - `bytes_received`: the size of the server's replies
+      - `documents`: the number of documents received
+      - `network_time`: seconds spent waiting for replies. A batch
+        fetched in the background with :meth:`Cursor.prefetch` counts
+        only for the time spent waiting for it to arrive
+      - `decode_time`: seconds spent decoding replies. Documents are
+        decoded as they are iterated, which is only timed with
+        :meth:`Cursor.detailed_stats`
+      - `manipulate_time`: seconds spent applying the database's SON
+        manipulators to the documents, only timed with
+        :meth:`Cursor.detailed_stats`
+      - `address`: the server the cursor reads from: a ``(host, port)``
+        pair, or for a
+        :class:`~pymongo.master_slave_connection.MasterSlaveConnection`
+        the index of the slave, or -1 for the master. ``None`` until the
+        first reply
+
+    .. versionadded:: 2.5+
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.get_mores = 0
+        self.bytes_received = 0
+        self.documents = 0
+        self.network_time = 0.0
+        self.decode_time = 0.0
+        self.manipulate_time = 0.0
+        self.address = None
+
+    def __repr__(self):
+        return "CursorStats(%s)" % ", ".join(["%s=%r" % item for item in
+                                              sorted(self.__dict__.items())])
+
+
 # TODO might be cool to be able to do find().include("foo") or
 # find().exclude(["bar", "baz"]) or find().slice("a", 1, 2) as an
 # alternative to the fields specifier.
@@ -112,6 +215,8 @@ class Cursor(object):
         self.__max_scan = max_scan
         self.__explain = False
         self.__hint = None
+        self.__min = None
+        self.__max = None
         self.__as_class = as_class
         self.__slave_okay = slave_okay
         self.__manipulate = manipulate
@@ -127,6 +232,10 @@ class Cursor(object):
         self.__connection_id = None
         self.__retrieved = 0
         self.__killed = False
+        self.__prefetch = False
+        self.__prefetched = None
+        self.__detailed_stats = False
+        self.__stats = CursorStats()
 
         # this is for passing network_timeout through if it's specified
         # need to use kwargs as None is a legit value for network_timeout
@@ -141,6 +250,15 @@ class Cursor(object):
         """
         return self.__collection
 
+    @property
+    def stats(self):
+        """The :class:`CursorStats` of this cursor, updated as it is
+        iterated.
+
+        .. versionadded:: 2.5+
+        """
+        return self.__stats
+
     def __del__(self):
         if self.__id and not self.__killed:
             self.__die()
@@ -154,11 +272,13 @@ class Cursor(object):
         be sent to the server, even if the resultant data has already been
         retrieved by this cursor.
         """
+        self.__discard_prefetched()
         self.__data = deque()
         self.__id = None
         self.__connection_id = None
         self.__retrieved = 0
         self.__killed = False
+        self.__stats = CursorStats()
 
         return self
 
@@ -177,11 +297,12 @@ class Cursor(object):
         values_to_clone = ("spec", "fields", "skip", "limit",
                            "timeout", "snapshot", "tailable",
                            "ordering", "explain", "hint", "batch_size",
+                           "min", "max",
                            "max_scan", "as_class",  "slave_okay", "await_data",
                            "partial", "manipulate", "read_preference",
                            "tag_sets", "secondary_acceptable_latency_ms",
                            "must_use_master", "uuid_subtype", "query_flags",
-                           "kwargs")
+                           "prefetch", "detailed_stats", "kwargs")
         data = dict((k, v) for k, v in self.__dict__.iteritems()
                     if k.startswith('_Cursor__') and k[9:] in values_to_clone)
         if deepcopy:
@@ -192,12 +313,26 @@ class Cursor(object):
     def __die(self):
         """Closes this cursor.
         """
+        prefetched, self.__prefetched = self.__prefetched, None
         if self.__id and not self.__killed:
             connection = self.__collection.database.connection
             if self.__connection_id is not None:
-                connection.close_cursor(self.__id, self.__connection_id)
+                args = (self.__id, self.__connection_id)
+            else:
+                args = (self.__id,)
+
+            def close():
+                connection.close_cursor(*args)
+
+            if prefetched is not None:
+                # Don't kill the cursor while a getmore for it is in
+                # flight, but don't wait for the getmore either: we may
+                # be called from __del__. Kill it once the getmore is done.
+                prefetched.discard(close)
             else:
-                connection.close_cursor(self.__id)
+                close()
+        elif prefetched is not None:
+            prefetched.discard()
         self.__killed = True
 
     def close(self):
@@ -221,6 +356,10 @@ class Cursor(object):
             operators["$snapshot"] = True
         if self.__max_scan:
             operators["$maxScan"] = self.__max_scan
+        if self.__min:
+            operators["$min"] = self.__min
+        if self.__max:
+            operators["$max"] = self.__max
         # Only set $readPreference if it's something other than
         # PRIMARY to avoid problems with mongos versions that
         # don't support read preferences.
@@ -491,6 +630,97 @@ class Cursor(object):
         self.__max_scan = max_scan
         return self
 
+    def min(self, spec):
+        """Adds a `min` operator that specifies the inclusive lower bound
+        of the index used for the query.
+
+        Raises :class:`~pymongo.errors.InvalidOperation` if this
+        cursor has already been used. Only the last :meth:`min`
+        applied to this cursor has any effect.
+
+        :Parameters:
+          - `spec`: a list of (key, value) pairs specifying the lower
+            bound for all the keys of an index, in order
+
+        .. versionadded:: 2.5+
+        """
+        if not isinstance(spec, (list, tuple)):
+            raise TypeError("spec must be an instance of list or tuple")
+
+        self.__check_okay_to_chain()
+        self.__min = SON(spec)
+        return self
+
+    def max(self, spec):
+        """Adds a `max` operator that specifies the exclusive upper bound
+        of the index used for the query.
+
+        Raises :class:`~pymongo.errors.InvalidOperation` if this
+        cursor has already been used. Only the last :meth:`max`
+        applied to this cursor has any effect.
+
+        :Parameters:
+          - `spec`: a list of (key, value) pairs specifying the upper
+            bound for all the keys of an index, in order
+
+        .. versionadded:: 2.5+
+        """
+        if not isinstance(spec, (list, tuple)):
+            raise TypeError("spec must be an instance of list or tuple")
+
+        self.__check_okay_to_chain()
+        self.__max = SON(spec)
+        return self
+
+    def prefetch(self, prefetch=True):
+        """Fetch the next batch of results in the background.
+
+        When enabled, as soon as a batch of results is received the next
+        batch is requested in a background thread (or greenlet, depending
+        on the client's `thread_support_module`) while the current batch
+        is being iterated. The getmore is sent to the same server as the
+        query. This overlaps network latency with processing on long
+        scans, at the cost of holding up to two batches in memory.
+
+        Raises :class:`~pymongo.errors.InvalidOperation` if this
+        cursor has already been used.
+
+        :Parameters:
+          - `prefetch` (optional): ``True`` to fetch batches in the
+            background, ``False`` to fetch them on demand
+
+        .. versionadded:: 2.5+
+        """
+        if not isinstance(prefetch, bool):
+            raise TypeError("prefetch must be an instance of bool")
+
+        self.__check_okay_to_chain()
+        self.__prefetch = prefetch
+        return self
+
+    def detailed_stats(self, detailed=True):
+        """Time decoding and manipulating each document in this cursor's
+        :attr:`stats`.
+
+        Documents are decoded as they are iterated, so timing them costs
+        a few clock reads per document. Without detailed stats only whole
+        batches are timed.
+
+        Raises :class:`~pymongo.errors.InvalidOperation` if this
+        cursor has already been used.
+
+        :Parameters:
+          - `detailed` (optional): ``True`` to time each document
+
+        .. versionadded:: 2.5+
+        """
+        if not isinstance(detailed, bool):
+            raise TypeError("detailed must be an instance of bool")
+
+        self.__check_okay_to_chain()
+        self.__detailed_stats = detailed
+        return self
+
     def sort(self, key_or_list, direction=None):
         """Sorts this cursor's results.
 
@@ -682,10 +912,11 @@ class Cursor(object):
         self.__spec["$where"] = code
         return self
 
-    def __send_message(self, message):
-        """Send a query or getmore message and handles the response.
+    def __sender(self):
+        """Get a function sending a message for this cursor and returning
+        the response.
         """
-        db = self.__collection.database
+        connection = self.__collection.database.connection
         kwargs = {"_must_use_master": self.__must_use_master}
         kwargs["read_preference"] = self.__read_preference
         kwargs["tag_sets"] = self.__tag_sets
@@ -695,9 +926,57 @@ class Cursor(object):
             kwargs["_connection_to_use"] = self.__connection_id
         kwargs.update(self.__kwargs)
 
+        def send(message):
+            return connection._send_message_with_response(message, **kwargs)
+        return send
+
+    def __get_more_message(self):
+        """Get a getmore message for the next batch of results.
+        """
+        if self.__limit:
+            limit = self.__limit - self.__retrieved
+            if self.__batch_size:
+                limit = min(limit, self.__batch_size)
+        else:
+            limit = self.__batch_size
+
+        return message.get_more(self.__collection.full_name,
+                                limit, self.__id)
+
+    def __start_prefetch(self):
+        """Request the next batch in the background, if there is one.
+        """
+        if self.__prefetch and self.__id and not self.__killed:
+            connection = self.__collection.database.connection
+            self.__prefetched = _Prefetch(self.__sender(),
+                                          self.__get_more_message(),
+                                          connection.thread_support_module)
+
+    def __discard_prefetched(self):
+        """Drop any batch being fetched in the background.
+        """
+        prefetched, self.__prefetched = self.__prefetched, None
+        if prefetched is not None:
+            prefetched.discard()
+
+    def __send_message(self, message, prefetched=None):
+        """Send a query or getmore message and handles the response.
+
+        If `prefetched` is given the message has already been sent in the
+        background, and we just wait for its response.
+        """
+        db = self.__collection.database
+        stats = self.__stats
+        if self.__id is None:
+            stats.queries += 1
+        else:
+            stats.get_mores += 1
+        start = time.time()
         try:
-            response = db.connection._send_message_with_response(message,
-                                                                 **kwargs)
+            if prefetched is None:
+                response = self.__sender()(message)
+            else:
+                response = prefetched.get()
         except AutoReconnect:
             # Don't try to send kill cursors on another socket
             # or to another server. It can cause a _pinValue
@@ -713,17 +992,30 @@ class Cursor(object):
 
         self.__connection_id = connection_id
 
+        received = time.time()
+        stats.network_time += received - start
+        # The reply's header was stripped before we got it.
+        stats.bytes_received += len(response) + 16
+        if connection_id is None:
+            stats.address = (db.connection.host, db.connection.port)
+        else:
+            stats.address = connection_id
+
         try:
+            # Documents are decoded as they're consumed, so a large batch
+            # isn't held in memory twice, once encoded and once decoded.
             response = helpers._unpack_response(response, self.__id,
                                                 self.__as_class,
                                                 self.__tz_aware,
-                                                self.__uuid_subtype)
+                                                self.__uuid_subtype,
+                                                lazy=True)
         except AutoReconnect:
             # Don't send kill cursors to another server after a "not master"
             # error. It's completely pointless.
             self.__killed = True
             db.connection.disconnect()
             raise
+        stats.decode_time += time.time() - received
         self.__id = response["cursor_id"]
 
         # starting from doesn't get set on getmore's for tailable cursors
@@ -733,11 +1025,14 @@ class Cursor(object):
                     response['starting_from'], self.__retrieved))
 
         self.__retrieved += response["number_returned"]
-        self.__data = deque(response["data"])
+        stats.documents += response["number_returned"]
+        self.__data = response["data"]
 
         if self.__limit and self.__id and self.__limit <= self.__retrieved:
             self.__die()
 
+        self.__start_prefetch()
+
     def _refresh(self):
         """Refreshes the cursor with more data from Mongo.
 
@@ -764,16 +1059,11 @@ class Cursor(object):
             if not self.__id:
                 self.__killed = True
         elif self.__id:  # Get More
-            if self.__limit:
-                limit = self.__limit - self.__retrieved
-                if self.__batch_size:
-                    limit = min(limit, self.__batch_size)
+            prefetched, self.__prefetched = self.__prefetched, None
+            if prefetched is not None:
+                self.__send_message(None, prefetched)
             else:
-                limit = self.__batch_size
-
-            self.__send_message(
-                message.get_more(self.__collection.full_name,
-                                 limit, self.__id))
+                self.__send_message(self.__get_more_message())
         else:  # Cursor id is zero nothing else to return
             self.__killed = True
 
@@ -812,6 +1102,8 @@ class Cursor(object):
             raise StopIteration
         db = self.__collection.database
         if len(self.__data) or self._refresh():
+            if self.__detailed_stats:
+                return self.__timed_next(db)
             if self.__manipulate:
                 return db._fix_outgoing(self.__data.popleft(),
                                         self.__collection)
@@ -820,6 +1112,19 @@ class Cursor(object):
         else:
             raise StopIteration
 
+    def __timed_next(self, db):
+        """Get the next document, timing its decoding and manipulation.
+        """
+        stats = self.__stats
+        start = time.time()
+        document = self.__data.popleft()
+        decoded = time.time()
+        stats.decode_time += decoded - start
+        if self.__manipulate:
+            document = db._fix_outgoing(document, self.__collection)
+            stats.manipulate_time += time.time() - decoded
+        return document
+
     def __enter__(self):
         return self
 
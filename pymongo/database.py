@@ -255,6 +255,17 @@ class Database(common.BaseObject):
             son = manipulator.transform_incoming(son, collection)
         return son
 
+    def _only_injects_ids(self):
+        """Is :class:`~pymongo.son_manipulator.ObjectIdInjector` the only
+        incoming SON manipulator?
+
+        If so, documents can be given their ``"_id"`` before the
+        manipulators run without changing what gets stored.
+        """
+        return (not self.__incoming_copying_manipulators and
+                [type(manipulator) for manipulator in
+                 self.__incoming_manipulators] == [ObjectIdInjector])
+
     def _fix_outgoing(self, son, collection):
         """Apply manipulators to a SON object as it comes out of the database.
 
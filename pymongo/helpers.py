@@ -21,12 +21,29 @@ import bson
 import pymongo
 
 from bson.binary import OLD_UUID_SUBTYPE
+from bson.errors import InvalidBSON
+from bson.py3compat import b
 from bson.son import SON
 from pymongo.errors import (AutoReconnect,
+                            ConnectionFailure,
                             DuplicateKeyError,
                             OperationFailure,
                             TimeoutError)
 
+EMPTY = b("")
+
+# Message segments smaller than this are copied together and sent in one
+# call, so a message made of many small documents isn't sent with one
+# system call (and, with TCP_NODELAY, one packet) per document.
+_SEND_CHUNK_SIZE = 32 * 1024
+
+try:
+    memoryview
+    _HAS_MEMORYVIEW = True
+except NameError:
+    # Python < 2.7
+    _HAS_MEMORYVIEW = False
+
 
 def _index_list(key_or_list, direction=None):
     """Helper to generate a list of (key, direction) pairs.
@@ -71,19 +88,112 @@ def _index_document(index_list):
     return index
 
 
+def _receive_data_on_socket(sock, length):
+    """Lowest level receive operation.
+
+    Receives exactly `length` bytes from `sock`, raising ConnectionFailure
+    if the connection is closed first. The data is read with ``recv_into``
+    straight into a preallocated :class:`bytearray`, which is returned.
+    Pythons without :class:`memoryview` fall back to concatenating the
+    strings returned by ``recv``.
+    """
+    if not _HAS_MEMORYVIEW:
+        message = EMPTY
+        while length:
+            chunk = sock.recv(length)
+            if chunk == EMPTY:
+                raise ConnectionFailure("connection closed")
+            length -= len(chunk)
+            message += chunk
+        return message
+
+    buf = bytearray(length)
+    view = memoryview(buf)
+    received = 0
+    while received < length:
+        chunk_length = sock.recv_into(view[received:], length - received)
+        if not chunk_length:
+            raise ConnectionFailure("connection closed")
+        received += chunk_length
+    return buf
+
+
+def _send_data_on_socket(sock, data):
+    """Lowest level send operation.
+
+    `data` is a string, or a list of strings making up one message. The
+    segments of a list are sent in order without first joining them into a
+    single string: small segments are gathered into chunks of about
+    `_SEND_CHUNK_SIZE` bytes, and large ones are sent as they are.
+    """
+    if not isinstance(data, list):
+        sock.sendall(data)
+        return
+
+    pending = []
+    pending_size = 0
+    for segment in data:
+        if len(segment) >= _SEND_CHUNK_SIZE:
+            if pending:
+                sock.sendall(EMPTY.join(pending))
+                pending, pending_size = [], 0
+            sock.sendall(segment)
+        else:
+            pending.append(segment)
+            pending_size += len(segment)
+            if pending_size >= _SEND_CHUNK_SIZE:
+                sock.sendall(EMPTY.join(pending))
+                pending, pending_size = [], 0
+    if pending:
+        sock.sendall(EMPTY.join(pending))
+
+
+class _DocumentBatch(object):
+    """The documents in a single response, decoded one at a time as they
+    are consumed.
+
+    Supports the subset of the :class:`~collections.deque` interface used
+    by :class:`~pymongo.cursor.Cursor`.
+    """
+
+    def __init__(self, documents, count):
+        self.__documents = documents
+        self.__count = count
+
+    def __len__(self):
+        return self.__count
+
+    def popleft(self):
+        if not self.__count:
+            raise IndexError("pop from an empty batch")
+        try:
+            document = self.__documents.next()
+        except StopIteration:
+            self.__count = 0
+            raise InvalidBSON("response contained fewer documents "
+                              "than expected")
+        self.__count -= 1
+        return document
+
+
 def _unpack_response(response, cursor_id=None, as_class=dict,
-                     tz_aware=False, uuid_subtype=OLD_UUID_SUBTYPE):
+                     tz_aware=False, uuid_subtype=OLD_UUID_SUBTYPE,
+                     lazy=False):
     """Unpack a response from the database.
 
     Check the response for errors and unpack, returning a dictionary
     containing the response data.
 
     :Parameters:
-      - `response`: byte string as returned from the database
+      - `response`: byte string (or :class:`bytearray`) as returned from
+        the database
       - `cursor_id` (optional): cursor_id we sent to get this response -
         used for raising an informative exception when we get cursor id not
         valid at server response
       - `as_class` (optional): class to use for resulting documents
+      - `lazy` (optional): if ``True``, the documents are returned as a
+        :class:`_DocumentBatch` that decodes each one as it is consumed,
+        rather than as a list
     """
     response_flag = struct.unpack("<i", response[:4])[0]
     if response_flag & 1:
@@ -93,7 +203,8 @@ def _unpack_response(response, cursor_id=None, as_class=dict,
         raise OperationFailure("cursor id '%s' not valid at server" %
                                cursor_id)
     elif response_flag & 2:
-        error_object = bson.BSON(response[20:]).decode()
+        error_object = bson.decode_all(response, dict, False,
+                                       OLD_UUID_SUBTYPE, 20)[0]
         if error_object["$err"].startswith("not master"):
             raise AutoReconnect(error_object["$err"])
         raise OperationFailure("database error: %s" %
@@ -103,8 +214,15 @@ def _unpack_response(response, cursor_id=None, as_class=dict,
     result["cursor_id"] = struct.unpack("<q", response[4:12])[0]
     result["starting_from"] = struct.unpack("<i", response[12:16])[0]
     result["number_returned"] = struct.unpack("<i", response[16:20])[0]
-    result["data"] = bson.decode_all(response[20:],
-                                     as_class, tz_aware, uuid_subtype)
+    if lazy:
+        result["data"] = _DocumentBatch(
+            bson.decode_iter(response, as_class, tz_aware, uuid_subtype, 20),
+            result["number_returned"])
+        return result
+    # Decode the documents in place, without copying them out of the
+    # response first.
+    result["data"] = bson.decode_all(response, as_class, tz_aware,
+                                     uuid_subtype, 20)
     assert len(result["data"]) == result["number_returned"]
     return result
 
@@ -147,6 +265,48 @@ def _check_command_response(response, reset, msg="%s", allowable_errors=[]):
             raise OperationFailure(msg % errmsg, code)
 
 
+def _check_response_to_last_error(response, reset):
+    """Check a response to a lastError message for errors.
+
+    `response` is a byte string representing a response to the message.
+    If it represents an error response we raise OperationFailure, calling
+    `reset` first (unless it is ``None``) if the server isn't primary.
+
+    Return the response as a document.
+    """
+    response = _unpack_response(response)
+
+    assert response["number_returned"] == 1
+    error = response["data"][0]
+
+    _check_command_response(error, reset)
+
+    error_msg = error.get("err", "")
+    if error_msg is None:
+        return error
+    if error_msg.startswith("not master"):
+        if reset is not None:
+            reset()
+        raise AutoReconnect(error_msg)
+
+    details = error
+    # mongos returns the error code in an error object
+    # for some errors.
+    if "errObjects" in error:
+        for errobj in error["errObjects"]:
+            if errobj["err"] == error_msg:
+                details = errobj
+                break
+
+    if "code" in details:
+        if details["code"] in (11000, 11001, 12582):
+            raise DuplicateKeyError(details["err"], details["code"])
+        else:
+            raise OperationFailure(details["err"], details["code"])
+    else:
+        raise OperationFailure(details["err"])
+
+
 def _fields_list_to_dict(fields):
     """Takes a list of field names and returns a matching dictionary.
 
@@ -109,6 +109,14 @@ class MasterSlaveConnection(BaseObject):
         """
         return self.master.use_greenlets
 
+    @property
+    def thread_support_module(self):
+        """The thread support module of the master.
+
+        .. versionadded:: 2.5+
+        """
+        return self.master.thread_support_module
+
     def get_document_class(self):
         return self.__document_class
 
@@ -123,6 +131,32 @@ class MasterSlaveConnection(BaseObject):
     def tz_aware(self):
         return self.__tz_aware
 
+    @property
+    def max_bson_size(self):
+        """Return the maximum size BSON object the master accepts in
+        bytes.
+
+        .. versionadded:: 2.5+
+        """
+        return self.master.max_bson_size
+
+    @property
+    def max_message_size(self):
+        """Return the maximum message size the master accepts in bytes.
+
+        .. versionadded:: 2.5+
+        """
+        return self.master.max_message_size
+
+    @property
+    def max_write_batch_size(self):
+        """Return the maximum number of documents sent to the master in
+        a single insert message.
+
+        .. versionadded:: 2.5+
+        """
+        return self.master.max_write_batch_size
+
     def disconnect(self):
         """Disconnect from MongoDB.
 
@@ -169,6 +203,13 @@ class MasterSlaveConnection(BaseObject):
         return self.__slaves[_connection_to_use]._send_message(
             message, with_last_error, check_primary=False)
 
+    def _send_messages(self, messages):
+        """Send several messages back to back on the Master connection.
+
+        See :meth:`~pymongo.mongo_client.MongoClient._send_messages`.
+        """
+        return self.__master._send_messages(messages)
+
     # _connection_to_use is a hack that we need to include to make sure
     # that getmore operations can be sent to the same instance on which
     # the cursor actually resides...
@@ -34,7 +34,8 @@ try:
     _use_c = True
 except ImportError:
     _use_c = False
-from pymongo.errors import InvalidOperation
+from pymongo import common
+from pymongo.errors import InvalidDocument, InvalidOperation, OperationFailure
 
 
 __ZERO = b("\x00\x00\x00\x00")
@@ -67,6 +68,19 @@ def __pack_message(operation, data):
     return (request_id, message + data)
 
 
+def __pack_message_segments(operation, segments):
+    """Takes message data as a list of strings and adds a message header
+    based on the operation.
+
+    Returns the resultant message as a list of strings, without copying the
+    data into one string.
+    """
+    request_id = random.randint(MIN_INT32, MAX_INT32)
+    length = 16 + sum(map(len, segments))
+    header = struct.pack("<iiii", length, request_id, 0, operation)
+    return (request_id, [header] + segments)
+
+
 def insert(collection_name, docs, check_keys,
            safe, last_error_args, continue_on_error, uuid_subtype):
     """Get an **insert** message.
@@ -93,6 +107,101 @@ if _use_c:
     insert = _cmessage._insert_message
 
 
+def _insert_batches(collection_name, docs, check_keys,
+                    safe, last_error_args, continue_on_error,
+                    uuid_subtype, client):
+    """Generate the **insert** messages needed to insert `docs`.
+
+    `docs` may be any iterable, it is consumed one document at a time.
+    Each message holds at most `client.max_write_batch_size` documents
+    and is no larger than `client.max_message_size` bytes.
+
+    Yields ``(message, with_last_error)`` pairs. Unless
+    `continue_on_error` is ``True`` every message is followed by a
+    getLastError, so that no more batches are sent after a failure.
+    """
+    max_bson_size = client.max_bson_size or common.MAX_BSON_SIZE
+    max_message_size = client.max_message_size or common.MAX_MESSAGE_SIZE
+    max_batch_size = (client.max_write_batch_size or
+                      common.MAX_WRITE_BATCH_SIZE)
+
+    options = 0
+    if continue_on_error:
+        options += 1
+    data = struct.pack("<i", options)
+    data += bson._make_c_string(collection_name)
+    # Every batch but the last waits for a getLastError unless we are
+    # asked to keep going after errors.
+    send_safe = safe or not continue_on_error
+
+    def make_batch(encoded, batch_max_size, batch_safe):
+        (request_id, segments) = __pack_message_segments(2002,
+                                                         [data] + encoded)
+        if batch_safe:
+            (request_id, error_message, _) = __last_error(collection_name,
+                                                          last_error_args)
+            segments.append(error_message)
+        return (request_id, segments, batch_max_size), batch_safe
+
+    encoded = []
+    batch_max_size = 0
+    # The message header plus the options and collection name.
+    message_length = 16 + len(data)
+    for doc in docs:
+        encoded_doc = bson.BSON.encode(doc, check_keys, uuid_subtype)
+        encoded_length = len(encoded_doc)
+        if encoded_length > max_bson_size:
+            raise InvalidDocument("BSON document too large (%d bytes)"
+                                  " - the connected server supports"
+                                  " BSON document sizes up to %d"
+                                  " bytes." %
+                                  (encoded_length, max_bson_size))
+        if encoded and (len(encoded) == max_batch_size or
+                        message_length + encoded_length > max_message_size):
+            yield make_batch(encoded, batch_max_size, send_safe)
+            encoded = []
+            batch_max_size = 0
+            message_length = 16 + len(data)
+        encoded.append(encoded_doc)
+        batch_max_size = max(batch_max_size, encoded_length)
+        message_length += encoded_length
+
+    if not encoded:
+        raise InvalidOperation("cannot do an empty bulk insert")
+
+    yield make_batch(encoded, batch_max_size, safe)
+
+
+def _do_batched_insert(collection_name, docs, check_keys,
+                       safe, last_error_args, continue_on_error,
+                       uuid_subtype, client):
+    """Insert `docs` using as many **insert** messages as needed.
+
+    The messages are split up by :func:`_insert_batches`. If
+    `continue_on_error` is ``True`` every batch is sent and the last
+    error (if any) is raised once all documents have been inserted.
+    Otherwise no more batches are sent after a failure, and the error is
+    only raised if `safe` is ``True``.
+    """
+    last_error = None
+    for msg, batch_safe in _insert_batches(collection_name, docs,
+                                           check_keys, safe,
+                                           last_error_args,
+                                           continue_on_error,
+                                           uuid_subtype, client):
+        try:
+            client._send_message(msg, batch_safe)
+        except OperationFailure, e:
+            if continue_on_error:
+                last_error = e
+            elif not safe:
+                return
+            else:
+                raise
+    if last_error is not None:
+        raise last_error
+
+
 def update(collection_name, upsert, multi,
            spec, doc, safe, last_error_args, check_keys, uuid_subtype):
     """Get an **update** message.
@@ -171,6 +280,8 @@ def delete(collection_name, spec, safe, last_error_args, uuid_subtype):
     else:
         (request_id, remove_message) = __pack_message(2006, data)
         return (request_id, remove_message, len(encoded))
+if _use_c:
+    delete = _cmessage._delete_message
 
 
 def kill_cursors(cursor_ids):
@@ -181,3 +292,5 @@ def kill_cursors(cursor_ids):
     for cursor_id in cursor_ids:
         data += struct.pack("<q", cursor_id)
     return __pack_message(2007, data)
+if _use_c:
+    kill_cursors = _cmessage._kill_cursors_message
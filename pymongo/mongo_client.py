@@ -41,26 +41,24 @@ import struct
 import time
 import warnings
 
-from bson.py3compat import b
 from pymongo import (auth,
                      common,
                      database,
                      helpers,
                      message,
+                     monitoring,
                      pool,
                      uri_parser)
+from pymongo.multiplex import MultiplexedSocket
 from pymongo.common import HAS_SSL
 from pymongo.cursor_manager import CursorManager
 from pymongo.errors import (AutoReconnect,
                             ConfigurationError,
                             ConnectionFailure,
-                            DuplicateKeyError,
                             InvalidDocument,
                             InvalidURI,
                             OperationFailure)
 
-EMPTY = b("")
-
 
 def _partition_node(node):
     """Split a host:port string returned from mongod/s into
@@ -83,7 +81,9 @@ class MongoClient(common.BaseObject):
     HOST = "localhost"
     PORT = 27017
 
-    __max_bson_size = 4 * 1024 * 1024
+    __max_bson_size = common.MAX_BSON_SIZE
+    __max_message_size = common.MAX_MESSAGE_SIZE
+    __max_write_batch_size = common.MAX_WRITE_BATCH_SIZE
 
     def __init__(self, host=None, port=None, max_pool_size=100,
                  document_class=dict, tz_aware=False, _connect=True,
@@ -143,6 +143,24 @@ class MongoClient(common.BaseObject):
             free sockets.
           - `waitQueueMultiple`: (integer) Multiplied by max_pool_size to give
             the number of threads allowed to wait for a socket at one time.
+          - `min_pool_size`: (integer) The number of sockets a background
+            thread keeps open to the server, so bursts of operations after
+            startup or a reconnect don't wait for new connections.
+            Defaults to 0.
+          - `maxIdleTimeMS`: (integer) How long (in milliseconds) a socket
+            can sit idle in the pool before it is closed. Defaults to no
+            limit. If this or `min_pool_size` is set, the background thread
+            also checks idle sockets for errors, so checking a socket out
+            of the pool never makes a system call.
+          - `event_listeners`: A list of
+            :class:`~pymongo.monitoring.PoolListener` and
+            :class:`~pymongo.monitoring.OperationListener` to notify of
+            this client's connection pool events and operations. See
+            :mod:`~pymongo.monitoring`.
+          - `latency_histograms`: If ``True``, record a
+            :class:`~pymongo.monitoring.LatencyHistogram` of the latency of
+            each type of operation sent to each server. See
+            :meth:`get_latency_histograms`. Defaults to ``False``.
           - `auto_start_request`: If ``True``, each thread that accesses
             this :class:`MongoClient` has a socket allocated to it for the
             thread's lifetime.  This ensures consistent reads, even if you
@@ -157,6 +175,12 @@ class MongoClient(common.BaseObject):
           - `thread_support_module`: ``threading``, ``gevent``, or a module
             which implements the necessary interface. Defaults to ``threading``.
             See :module: `~pymongo.thread_util_threading`.
+          - `multiplex`: If ``True``, queries, commands and writes from all
+            threads share one socket instead of each taking a socket from
+            the pool, and a reader thread hands each reply to the thread
+            waiting for it. Heavy read workloads then need far fewer
+            sockets, though a network error or socket timeout fails every
+            operation in flight on the socket. Defaults to ``False``.
 
           | **Write Concern options:**
 
@@ -222,6 +246,9 @@ class MongoClient(common.BaseObject):
 
         .. mongodoc:: connections
 
+        .. versionchanged:: 2.5+
+           Added the `multiplex`, `min_pool_size`, `maxIdleTimeMS`,
+           `event_listeners` and `latency_histograms` options
         .. versionchanged:: 2.5
            Added additional ssl options
         .. versionadded:: 2.4
@@ -280,6 +307,11 @@ class MongoClient(common.BaseObject):
         else:
             kwargs.setdefault('thread_support_module', 'threading')
 
+        # Only MongoClient can multiplex, so the option isn't validated
+        # with the options every client takes.
+        multiplex = common.validate_boolean('multiplex',
+                                            kwargs.pop('multiplex', False))
+
         options = {}
         for option, value in kwargs.iteritems():
             option, value = common.validate(option, value)
@@ -302,6 +334,14 @@ class MongoClient(common.BaseObject):
         self.__conn_timeout = options.get('connecttimeoutms')
         self.__wait_queue_timeout = options.get('waitqueuetimeoutms')
         self.__wait_queue_multiple = options.get('waitqueuemultiple')
+        self.__min_pool_size = options.get('min_pool_size', 0)
+        self.__max_idle_time = options.get('maxidletimems')
+        self.__event_listeners = options.get('event_listeners')
+        self.__operation_listeners = monitoring._get_listeners(
+            self.__event_listeners, monitoring.OperationListener)
+        self.__latency = None
+        if options.get('latency_histograms'):
+            self.__latency = monitoring._LatencyTracker()
 
         self.__use_ssl = options.get('ssl', None)
         self.__ssl_keyfile = options.get('ssl_keyfile', None)
@@ -347,11 +387,18 @@ class MongoClient(common.BaseObject):
             ssl_cert_reqs=self.__ssl_cert_reqs,
             ssl_ca_certs=self.__ssl_ca_certs,
             wait_queue_timeout=self.__wait_queue_timeout,
-            wait_queue_multiple=self.__wait_queue_multiple)
+            wait_queue_multiple=self.__wait_queue_multiple,
+            min_size=self.__min_pool_size,
+            max_idle_time=self.__max_idle_time,
+            listeners=self.__event_listeners)
 
         self.__document_class = document_class
         self.__tz_aware = common.validate_boolean('tz_aware', tz_aware)
         self.__auto_start_request = options.get('auto_start_request', False)
+        self.__multiplex = multiplex
+        self.__multiplexed_socket = None
+        self.__multiplex_lock = (
+            self.__thread_support_module.BoundedSemaphore(1))
 
         # cache of existing indexes used by ensure_index ops
         self.__index_cache = {}
@@ -581,6 +628,48 @@ class MongoClient(common.BaseObject):
         """
         return self.__auto_start_request
 
+    @property
+    def multiplex(self):
+        """Do all threads share one socket?
+
+        .. versionadded:: 2.5+
+        """
+        return self.__multiplex
+
+    @property
+    def pool_stats(self):
+        """A :class:`~pymongo.pool.PoolStats` snapshot of the connection
+        pool's statistics.
+
+        .. versionadded:: 2.5+
+        """
+        return self.__pool.get_stats()
+
+    def get_latency_histograms(self):
+        """Get a snapshot of the latency histograms recorded with the
+        `latency_histograms` option.
+
+        Returns a dict mapping ``((host, port), operation)`` pairs to
+        copies of their :class:`~pymongo.monitoring.LatencyHistogram`,
+        where `operation` is one of the operation types of
+        :class:`~pymongo.monitoring.OperationEvent`. The dict is empty if
+        `latency_histograms` isn't enabled.
+
+        .. versionadded:: 2.5+
+        """
+        if self.__latency is None:
+            return {}
+        return self.__latency.snapshot()
+
+    def reset_latency_histograms(self):
+        """Clear the latency histograms recorded with the
+        `latency_histograms` option.
+
+        .. versionadded:: 2.5+
+        """
+        if self.__latency is not None:
+            self.__latency.reset()
+
     def get_document_class(self):
         return self.__document_class
 
@@ -611,6 +700,26 @@ class MongoClient(common.BaseObject):
         """
         return self.__max_bson_size
 
+    @property
+    def max_message_size(self):
+        """Return the maximum message size the connected server
+        accepts in bytes. Defaults to twice :attr:`max_bson_size` in
+        servers that don't report it.
+
+        .. versionadded:: 2.5+
+        """
+        return self.__max_message_size
+
+    @property
+    def max_write_batch_size(self):
+        """Return the maximum number of documents sent to the connected
+        server in a single insert message. Defaults to 1000 in servers
+        that don't report it.
+
+        .. versionadded:: 2.5+
+        """
+        return self.__max_write_batch_size
+
     def __simple_command(self, sock_info, dbname, spec):
         """Send a command to the server.
         """
@@ -653,6 +762,10 @@ class MongoClient(common.BaseObject):
 
         if "maxBsonObjectSize" in response:
             self.__max_bson_size = response["maxBsonObjectSize"]
+        self.__max_message_size = response.get("maxMessageSizeBytes",
+                                               2 * self.__max_bson_size)
+        self.__max_write_batch_size = response.get(
+            "maxWriteBatchSize", common.MAX_WRITE_BATCH_SIZE)
 
         # Replica Set?
         if not self.__direct:
@@ -793,6 +906,59 @@ class MongoClient(common.BaseObject):
             raise
         return sock_info
 
+    def __get_multiplexed_socket(self):
+        """Get the MultiplexedSocket all threads share, connecting it if
+        needed.
+        """
+        host, port = (self.__host, self.__port)
+        if host is None or (port is None and '/' not in host):
+            host, port = self.__find_node()
+
+        self.__multiplex_lock.acquire()
+        try:
+            mux = self.__multiplexed_socket
+            cached = set(self.__auth_credentials.itervalues())
+            if mux is not None and not mux.closed:
+                if mux.sock_info.authset == cached:
+                    return mux
+                # Credentials changed, let requests in flight finish.
+                mux.retire()
+
+            try:
+                sock_info = self.__pool.connect((host, port))
+            except socket.error, why:
+                self.disconnect()
+                if host.endswith('.sock'):
+                    host_details = "%s:" % host
+                else:
+                    host_details = "%s:%d:" % (host, port)
+                raise AutoReconnect("could not connect to "
+                                    "%s %s" % (host_details, str(why)))
+            try:
+                self.__check_auth(sock_info)
+            except:
+                sock_info.close()
+                raise
+            mux = MultiplexedSocket(sock_info, self.__thread_support_module)
+            self.__multiplexed_socket = mux
+            return mux
+        finally:
+            self.__multiplex_lock.release()
+
+    def __send_multiplexed(self, message, with_response):
+        """Send a message on the shared socket, returning the reply if
+        `with_response` is ``True``.
+        """
+        (request_id, data) = self.__check_bson_size(message)
+        mux = self.__get_multiplexed_socket()
+        try:
+            if with_response:
+                return mux.send_and_receive(request_id, data)
+            mux.send(data)
+        except AutoReconnect:
+            self.disconnect()
+            raise
+
     def disconnect(self):
         """Disconnect from MongoDB.
 
@@ -806,6 +972,9 @@ class MongoClient(common.BaseObject):
         .. versionadded:: 1.3
         """
         self.__pool.reset()
+        mux, self.__multiplexed_socket = self.__multiplexed_socket, None
+        if mux is not None:
+            mux.close()
         self.__host = None
         self.__port = None
 
@@ -881,45 +1050,6 @@ class MongoClient(common.BaseObject):
 
         self.__cursor_manager = manager
 
-    def __check_response_to_last_error(self, response):
-        """Check a response to a lastError message for errors.
-
-        `response` is a byte string representing a response to the message.
-        If it represents an error response we raise OperationFailure.
-
-        Return the response as a document.
-        """
-        response = helpers._unpack_response(response)
-
-        assert response["number_returned"] == 1
-        error = response["data"][0]
-
-        helpers._check_command_response(error, self.disconnect)
-
-        error_msg = error.get("err", "")
-        if error_msg is None:
-            return error
-        if error_msg.startswith("not master"):
-            self.disconnect()
-            raise AutoReconnect(error_msg)
-
-        details = error
-        # mongos returns the error code in an error object
-        # for some errors.
-        if "errObjects" in error:
-            for errobj in error["errObjects"]:
-                if errobj["err"] == error_msg:
-                    details = errobj
-                    break
-
-        if "code" in details:
-            if details["code"] in (11000, 11001, 12582):
-                raise DuplicateKeyError(details["err"], details["code"])
-            else:
-                raise OperationFailure(details["err"], details["code"])
-        else:
-            raise OperationFailure(details["err"])
-
     def __check_bson_size(self, message):
         """Make sure the message doesn't include BSON documents larger
         than the connected server will accept.
@@ -941,6 +1071,11 @@ class MongoClient(common.BaseObject):
             # don't include BSON documents.
             return message
 
+    def __address(self):
+        if self.__host is None:
+            return None
+        return (self.__host, self.__port)
+
     def _send_message(self, message, with_last_error=False, check_primary=True):
         """Say something to Mongo.
 
@@ -957,15 +1092,36 @@ class MongoClient(common.BaseObject):
           - `check_primary`: don't try to write to a non-primary; see
             kill_cursors for an exception to this rule
         """
+        listeners, latency = self.__operation_listeners, self.__latency
+        if not listeners and latency is None:
+            return self.__send_message(message, with_last_error, check_primary)
+
+        event = monitoring._started(listeners, message, self.__address())
+        try:
+            rv = self.__send_message(message, with_last_error, check_primary)
+        except Exception, e:
+            monitoring._failed(listeners, event, self.__address(), e, latency)
+            raise
+        monitoring._succeeded(listeners, event, self.__address(), latency)
+        return rv
+
+    def __send_message(self, message, with_last_error, check_primary):
         if check_primary and not with_last_error and not self.is_primary:
             # The write won't succeed, bail as if we'd done a getLastError
             raise AutoReconnect("not master")
 
+        if self.__multiplex:
+            response = self.__send_multiplexed(message, with_last_error)
+            if with_last_error:
+                return helpers._check_response_to_last_error(
+                    response, self.disconnect)
+            return None
+
         sock_info = self.__socket()
         try:
             try:
                 (request_id, data) = self.__check_bson_size(message)
-                sock_info.sock.sendall(data)
+                helpers._send_data_on_socket(sock_info.sock, data)
                 # Safe mode. We pack the message together with a lastError
                 # message and send both. We then get the response (to the
                 # lastError) and raise OperationFailure if it is an error
@@ -974,7 +1130,8 @@ class MongoClient(common.BaseObject):
                 if with_last_error:
                     response = self.__receive_message_on_socket(1, request_id,
                                                                 sock_info)
-                    rv = self.__check_response_to_last_error(response)
+                    rv = helpers._check_response_to_last_error(
+                        response, self.disconnect)
 
                 return rv
             except OperationFailure:
@@ -988,20 +1145,88 @@ class MongoClient(common.BaseObject):
         finally:
             self.__pool.maybe_return_socket(sock_info)
 
+    def _send_messages(self, messages):
+        """Send several messages back to back on one socket.
+
+        `messages` is a list of ``(message, with_last_error)`` pairs. All
+        the messages are sent before any response is read, then the
+        responses to their lastError calls are read in order.
+
+        Returns a list with an item for each message: the response from
+        lastError, the :class:`~pymongo.errors.OperationFailure` it
+        represents, or ``None`` if `with_last_error` is ``False``.
+        """
+        listeners, latency = self.__operation_listeners, self.__latency
+        if not listeners and latency is None:
+            return self.__send_messages(messages)
+
+        address = self.__address()
+        events = [monitoring._started(listeners, message, address)
+                  for message, _ in messages]
+        try:
+            results = self.__send_messages(messages)
+        except Exception, e:
+            address = self.__address()
+            for event in events:
+                monitoring._failed(listeners, event, address, e, latency)
+            raise
+        address = self.__address()
+        for event, rv in zip(events, results):
+            if isinstance(rv, OperationFailure):
+                monitoring._failed(listeners, event, address, rv, latency)
+            else:
+                monitoring._succeeded(listeners, event, address, latency)
+        return results
+
+    def __send_messages(self, messages):
+        if not self.is_primary:
+            for _, with_last_error in messages:
+                if not with_last_error:
+                    raise AutoReconnect("not master")
+
+        data = []
+        pending = []
+        for message, with_last_error in messages:
+            (request_id, msg_data) = self.__check_bson_size(message)
+            if isinstance(msg_data, list):
+                data.extend(msg_data)
+            else:
+                data.append(msg_data)
+            pending.append((request_id, with_last_error))
+
+        sock_info = self.__socket()
+        try:
+            try:
+                helpers._send_data_on_socket(sock_info.sock, data)
+                results = []
+                for request_id, with_last_error in pending:
+                    rv = None
+                    if with_last_error:
+                        response = self.__receive_message_on_socket(
+                            1, request_id, sock_info)
+                        try:
+                            rv = helpers._check_response_to_last_error(
+                                response, self.disconnect)
+                        except OperationFailure, e:
+                            rv = e
+                    results.append(rv)
+                return results
+            except (ConnectionFailure, socket.error), e:
+                self.disconnect()
+                raise AutoReconnect(str(e))
+            except:
+                sock_info.close()
+                raise
+        finally:
+            self.__pool.maybe_return_socket(sock_info)
+
     def __receive_data_on_socket(self, length, sock_info):
         """Lowest level receive operation.
 
-        Takes length to receive and repeatedly calls recv until able to
-        return a buffer of that length, raising ConnectionFailure on error.
+        Takes length to receive and fills a preallocated buffer of that
+        length, raising ConnectionFailure on error.
         """
-        message = EMPTY
-        while length:
-            chunk = sock_info.sock.recv(length)
-            if chunk == EMPTY:
-                raise ConnectionFailure("connection closed")
-            length -= len(chunk)
-            message += chunk
-        return message
+        return helpers._receive_data_on_socket(sock_info.sock, length)
 
     def __receive_message_on_socket(self, operation, request_id, sock_info):
         """Receive a message in response to `request_id` on `sock`.
@@ -1022,7 +1247,7 @@ class MongoClient(common.BaseObject):
         """
         (request_id, data) = self.__check_bson_size(message)
         try:
-            sock_info.sock.sendall(data)
+            helpers._send_data_on_socket(sock_info.sock, data)
             return self.__receive_message_on_socket(1, request_id, sock_info)
         except:
             sock_info.close()
@@ -1039,6 +1264,24 @@ class MongoClient(common.BaseObject):
         :Parameters:
           - `message`: (request_id, data) pair making up the message to send
         """
+        listeners, latency = self.__operation_listeners, self.__latency
+        if not listeners and latency is None:
+            return self.__send_message_with_response(message, **kwargs)
+
+        event = monitoring._started(listeners, message, self.__address())
+        try:
+            response = self.__send_message_with_response(message, **kwargs)
+        except Exception, e:
+            monitoring._failed(listeners, event, self.__address(), e, latency)
+            raise
+        monitoring._succeeded(listeners, event, self.__address(), latency)
+        return response
+
+    def __send_message_with_response(self, message, **kwargs):
+        # The shared socket's timeout can't be changed for one message.
+        if self.__multiplex and "network_timeout" not in kwargs:
+            return self.__send_multiplexed(message, True)
+
         sock_info = self.__socket()
 
         try:
@@ -39,12 +39,12 @@ import time
 import warnings
 import weakref
 
-from bson.py3compat import b
 from pymongo import (auth,
                      common,
                      database,
                      helpers,
                      message,
+                     monitoring,
                      pool,
                      thread_util,
                      uri_parser)
@@ -53,12 +53,10 @@ from pymongo.read_preferences import (
 from pymongo.errors import (AutoReconnect,
                             ConfigurationError,
                             ConnectionFailure,
-                            DuplicateKeyError,
                             InvalidDocument,
                             OperationFailure)
 
-EMPTY = b("")
-MAX_BSON_SIZE = 4 * 1024 * 1024
+MAX_BSON_SIZE = common.MAX_BSON_SIZE
 MAX_RETRY = 3
 
 # Member states
@@ -343,6 +341,10 @@ class Member(object):
         self.tags = ismaster_response.get('tags', {})
         self.max_bson_size = ismaster_response.get(
             'maxBsonObjectSize', MAX_BSON_SIZE)
+        self.max_message_size = ismaster_response.get(
+            'maxMessageSizeBytes', 2 * self.max_bson_size)
+        self.max_write_batch_size = ismaster_response.get(
+            'maxWriteBatchSize', common.MAX_WRITE_BATCH_SIZE)
 
     def clone_with(self, ismaster_response, ping_time_sample):
         """Get a clone updated with ismaster response and a single ping time.
@@ -350,6 +352,15 @@ class Member(object):
         ping_time = self.ping_time.clone_with(ping_time_sample)
         return Member(self.host, self.pool, ismaster_response, ping_time, True)
 
+    @property
+    def pool_stats(self):
+        """A :class:`~pymongo.pool.PoolStats` snapshot of the statistics
+        of this member's connection pool.
+
+        .. versionadded:: 2.5+
+        """
+        return self.pool.get_stats()
+
     def clone_down(self):
         """Get a clone of this Member, but with up=False.
         """
@@ -473,6 +484,24 @@ class MongoReplicaSetClient(common.BaseObject):
             receive on a socket can take before timing out.
           - `connectTimeoutMS`: (integer) How long (in milliseconds) a
             connection can take to be opened before timing out.
+          - `min_pool_size`: (integer) The number of sockets a background
+            thread keeps open to each member, so bursts of operations after
+            startup or a reconnect don't wait for new connections.
+            Defaults to 0.
+          - `maxIdleTimeMS`: (integer) How long (in milliseconds) a socket
+            can sit idle in the pool before it is closed. Defaults to no
+            limit. If this or `min_pool_size` is set, the background thread
+            also checks idle sockets for errors, so checking a socket out
+            of the pool never makes a system call.
+          - `event_listeners`: A list of
+            :class:`~pymongo.monitoring.PoolListener` and
+            :class:`~pymongo.monitoring.OperationListener` to notify of
+            the connection pool events of each member and of this client's
+            operations. See :mod:`~pymongo.monitoring`.
+          - `latency_histograms`: If ``True``, record a
+            :class:`~pymongo.monitoring.LatencyHistogram` of the latency of
+            each type of operation sent to each member. See
+            :meth:`get_latency_histograms`. Defaults to ``False``.
           - `auto_start_request`: If ``True``, each thread that accesses
             this :class:`MongoReplicaSetClient` has a socket allocated to it
             for the thread's lifetime, for each member of the set. For
@@ -548,6 +577,9 @@ class MongoReplicaSetClient(common.BaseObject):
             certificates passed from the other end of the connection.
             Implies ``ssl=True``.
 
+        .. versionchanged:: 2.5+
+           Added the `min_pool_size`, `maxIdleTimeMS`, `event_listeners`
+           and `latency_histograms` options
         .. versionchanged:: 2.5
            Added additional ssl options
         .. versionadded:: 2.4
@@ -628,6 +660,14 @@ class MongoReplicaSetClient(common.BaseObject):
 
         self.__net_timeout = self.__opts.get('sockettimeoutms')
         self.__conn_timeout = self.__opts.get('connecttimeoutms')
+        self.__min_pool_size = self.__opts.get('min_pool_size', 0)
+        self.__max_idle_time = self.__opts.get('maxidletimems')
+        self.__event_listeners = self.__opts.get('event_listeners')
+        self.__operation_listeners = monitoring._get_listeners(
+            self.__event_listeners, monitoring.OperationListener)
+        self.__latency = None
+        if self.__opts.get('latency_histograms'):
+            self.__latency = monitoring._LatencyTracker()
         self.__use_ssl = self.__opts.get('ssl', None)
         self.__ssl_keyfile = self.__opts.get('ssl_keyfile', None)
         self.__ssl_certfile = self.__opts.get('ssl_certfile', None)
@@ -852,6 +892,42 @@ class MongoReplicaSetClient(common.BaseObject):
         """
         return self.__rs_state.arbiters
 
+    @property
+    def pool_stats(self):
+        """A dict mapping the (host, port) of each member known to this
+        client to a :class:`~pymongo.pool.PoolStats` snapshot of its
+        connection pool's statistics.
+
+        .. versionadded:: 2.5+
+        """
+        return dict([(member.host, member.pool_stats)
+                     for member in self.__rs_state.members])
+
+    def get_latency_histograms(self):
+        """Get a snapshot of the latency histograms recorded with the
+        `latency_histograms` option.
+
+        Returns a dict mapping ``((host, port), operation)`` pairs to
+        copies of their :class:`~pymongo.monitoring.LatencyHistogram`,
+        where `operation` is one of the operation types of
+        :class:`~pymongo.monitoring.OperationEvent`. The dict is empty if
+        `latency_histograms` isn't enabled.
+
+        .. versionadded:: 2.5+
+        """
+        if self.__latency is None:
+            return {}
+        return self.__latency.snapshot()
+
+    def reset_latency_histograms(self):
+        """Clear the latency histograms recorded with the
+        `latency_histograms` option.
+
+        .. versionadded:: 2.5+
+        """
+        if self.__latency is not None:
+            self.__latency.reset()
+
     @property
     def is_mongos(self):
         """If this instance is connected to mongos (always False).
@@ -882,6 +958,15 @@ class MongoReplicaSetClient(common.BaseObject):
         """
         return self.__use_greenlets
 
+    @property
+    def thread_support_module(self):
+        """A module which implements the necessary interface.
+           See :module: `~pymongo.thread_util_threading`.
+
+        .. versionadded:: 2.5+
+        """
+        return self.__thread_support_module
+
     def get_document_class(self):
         """document_class getter"""
         return self.__document_class
@@ -912,6 +997,33 @@ class MongoReplicaSetClient(common.BaseObject):
             return rs_state.primary_member.max_bson_size
         return 0
 
+    @property
+    def max_message_size(self):
+        """Returns the maximum message size the connected primary
+        accepts in bytes. Defaults to twice :attr:`max_bson_size` in
+        servers that don't report it. Returns 0 if no primary is
+        available.
+
+        .. versionadded:: 2.5+
+        """
+        rs_state = self.__rs_state
+        if rs_state.primary_member:
+            return rs_state.primary_member.max_message_size
+        return 0
+
+    @property
+    def max_write_batch_size(self):
+        """Returns the maximum number of documents sent to the connected
+        primary in a single insert message. Defaults to 1000 in servers
+        that don't report it. Returns 0 if no primary is available.
+
+        .. versionadded:: 2.5+
+        """
+        rs_state = self.__rs_state
+        if rs_state.primary_member:
+            return rs_state.primary_member.max_write_batch_size
+        return 0
+
     @property
     def auto_start_request(self):
         """Is auto_start_request enabled?
@@ -951,7 +1063,10 @@ class MongoReplicaSetClient(common.BaseObject):
             ssl_keyfile=self.__ssl_keyfile,
             ssl_certfile=self.__ssl_certfile,
             ssl_cert_reqs=self.__ssl_cert_reqs,
-            ssl_ca_certs=self.__ssl_ca_certs)
+            ssl_ca_certs=self.__ssl_ca_certs,
+            min_size=self.__min_pool_size,
+            max_idle_time=self.__max_idle_time,
+            listeners=self.__event_listeners)
 
         if self.in_request():
             connection_pool.start_request()
@@ -1210,50 +1325,13 @@ class MongoReplicaSetClient(common.BaseObject):
             if sock_info is not None:
                 member.pool.maybe_return_socket(sock_info)
 
-    def __check_response_to_last_error(self, response):
-        """Check a response to a lastError message for errors.
-
-        `response` is a byte string representing a response to the message.
-        If it represents an error response we raise OperationFailure.
-
-        Return the response as a document.
-        """
-        response = helpers._unpack_response(response)
-
-        assert response["number_returned"] == 1
-        error = response["data"][0]
-
-        helpers._check_command_response(error, self.disconnect)
-
-        error_msg = error.get("err", "")
-        if error_msg is None:
-            return error
-        if error_msg.startswith("not master"):
-            self.disconnect()
-            raise AutoReconnect(error_msg)
-
-        if "code" in error:
-            if error["code"] in (11000, 11001, 12582):
-                raise DuplicateKeyError(error["err"], error["code"])
-            else:
-                raise OperationFailure(error["err"], error["code"])
-        else:
-            raise OperationFailure(error["err"])
-
     def __recv_data(self, length, sock_info):
         """Lowest level receive operation.
 
-        Takes length to receive and repeatedly calls recv until able to
-        return a buffer of that length, raising ConnectionFailure on error.
+        Takes length to receive and fills a preallocated buffer of that
+        length, raising ConnectionFailure on error.
         """
-        message = EMPTY
-        while length:
-            chunk = sock_info.sock.recv(length)
-            if chunk == EMPTY:
-                raise ConnectionFailure("connection closed")
-            length -= len(chunk)
-            message += chunk
-        return message
+        return helpers._receive_data_on_socket(sock_info.sock, length)
 
     def __recv_msg(self, operation, request_id, sock):
         """Receive a message in response to `request_id` on `sock`.
@@ -1304,6 +1382,27 @@ class MongoReplicaSetClient(common.BaseObject):
           - `with_last_error`: check getLastError status after sending the
             message
         """
+        listeners, latency = self.__operation_listeners, self.__latency
+        if not listeners and latency is None:
+            return self.__send_message(msg, with_last_error, _connection_to_use)
+
+        if _connection_to_use in (None, -1):
+            address = self.__rs_state.writer
+        else:
+            address = _connection_to_use
+        event = monitoring._started(listeners, msg, address)
+        try:
+            rv = self.__send_message(msg, with_last_error, _connection_to_use)
+        except Exception, why:
+            monitoring._failed(listeners, event, None, why, latency)
+            raise
+        if _connection_to_use in (None, -1):
+            # We may not have known the primary when we started.
+            address = self.__rs_state.writer
+        monitoring._succeeded(listeners, event, address, latency)
+        return rv
+
+    def __send_message(self, msg, with_last_error, _connection_to_use):
         # This may be the first time we're connecting to the set.
         if self.__monitor and not self.__monitor.started:
             self.__monitor.start()
@@ -1318,7 +1417,7 @@ class MongoReplicaSetClient(common.BaseObject):
             try:
                 sock_info = self.__socket(member)
                 rqst_id, data = self.__check_bson_size(msg, member.max_bson_size)
-                sock_info.sock.sendall(data)
+                helpers._send_data_on_socket(sock_info.sock, data)
                 # Safe mode. We pack the message together with a lastError
                 # message and send both. We then get the response (to the
                 # lastError) and raise OperationFailure if it is an error
@@ -1326,7 +1425,8 @@ class MongoReplicaSetClient(common.BaseObject):
                 rv = None
                 if with_last_error:
                     response = self.__recv_msg(1, rqst_id, sock_info)
-                    rv = self.__check_response_to_last_error(response)
+                    rv = helpers._check_response_to_last_error(
+                        response, self.disconnect)
                 return rv
             except OperationFailure:
                 raise
@@ -1342,11 +1442,104 @@ class MongoReplicaSetClient(common.BaseObject):
             if sock_info is not None:
                 member.pool.maybe_return_socket(sock_info)
 
+    def _send_messages(self, messages):
+        """Send several messages back to back on one socket to the
+        primary.
+
+        `messages` is a list of ``(message, with_last_error)`` pairs. All
+        the messages are sent before any response is read, then the
+        responses to their lastError calls are read in order.
+
+        Returns a list with an item for each message: the response from
+        lastError, the :class:`~pymongo.errors.OperationFailure` it
+        represents, or ``None`` if `with_last_error` is ``False``.
+        """
+        listeners, latency = self.__operation_listeners, self.__latency
+        if not listeners and latency is None:
+            return self.__send_messages(messages)
+
+        address = self.__rs_state.writer
+        events = [monitoring._started(listeners, msg, address)
+                  for msg, _ in messages]
+        try:
+            results = self.__send_messages(messages)
+        except Exception, why:
+            for event in events:
+                monitoring._failed(listeners, event, None, why, latency)
+            raise
+        address = self.__rs_state.writer
+        for event, rv in zip(events, results):
+            if isinstance(rv, OperationFailure):
+                monitoring._failed(listeners, event, address, rv, latency)
+            else:
+                monitoring._succeeded(listeners, event, address, latency)
+        return results
+
+    def __send_messages(self, messages):
+        # This may be the first time we're connecting to the set.
+        if self.__monitor and not self.__monitor.started:
+            self.__monitor.start()
+
+        member = self.__find_primary()
+
+        data = []
+        pending = []
+        for msg, with_last_error in messages:
+            rqst_id, msg_data = self.__check_bson_size(msg,
+                                                       member.max_bson_size)
+            if isinstance(msg_data, list):
+                data.extend(msg_data)
+            else:
+                data.append(msg_data)
+            pending.append((rqst_id, with_last_error))
+
+        sock_info = None
+        try:
+            try:
+                sock_info = self.__socket(member)
+                helpers._send_data_on_socket(sock_info.sock, data)
+                results = []
+                for rqst_id, with_last_error in pending:
+                    rv = None
+                    if with_last_error:
+                        response = self.__recv_msg(1, rqst_id, sock_info)
+                        try:
+                            rv = helpers._check_response_to_last_error(
+                                response, self.disconnect)
+                        except OperationFailure, why:
+                            rv = why
+                    results.append(rv)
+                return results
+            except(ConnectionFailure, socket.error), why:
+                member.pool.discard_socket(sock_info)
+                self.disconnect()
+                raise AutoReconnect(str(why))
+            except:
+                sock_info.close()
+                raise
+        finally:
+            if sock_info is not None:
+                member.pool.maybe_return_socket(sock_info)
+
     def __send_and_receive(self, member, msg, **kwargs):
         """Send a message on the given socket and return the response data.
 
         Can raise socket.error.
         """
+        listeners, latency = self.__operation_listeners, self.__latency
+        if not listeners and latency is None:
+            return self.__send_and_receive_on(member, msg, **kwargs)
+
+        event = monitoring._started(listeners, msg, member.host)
+        try:
+            response = self.__send_and_receive_on(member, msg, **kwargs)
+        except Exception, why:
+            monitoring._failed(listeners, event, None, why, latency)
+            raise
+        monitoring._succeeded(listeners, event, None, latency)
+        return response
+
+    def __send_and_receive_on(self, member, msg, **kwargs):
         sock_info = None
         try:
             try:
@@ -1356,7 +1549,7 @@ class MongoReplicaSetClient(common.BaseObject):
                     sock_info.sock.settimeout(kwargs['network_timeout'])
 
                 rqst_id, data = self.__check_bson_size(msg, member.max_bson_size)
-                sock_info.sock.sendall(data)
+                helpers._send_data_on_socket(sock_info.sock, data)
                 response = self.__recv_msg(1, rqst_id, sock_info)
 
                 if "network_timeout" in kwargs:
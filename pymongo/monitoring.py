@@ -0,0 +1,362 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tools to monitor the driver's events.
+
+Subclass :class:`PoolListener` or :class:`OperationListener` and override
+the methods for the events you want, then either :func:`register` an
+instance, to listen to every client created afterwards, or pass instances
+to one client in its `event_listeners` option::
+
+  >>> class Timeouts(PoolListener):
+  ...     def wait_queue_timeout(self, address, duration):
+  ...         logging.warning("No socket for %s after %.2fs",
+  ...                         address, duration)
+  ...
+  >>> monitoring.register(Timeouts())
+
+Listeners are called synchronously by the thread the event happens in,
+so they should be quick. Exceptions raised by listeners are ignored.
+
+.. versionadded:: 2.5+
+"""
+
+import math
+import struct
+import time
+
+from bson.py3compat import b
+from pymongo.errors import OperationFailure
+
+_LISTENERS = []
+
+_OPERATIONS = {
+    2001: "update",
+    2002: "insert",
+    2004: "query",
+    2005: "get_more",
+    2006: "delete",
+    2007: "kill_cursors",
+}
+
+_EMPTY = b("")
+_NUL = b("\x00")
+
+
+class PoolListener(object):
+    """Base class for listeners to connection pool events.
+
+    `address` is the ``(host, port)`` pair the pool connects to, or
+    ``None`` if it hasn't connected yet.
+    """
+
+    def connection_created(self, address, duration):
+        """A new socket was connected in `duration` seconds.
+        """
+
+    def connection_closed(self, address, reason):
+        """A socket was closed. `reason` is one of:
+
+          - ``"idle"``: it sat idle for longer than `maxIdleTimeMS`
+          - ``"error"``: it was closed after a network error
+          - ``"reset"``: the pool was reset, e.g. by
+            :meth:`~pymongo.mongo_client.MongoClient.disconnect`
+          - ``"full"``: it was returned to a pool that was already full
+        """
+
+    def socket_checked_out(self, address):
+        """A socket was checked out of the pool.
+        """
+
+    def socket_checked_in(self, address):
+        """A socket was checked back in to the pool.
+        """
+
+    def wait_queue_timeout(self, address, duration):
+        """A thread gave up waiting for a socket after `duration` seconds,
+        because `max_pool_size` sockets were in use for `waitQueueTimeoutMS`.
+        """
+
+
+class OperationEvent(object):
+    """An operation sent to the server.
+
+    The same event is passed to :meth:`OperationListener.started` and
+    then to either :meth:`OperationListener.succeeded` or
+    :meth:`OperationListener.failed`. Its attributes are:
+
+      - `operation`: ``"query"``, ``"command"``, ``"get_more"``,
+        ``"insert"``, ``"update"``, ``"delete"`` or ``"kill_cursors"``
+      - `namespace`: the ``"database.collection"`` the operation is on, or
+        ``None`` for ``"kill_cursors"``
+      - `request_id`: the requestID of the message the reply is read for
+      - `size`: the size in bytes of the encoded message
+      - `address`: the ``(host, port)`` of the server, or ``None`` if the
+        client isn't connected yet when the operation starts
+      - `duration`: seconds from the start of the operation until its
+        reply was read, or ``None`` until it has finished
+      - `error`: the exception the operation failed with, or ``None``
+    """
+
+    def __init__(self, operation, namespace, request_id, size, address):
+        self.operation = operation
+        self.namespace = namespace
+        self.request_id = request_id
+        self.size = size
+        self.address = address
+        self.duration = None
+        self.error = None
+        self._start = time.time()
+
+    def __repr__(self):
+        return ("OperationEvent(%r, %r, request_id=%r, size=%r, address=%r,"
+                " duration=%r, error=%r)" % (
+                    self.operation, self.namespace, self.request_id,
+                    self.size, self.address, self.duration, self.error))
+
+
+class OperationListener(object):
+    """Base class for listeners to the operations a client sends.
+
+    Each method is passed an :class:`OperationEvent`.
+    """
+
+    def started(self, event):
+        """An operation is about to be sent.
+        """
+
+    def succeeded(self, event):
+        """An operation succeeded.
+        """
+
+    def failed(self, event):
+        """An operation failed, with `event.error` raised.
+
+        For writes with a write concern this includes errors reported by
+        getLastError.
+        """
+
+
+def register(listener):
+    """Register a listener for the events of every client created after
+    this call.
+
+    :Parameters:
+      - `listener`: an instance of :class:`PoolListener` or
+        :class:`OperationListener`
+    """
+    validate_listener("listener", listener)
+    _LISTENERS.append(listener)
+
+
+def validate_listener(option, listener):
+    """Raise TypeError if `listener` isn't a listener.
+    """
+    if not isinstance(listener, (PoolListener, OperationListener)):
+        raise TypeError("%s must be an instance of PoolListener or "
+                        "OperationListener" % (option,))
+    return listener
+
+
+def _get_listeners(listeners, listener_class):
+    """Get the registered listeners and those in `listeners` that are
+    instances of `listener_class`.
+    """
+    return [listener for listener in _LISTENERS + list(listeners or [])
+            if isinstance(listener, listener_class)]
+
+
+# Latency buckets: _SUB_BUCKETS per power of two from 2 ** (_MIN_EXP - 1)
+# seconds (about 1 microsecond) up to 2 ** _MAX_EXP seconds, so each
+# bucket is at most 1 / _SUB_BUCKETS of its lower bound wide.
+_SUB_BUCKETS = 8
+_MIN_EXP = -19
+_MAX_EXP = 8
+_NUM_BUCKETS = (_MAX_EXP - _MIN_EXP) * _SUB_BUCKETS
+
+
+def _bucket(seconds):
+    """The index of the latency bucket for `seconds`.
+    """
+    if seconds <= 0:
+        return 0
+    mantissa, exponent = math.frexp(seconds)
+    index = ((exponent - _MIN_EXP) * _SUB_BUCKETS +
+             int((mantissa - 0.5) * 2 * _SUB_BUCKETS))
+    if index < 0:
+        return 0
+    if index >= _NUM_BUCKETS:
+        return _NUM_BUCKETS - 1
+    return index
+
+
+def _bucket_bound(index):
+    """The lower bound in seconds of latency bucket `index`.
+    """
+    exponent, sub_bucket = divmod(index, _SUB_BUCKETS)
+    return math.ldexp(0.5 + sub_bucket / (2.0 * _SUB_BUCKETS),
+                      exponent + _MIN_EXP)
+
+
+class LatencyHistogram(object):
+    """A histogram of operation latencies with a fixed number of buckets.
+
+    Buckets grow exponentially from about a microsecond to two minutes,
+    and each is at most 1/8th of its lower bound wide, so percentiles are
+    accurate to about 12%. Recording a latency increments one bucket in
+    place, without taking a lock: while many threads record latencies
+    for the same histogram a few counts may be lost, but the
+    distribution is unaffected.
+    """
+
+    def __init__(self):
+        self.counts = [0] * _NUM_BUCKETS
+        self.total_time = 0.0
+
+    def record(self, seconds):
+        """Record one operation that took `seconds`.
+        """
+        self.counts[_bucket(seconds)] += 1
+        self.total_time += seconds
+
+    def copy(self):
+        """Get a copy of this histogram.
+        """
+        histogram = LatencyHistogram()
+        histogram.counts = self.counts[:]
+        histogram.total_time = self.total_time
+        return histogram
+
+    @property
+    def count(self):
+        """The number of operations recorded.
+        """
+        return sum(self.counts)
+
+    @property
+    def mean(self):
+        """The mean latency in seconds, or ``None`` if nothing was
+        recorded.
+        """
+        count = self.count
+        if not count:
+            return None
+        return self.total_time / count
+
+    def buckets(self):
+        """Get a list of ``(lower, upper, count)`` tuples for each
+        non-empty bucket, where `lower` and `upper` are the bucket's
+        bounds in seconds.
+        """
+        return [(_bucket_bound(i), _bucket_bound(i + 1), count)
+                for i, count in enumerate(self.counts) if count]
+
+    def percentile(self, percent):
+        """The latency in seconds below which `percent` percent of the
+        recorded operations fall, or ``None`` if nothing was recorded.
+
+        This is the upper bound of the bucket the percentile falls in.
+        """
+        counts = self.counts[:]
+        rank = sum(counts) * percent / 100.0
+        if not rank:
+            return None
+        seen = 0
+        for i, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return _bucket_bound(i + 1)
+
+    def __repr__(self):
+        return "LatencyHistogram(count=%d, mean=%r, p50=%r, p99=%r)" % (
+            self.count, self.mean, self.percentile(50), self.percentile(99))
+
+
+class _LatencyTracker(object):
+    """A :class:`LatencyHistogram` for each ``(address, operation)`` a
+    client sends.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+
+    def record(self, event):
+        key = (event.address, event.operation)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms.setdefault(key, LatencyHistogram())
+        histogram.record(event.duration)
+
+    def snapshot(self):
+        return dict([(key, histogram.copy())
+                     for key, histogram in self.histograms.items()])
+
+    def reset(self):
+        self.histograms = {}
+
+
+def _call(listeners, method, event):
+    for listener in listeners:
+        try:
+            getattr(listener, method)(event)
+        except:
+            # A listener mustn't break the operation.
+            pass
+
+
+def _started(listeners, message, address):
+    """Publish the start of sending `message`, a ``(request_id, data)``
+    or ``(request_id, data, max_doc_size)`` tuple, and return its
+    :class:`OperationEvent`.
+    """
+    request_id, data = message[0], message[1]
+    if isinstance(data, list):
+        size = sum(map(len, data))
+        # The header, then a segment starting with the namespace.
+        head = _EMPTY.join(data[:2])[:272]
+    else:
+        size = len(data)
+        head = data[:272]
+    operation = _OPERATIONS.get(struct.unpack("<i", head[12:16])[0])
+    namespace = None
+    if operation != "kill_cursors":
+        end = head.find(_NUL, 20)
+        if end != -1:
+            namespace = head[20:end].decode("utf-8", "replace")
+            if operation == "query" and namespace.endswith(".$cmd"):
+                operation = "command"
+    event = OperationEvent(operation, namespace, request_id, size, address)
+    _call(listeners, "started", event)
+    return event
+
+
+def _succeeded(listeners, event, address, latency=None):
+    event.duration = time.time() - event._start
+    if address is not None:
+        event.address = address
+    if latency is not None:
+        latency.record(event)
+    _call(listeners, "succeeded", event)
+
+
+def _failed(listeners, event, address, error, latency=None):
+    event.duration = time.time() - event._start
+    if address is not None:
+        event.address = address
+    event.error = error
+    # An error from the server took a full round trip, a network error
+    # may not have.
+    if latency is not None and isinstance(error, OperationFailure):
+        latency.record(event)
+    _call(listeners, "failed", event)
@@ -0,0 +1,227 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""One socket shared by many threads, with replies matched to requests
+by their ``responseTo`` field.
+
+.. versionadded:: 2.5+
+"""
+
+import socket
+import struct
+import sys
+
+from pymongo import helpers, thread_util
+from pymongo.errors import AutoReconnect
+
+
+class _Waiter(object):
+    """A thread waiting for the reply to one request.
+    """
+
+    def __init__(self, event_class):
+        self.event = event_class()
+        self.response = None
+        self.error = None
+
+    def set(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.event.set()
+
+    def get(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+class _Channel(object):
+    """State shared by a :class:`MultiplexedSocket` and its reader thread.
+    """
+
+    def __init__(self, sock_info, thread_support_module):
+        self.sock_info = sock_info
+        self.thread_support_module = thread_support_module
+        self.lock = thread_support_module.BoundedSemaphore(1)
+        self.send_lock = thread_support_module.BoundedSemaphore(1)
+        # Set while there are replies to wait for.
+        self.wake = thread_support_module.Event()
+        self.waiters = {}
+        self.closed = False
+        self.retired = False
+
+    def add_waiter(self, request_id):
+        waiter = _Waiter(self.thread_support_module.Event)
+        self.lock.acquire()
+        try:
+            if self.closed or self.retired:
+                raise AutoReconnect("connection closed")
+            self.waiters[request_id] = waiter
+            self.wake.set()
+        finally:
+            self.lock.release()
+        return waiter
+
+    def route(self, response_to, response):
+        """Hand a reply to the thread waiting for it.
+
+        Returns ``True`` if the channel is retired and has no more
+        replies to wait for.
+        """
+        self.lock.acquire()
+        try:
+            waiter = self.waiters.pop(response_to, None)
+            done = False
+            if not self.waiters:
+                self.wake.clear()
+                done = self.retired
+        finally:
+            self.lock.release()
+        if waiter is not None:
+            waiter.set(response)
+        return done
+
+    def retire(self):
+        """Take no more requests, and close once all replies are read.
+        """
+        self.lock.acquire()
+        try:
+            self.retired = True
+            idle = not self.waiters
+        finally:
+            self.lock.release()
+        if idle:
+            self.fail(AutoReconnect("connection closed"))
+
+    def fail(self, error):
+        """Close the socket, raising `error` in every waiting thread.
+        """
+        self.lock.acquire()
+        try:
+            self.closed = True
+            waiters, self.waiters = self.waiters, {}
+            # Let the reader thread see that we're closed.
+            self.wake.set()
+        finally:
+            self.lock.release()
+        try:
+            # Wake the reader thread if it's blocked in recv.
+            self.sock_info.sock.shutdown(socket.SHUT_RDWR)
+        except:
+            pass
+        self.sock_info.close()
+        for waiter in waiters.itervalues():
+            waiter.set(error=error)
+
+
+def _read_loop(channel):
+    """Read replies in a thread, routing each to its waiting thread.
+
+    This doesn't reference the :class:`MultiplexedSocket`, so the socket
+    is closed if it is collected.
+    """
+    sock = channel.sock_info.sock
+    while True:
+        channel.wake.wait()
+        if channel.closed:
+            return
+        try:
+            header = helpers._receive_data_on_socket(sock, 16)
+            length, _, response_to, _ = struct.unpack("<iiii", header)
+            response = helpers._receive_data_on_socket(sock, length - 16)
+        except Exception:
+            channel.fail(AutoReconnect(str(sys.exc_info()[1])))
+            return
+        if channel.route(response_to, response):
+            channel.fail(AutoReconnect("connection closed"))
+            return
+
+
+class MultiplexedSocket(object):
+    """A socket shared by many threads.
+
+    Any number of threads can send requests at once. A reader thread
+    routes each reply to the thread waiting for it by the reply's
+    ``responseTo`` field, so replies can come back in any order.
+    """
+
+    def __init__(self, sock_info, thread_support_module):
+        """Start reading replies from `sock_info`.
+
+        :Parameters:
+          - `sock_info`: a connected, authenticated
+            :class:`~pymongo.pool.SocketInfo`
+          - `thread_support_module`: the module used to spawn the reader
+            thread and create locks and events
+        """
+        self.__channel = _Channel(sock_info, thread_support_module)
+        thread_util.spawn(thread_support_module, _read_loop, self.__channel)
+
+    @property
+    def sock_info(self):
+        """The :class:`~pymongo.pool.SocketInfo` for this socket.
+        """
+        return self.__channel.sock_info
+
+    @property
+    def closed(self):
+        """Is this socket closed or retired?
+        """
+        return self.__channel.closed or self.__channel.retired
+
+    def __send(self, data):
+        channel = self.__channel
+        channel.send_lock.acquire()
+        try:
+            try:
+                helpers._send_data_on_socket(channel.sock_info.sock, data)
+            except Exception:
+                error = AutoReconnect(str(sys.exc_info()[1]))
+                channel.fail(error)
+                raise error
+        finally:
+            channel.send_lock.release()
+
+    def send(self, data):
+        """Send a message we don't wait for a reply to.
+        """
+        if self.closed:
+            raise AutoReconnect("connection closed")
+        self.__send(data)
+
+    def send_and_receive(self, request_id, data):
+        """Send a message, then wait for the reply to `request_id`.
+
+        Returns the reply with its header removed. Raises
+        :class:`~pymongo.errors.AutoReconnect` if the socket fails before
+        the reply arrives.
+        """
+        waiter = self.__channel.add_waiter(request_id)
+        self.__send(data)
+        return waiter.get()
+
+    def retire(self):
+        """Stop taking requests and close the socket once the replies to
+        requests already sent have been read.
+        """
+        self.__channel.retire()
+
+    def close(self):
+        """Close the socket now, failing requests waiting for replies.
+        """
+        self.__channel.fail(AutoReconnect("connection closed"))
+
+    def __del__(self):
+        self.__channel.retire()
@@ -0,0 +1,152 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tools for reading several cursors at once.
+
+Use :meth:`~pymongo.collection.Collection.parallel_find` to split a
+collection into cursors over disjoint ``_id`` ranges, then either hand
+the cursors to your own threads or iterate over all of them at once with
+:func:`merge_cursors`::
+
+  >>> from pymongo.parallel import merge_cursors
+  >>> for doc in merge_cursors(db.test.parallel_find(4)):
+  ...     export(doc)
+
+.. versionadded:: 2.5+
+"""
+
+import sys
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from pymongo import thread_util
+
+
+class _Done(object):
+    """Put on the queue by a thread once it is done reading its cursor.
+    """
+
+    def __init__(self, exc_info=None):
+        self.exc_info = exc_info
+
+
+def _put(results, stopped, item):
+    """Put `item` on the `results` queue, giving up once `stopped` is set.
+    """
+    while not stopped.isSet():
+        try:
+            results.put(item, True, 0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _consume(cursor, results, stopped):
+    """Read `cursor` in a thread, putting each document on `results`.
+
+    This doesn't reference the iterator returned by :func:`merge_cursors`
+    so the iterator can be collected, stopping the threads, if the caller
+    doesn't exhaust it.
+    """
+    exc_info = None
+    try:
+        for doc in cursor:
+            if not _put(results, stopped, doc):
+                return
+    except Exception:
+        exc_info = sys.exc_info()
+    _put(results, stopped, _Done(exc_info))
+
+
+def _default_thread_support_module(cursors):
+    """The thread support module of the client the first of `cursors`
+    reads from, or :mod:`~pymongo.thread_util_threading` if none of them
+    is a :class:`~pymongo.cursor.Cursor`.
+    """
+    for cursor in cursors:
+        collection = getattr(cursor, "collection", None)
+        if collection is not None:
+            return collection.database.connection.thread_support_module
+    import pymongo.thread_util_threading
+    return pymongo.thread_util_threading
+
+
+class _MergedCursors(object):
+    """Iterator over documents read from several cursors, each in its own
+    thread or greenlet.
+    """
+
+    def __init__(self, cursors, max_buffered, thread_support_module):
+        queue_class = getattr(thread_support_module, "Queue", queue.Queue)
+        self.__results = queue_class(max_buffered)
+        self.__stopped = thread_support_module.Event()
+        self.__remaining = 0
+        for cursor in cursors:
+            thread_util.spawn(thread_support_module, _consume,
+                              cursor, self.__results, self.__stopped)
+            self.__remaining += 1
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        while self.__remaining:
+            item = self.__results.get()
+            if isinstance(item, _Done):
+                self.__remaining -= 1
+                if item.exc_info is not None:
+                    self.close()
+                    exc_type, exc_value, exc_tb = item.exc_info
+                    raise exc_type, exc_value, exc_tb
+                continue
+            return item
+        raise StopIteration
+
+    def close(self):
+        """Stop reading from the cursors.
+        """
+        self.__remaining = 0
+        self.__stopped.set()
+
+    def __del__(self):
+        self.__stopped.set()
+
+
+def merge_cursors(cursors, max_buffered=1000, thread_support_module=None):
+    """Iterate over the documents of several cursors at once.
+
+    Each cursor is read in its own thread (or greenlet), and documents are
+    returned in the order they arrive, so the order between cursors is
+    unspecified. An error raised while reading any cursor is raised by the
+    returned iterator, which then stops reading the other cursors.
+
+    :Parameters:
+      - `cursors`: the cursors, or any other iterables, to read
+      - `max_buffered` (optional): the maximum number of documents read
+        ahead of the caller, to bound memory use
+      - `thread_support_module` (optional): the module used to read the
+        cursors in the background. Defaults to the
+        :attr:`~pymongo.mongo_client.MongoClient.thread_support_module`
+        of the client the cursors read from.
+
+    .. versionadded:: 2.5+
+    """
+    cursors = list(cursors)
+    if thread_support_module is None:
+        thread_support_module = _default_thread_support_module(cursors)
+    return _MergedCursors(cursors, max_buffered, thread_support_module)
@@ -18,8 +18,9 @@ import sys
 import time
 import threading
 import weakref
+from collections import deque
 
-from pymongo import thread_util
+from pymongo import monitoring, thread_util
 from pymongo.common import HAS_SSL
 from pymongo.errors import ConnectionFailure
 
@@ -36,6 +37,13 @@ if sys.platform.startswith('java'):
 else:
     from select import select
 
+try:
+    from select import poll, POLLIN, POLLPRI
+    _HAS_POLL = True
+except ImportError:
+    # Windows, Jython, or select patched by Gevent.
+    _HAS_POLL = False
+
 try:
     import gevent.coros
 except ImportError:
@@ -48,8 +56,16 @@ NO_SOCKET_YET = -1
 
 def _closed(sock):
     """Return True if we know socket has been closed, False otherwise.
+
+    Uses poll() where it's available, since select() can't handle file
+    descriptors above FD_SETSIZE.
     """
     try:
+        if _HAS_POLL:
+            poller = poll()
+            # Errors and hangups are always reported.
+            poller.register(sock, POLLIN | POLLPRI)
+            return len(poller.poll(0)) > 0
         rd, _, _ = select([sock], [], [], 0)
     # Any exception here is equally bad (select.error, ValueError, etc.).
     except:
@@ -66,19 +82,25 @@ class SocketInfo(object):
         self.authset = set()
         self.closed = False
         self.last_checkout = time.time()
+        self.last_checkin = self.last_checkout
         self.forced = False
 
         # The pool's pool_id changes with each reset() so we can close sockets
         # created before the last reset.
         self.pool_id = pool_id
 
-    def close(self):
-        self.closed = True
+        # Called with the reason the first time the socket is closed.
+        self.on_close = None
+
+    def close(self, reason="error"):
+        was_closed, self.closed = self.closed, True
         # Avoid exceptions on interpreter shutdown.
         try:
             self.sock.close()
         except:
             pass
+        if not was_closed and self.on_close is not None:
+            self.on_close(reason)
 
     def __eq__(self, other):
         # Need to check if other is NO_REQUEST or NO_SOCKET_YET, and then check
@@ -99,13 +121,82 @@ class SocketInfo(object):
         )
 
 
+class PoolStats(object):
+    """A snapshot of a connection pool's statistics.
+
+    Current state:
+
+      - `checked_out`: sockets in use
+      - `idle`: sockets waiting in the pool to be used
+      - `waiting`: threads waiting for a socket because `max_size` sockets
+        are in use
+
+    Totals since the pool was created:
+
+      - `checkouts`, `checkins`: sockets checked out and back in
+      - `connections_created`, `connections_closed`: sockets opened and
+        closed
+      - `connect_time`, `max_connect_time`: the total and longest time in
+        seconds spent opening sockets
+      - `wait_queue_timeouts`: threads that gave up waiting for a socket
+      - `wait_queue_full`: threads refused a socket because too many
+        threads were already waiting
+
+    .. versionadded:: 2.5+
+    """
+
+    def __init__(self):
+        self.checked_out = 0
+        self.idle = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.connect_time = 0.0
+        self.max_connect_time = 0.0
+        self.wait_queue_timeouts = 0
+        self.wait_queue_full = 0
+
+    def __repr__(self):
+        return "PoolStats(%s)" % ", ".join(["%s=%r" % item for item in
+                                            sorted(self.__dict__.items())])
+
+
+# How often, in seconds, a pool's maintenance task wakes to close idle
+# sockets and open sockets up to its minimum size.
+MAINTENANCE_INTERVAL = 1.0
+
+
+def _maintain(poolref, stopped, interval):
+    """Maintain a pool in the background until it's collected or stopped.
+
+    Only holds a weak reference to the pool between runs so the pool can
+    be collected.
+    """
+    while True:
+        stopped.wait(interval)
+        if stopped.isSet():
+            return
+        pool = poolref()
+        if pool is None:
+            return
+        try:
+            pool.maintain()
+        except:
+            # Connection errors; we'll try again next time.
+            pass
+        del pool
+
+
 # Do *not* explicitly inherit from object or Jython won't call __del__
 # http://bugs.jython.org/issue1057
 class Pool:
     def __init__(self, pair, max_size, net_timeout, conn_timeout, use_ssl,
                  thread_support_module, ssl_keyfile=None, ssl_certfile=None,
                  ssl_cert_reqs=None, ssl_ca_certs=None,
-                 wait_queue_timeout=None, wait_queue_multiple=None):
+                 wait_queue_timeout=None, wait_queue_multiple=None,
+                 min_size=0, max_idle_time=None, listeners=None):
         """
         :Parameters:
           - `pair`: a (hostname, port) tuple
@@ -141,11 +232,34 @@ class Pool:
             free sockets.
           - `wait_queue_multiple`: (integer) Multiplied by max_pool_size to give
             the number of threads allowed to wait for a socket at one time.
+          - `min_size`: The number of sockets a background task keeps open,
+            idle or in use, once the pool knows what to connect to.
+          - `max_idle_time`: timeout in seconds after which an idle socket
+            is closed, or `None` to keep idle sockets open forever.
+          - `listeners`: a list of
+            :class:`~pymongo.monitoring.PoolListener` to notify of this
+            pool's events, in addition to those registered with
+            :func:`~pymongo.monitoring.register`.
+
+        If `min_size` or `max_idle_time` is set, the maintenance task also
+        checks idle sockets for errors, so checking a socket out of the
+        pool doesn't have to.
         """
 
         self.thread_support_module = thread_support_module
-        self.sockets = set()
+        # Idle sockets, least recently used first. Checkouts take the most
+        # recently used socket so a few hot sockets serve most operations,
+        # and the rest sit idle long enough to be closed.
+        self.sockets = deque()
         self.lock = threading.Lock()
+        # Sockets checked out of the pool, including request sockets.
+        self.active_sockets = 0
+
+        # Guards self._stats only, so listeners can call get_stats().
+        self._stats_lock = threading.Lock()
+        self._stats = PoolStats()
+        self._listeners = monitoring._get_listeners(listeners,
+                                                    monitoring.PoolListener)
 
         # Keep track of resets, so we notice sockets created before the most
         # recent reset and close them.
@@ -162,6 +276,14 @@ class Pool:
         self.ssl_certfile = ssl_certfile
         self.ssl_cert_reqs = ssl_cert_reqs
         self.ssl_ca_certs = ssl_ca_certs
+        self.min_size = min_size
+        self.max_idle_time = max_idle_time
+        self._sweep_idle = bool(min_size or max_idle_time is not None)
+
+        # The pair the maintenance task connects to, if we weren't given one.
+        self._maintenance_pair = None
+        self._maintenance_pid = None
+        self._maintenance_stopped = None
 
         if HAS_SSL and use_ssl and not ssl_cert_reqs:
             self.ssl_cert_reqs = ssl.CERT_NONE
@@ -202,13 +324,139 @@ class Pool:
             # thread is modifying self.sockets, or replacing it, in this
             # critical section.
             self.lock.acquire()
-            sockets, self.sockets = self.sockets, set()
+            sockets, self.sockets = self.sockets, deque()
         finally:
             self.lock.release()
 
         for sock_info in sockets:
+            sock_info.close("reset")
+
+    def get_stats(self):
+        """Get a :class:`PoolStats` snapshot of this pool's statistics.
+        """
+        stats = PoolStats()
+        self._stats_lock.acquire()
+        try:
+            stats.__dict__.update(self._stats.__dict__)
+        finally:
+            self._stats_lock.release()
+        stats.checked_out = self.active_sockets
+        stats.idle = len(self.sockets)
+        return stats
+
+    def _count(self, stat, value=1):
+        self._stats_lock.acquire()
+        try:
+            setattr(self._stats, stat, getattr(self._stats, stat) + value)
+        finally:
+            self._stats_lock.release()
+
+    def _publish(self, event, *args):
+        """Call `event` on each listener with this pool's address and
+        `args`.
+        """
+        address = self.pair or self._maintenance_pair
+        for listener in self._listeners:
+            try:
+                getattr(listener, event)(address, *args)
+            except:
+                # A listener mustn't break the pool.
+                pass
+
+    def _socket_closed(self, reason):
+        self._count("connections_closed")
+        if self._listeners:
+            self._publish("connection_closed", reason)
+
+    def _acquire_slot(self):
+        """Wait for fewer than max_size sockets to be in use, counting
+        waiting threads and timeouts.
+        """
+        if self._socket_semaphore.acquire(False):
+            return True
+        start = time.time()
+        self._count("waiting")
+        try:
+            try:
+                acquired = self._socket_semaphore.acquire(
+                    True, self.wait_queue_timeout)
+            except thread_util.ExceededMaxWaiters:
+                self._count("wait_queue_full")
+                raise
+        finally:
+            self._count("waiting", -1)
+        if not acquired:
+            self._count("wait_queue_timeouts")
+            if self._listeners:
+                self._publish("wait_queue_timeout", time.time() - start)
+        return acquired
+
+    def _idle_too_long(self, sock_info, now):
+        return (self.max_idle_time is not None and
+                now - sock_info.last_checkin > self.max_idle_time)
+
+    def _start_maintenance(self):
+        """Start the maintenance task, or restart it after a fork.
+        """
+        self._maintenance_pid = self.pid
+        if self._maintenance_stopped is not None:
+            self._maintenance_stopped.set()
+        self._maintenance_stopped = self.thread_support_module.Event()
+        thread_util.spawn(self.thread_support_module, _maintain,
+                          weakref.ref(self), self._maintenance_stopped,
+                          MAINTENANCE_INTERVAL)
+
+    def maintain(self):
+        """Close sockets idle for longer than `max_idle_time` and idle
+        sockets with errors, then open sockets until `min_size`, or
+        `max_size` if it's smaller, are open.
+        """
+        if self.pid != os.getpid():
+            return
+
+        stale, dead = [], []
+        self.lock.acquire()
+        try:
+            now = time.time()
+            while self.sockets and self._idle_too_long(self.sockets[0], now):
+                stale.append(self.sockets.popleft())
+
+            # Check under the lock: a socket that's checked out may have a
+            # reply waiting, which looks the same as being closed.
+            alive = deque()
+            for sock_info in self.sockets:
+                if _closed(sock_info.sock):
+                    dead.append(sock_info)
+                else:
+                    alive.append(sock_info)
+            self.sockets = alive
+        finally:
+            self.lock.release()
+        for sock_info in stale:
+            sock_info.close("idle")
+        for sock_info in dead:
             sock_info.close()
 
+        pair = self.pair or self._maintenance_pair
+        if pair is None:
+            return
+        min_size = self.min_size
+        if self.max_size is not None:
+            min_size = min(min_size, self.max_size)
+        while len(self.sockets) + self.active_sockets < min_size:
+            sock_info = self.connect(pair)
+            self.lock.acquire()
+            try:
+                current = sock_info.pool_id == self.pool_id
+                if current:
+                    self.sockets.append(sock_info)
+            finally:
+                self.lock.release()
+            if not current:
+                # Reset while connecting.
+                sock_info.close("reset")
+                return
+
     def create_connection(self, pair):
         """Connect to *pair* and return the socket object.
 
@@ -267,6 +515,7 @@ class Pool:
            pool does not keep a reference to the socket -- you must call
            return_socket() when you're done with it.
         """
+        start = time.time()
         sock = self.create_connection(pair)
         hostname = (pair or self.pair)[0]
 
@@ -286,7 +535,28 @@ class Pool:
                                         "not be configured with SSL support.")
 
         sock.settimeout(self.net_timeout)
-        return SocketInfo(sock, self.pool_id, hostname)
+        sock_info = SocketInfo(sock, self.pool_id, hostname)
+
+        # Don't refer directly to self, otherwise there's a cycle.
+        poolref = weakref.ref(self)
+        def on_close(reason):
+            pool = poolref()
+            if pool is not None:
+                pool._socket_closed(reason)
+        sock_info.on_close = on_close
+
+        duration = time.time() - start
+        self._stats_lock.acquire()
+        try:
+            self._stats.connections_created += 1
+            self._stats.connect_time += duration
+            self._stats.max_connect_time = max(self._stats.max_connect_time,
+                                               duration)
+        finally:
+            self._stats_lock.release()
+        if self._listeners:
+            self._publish("connection_created", duration)
+        return sock_info
 
     def get_socket(self, pair=None, force=False):
         """Get a socket from the pool.
@@ -306,6 +576,12 @@ class Pool:
         if self.pid != os.getpid():
             self.reset()
 
+        if pair is not None:
+            self._maintenance_pair = pair
+        if ((self.min_size or self.max_idle_time is not None) and
+            self._maintenance_pid != self.pid):
+            self._start_maintenance()
+
         # Have we opened a socket for this request?
         req_state = self._get_request_state()
         if req_state not in (NO_SOCKET_YET, NO_REQUEST):
@@ -326,23 +602,35 @@ class Pool:
             # having acquired it for this socket.
             if not self._socket_semaphore.acquire(False):
                 forced = True
-        elif not self._socket_semaphore.acquire(True, self.wait_queue_timeout):
+        elif not self._acquire_slot():
             raise socket.timeout()
-        sock_info, from_pool = None, None
+        sock_info, from_pool = None, False
+        stale = []
+        self.lock.acquire()
         try:
-            try:
-                # set.pop() isn't atomic in Jython less than 2.7, see
-                # http://bugs.jython.org/issue1854
-                self.lock.acquire()
+            if self.sockets:
                 sock_info, from_pool = self.sockets.pop(), True
-            finally:
-                self.lock.release()
-        except KeyError:
-            sock_info, from_pool = self.connect(pair), False
-
-        if from_pool:
-            sock_info = self._check(sock_info, pair)
+                if self._idle_too_long(sock_info, time.time()):
+                    # The other idle sockets have been idle even longer.
+                    stale.append(sock_info)
+                    stale.extend(self.sockets)
+                    self.sockets.clear()
+                    sock_info, from_pool = None, False
+        finally:
+            self.lock.release()
+        for stale_sock in stale:
+            stale_sock.close("idle")
+        try:
+            if from_pool:
+                sock_info = self._check(sock_info, pair)
+            else:
+                sock_info = self.connect(pair)
+        except:
+            if not forced:
+                self._socket_semaphore.release()
+            raise
 
+        self._checked_out()
         sock_info.forced = forced
 
         if req_state == NO_SOCKET_YET:
@@ -392,15 +680,11 @@ class Pool:
         """Return the socket to the pool unless it's the request socket.
         """
         if self.pid != os.getpid():
-            if not sock_info.forced:
-                self._socket_semaphore.release()
+            self._release_slot(sock_info)
             self.reset()
         elif sock_info not in (NO_REQUEST, NO_SOCKET_YET):
             if sock_info.closed:
-                if sock_info.forced:
-                    sock_info.forced = False
-                else:
-                    self._socket_semaphore.release()
+                self._release_slot(sock_info)
                 return
 
             if sock_info != self._get_request_state():
@@ -409,16 +693,47 @@ class Pool:
     def _return_socket(self, sock_info):
         """Return socket to the pool. If pool is full the socket is discarded.
         """
+        reason = None
         try:
             self.lock.acquire()
-            if (len(self.sockets) < self.max_size
-                and sock_info.pool_id == self.pool_id
-            ):
-                self.sockets.add(sock_info)
+            if sock_info.pool_id != self.pool_id:
+                reason = "reset"
+            elif len(self.sockets) < self.max_size:
+                sock_info.last_checkin = time.time()
+                self.sockets.append(sock_info)
             else:
-                sock_info.close()
+                reason = "full"
+        finally:
+            self.lock.release()
+
+        if reason is not None:
+            sock_info.close(reason)
+        self._release_slot(sock_info)
+
+    def _checked_out(self):
+        """Count a socket taking a slot under max_size.
+        """
+        self.lock.acquire()
+        try:
+            self.active_sockets += 1
+        finally:
+            self.lock.release()
+        self._count("checkouts")
+        if self._listeners:
+            self._publish("socket_checked_out")
+
+    def _release_slot(self, sock_info):
+        """Give back the room under max_size that `sock_info` took when
+        it was checked out.
+        """
+        self.lock.acquire()
+        try:
+            self.active_sockets -= 1
         finally:
             self.lock.release()
+        self._count("checkins")
+        if self._listeners:
+            self._publish("socket_checked_in")
 
         if sock_info.forced:
             sock_info.forced = False
@@ -436,7 +751,8 @@ class Pool:
         :class:`~pymongo.errors.AutoReconnect` exceptions on server
         hiccups, etc. We only do this if it's been > 1 second since
         the last socket checkout, to keep performance reasonable - we
-        can't avoid AutoReconnects completely anyway.
+        can't avoid AutoReconnects completely anyway. Idle sockets aren't
+        checked here at all if the maintenance task checks them.
         """
         error = False
 
@@ -444,9 +760,13 @@ class Pool:
             error = True
 
         elif self.pool_id != sock_info.pool_id:
-            sock_info.close()
+            sock_info.close("reset")
             error = True
 
+        elif self._sweep_idle and not acquire_on_connect:
+            # Checked by the maintenance task while it was idle.
+            pass
+
         elif time.time() - sock_info.last_checkout > 1:
             if _closed(sock_info.sock):
                 sock_info.close()
@@ -456,10 +776,19 @@ class Pool:
             return sock_info
         else:
             try:
-                if acquire_on_connect:
-                    if not self._socket_semaphore.acquire(True, self.wait_queue_timeout):
-                        raise socket.timeout()
-                return self.connect(pair)
+                if not acquire_on_connect:
+                    return self.connect(pair)
+
+                # The request socket gave back its slot when it closed.
+                if not self._acquire_slot():
+                    raise socket.timeout()
+                try:
+                    sock_info = self.connect(pair)
+                except:
+                    self._socket_semaphore.release()
+                    raise
+                self._checked_out()
+                return sock_info
             except socket.error:
                 self.reset()
                 raise
@@ -509,6 +838,9 @@ class Pool:
         return self._tid_to_sock.get(tid, NO_REQUEST)
 
     def __del__(self):
+        if self._maintenance_stopped is not None:
+            self._maintenance_stopped.set()
+
         # Avoid ResourceWarnings in Python 3
         for sock_info in self.sockets:
             sock_info.close()
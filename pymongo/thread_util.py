@@ -14,6 +14,26 @@
 
 """Utilities to abstract the differences between threads and greenlets."""
 
+import threading
+
+
+def spawn(thread_support_module, target, *args):
+    """Call `target` with `args` in the background, using
+    `thread_support_module`'s ``spawn`` if it has one.
+
+    Modules passed by the application may not know how to spawn, then a
+    daemon thread is used. Returns the thread or greenlet, which can be
+    joined.
+    """
+    module_spawn = getattr(thread_support_module, "spawn", None)
+    if module_spawn is not None:
+        return module_spawn(target, *args)
+    thread = threading.Thread(target=target, args=args)
+    thread.setDaemon(True)
+    thread.start()
+    return thread
+
+
 class IdentBase(object):
     def __init__(self):
         self._refs = {}
@@ -3,6 +3,7 @@ from gevent import Greenlet
 from gevent.coros import BoundedSemaphore
 from gevent.event import Event
 from gevent.local import local
+from gevent.queue import Queue
 import weakref
 
 from pymongo import thread_util
@@ -35,6 +36,14 @@ class MaxWaitersBoundedSemaphore(thread_util.MaxWaitersBoundedSemaphore):
             self, BoundedSemaphore, value, max_waiters)
 
 
+def spawn(target, *args):
+    """Call `target` with `args` in a new Greenlet.
+
+    Returns the Greenlet, which can be joined.
+    """
+    return Greenlet.spawn(target, *args)
+
+
 class ReplSetMonitor(mongo_replica_set_client.Monitor, Greenlet):
     """Greenlet based replica set monitor.
     """
@@ -1,6 +1,10 @@
 import sys
 import threading
-from threading import local
+from threading import Event, local
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
 try:
     from time import monotonic as _time
 except ImportError:
@@ -136,6 +140,17 @@ class MaxWaitersBoundedSemaphore(thread_util.MaxWaitersBoundedSemaphore):
             self, BoundedSemaphore, value, max_waiters)
 
 
+def spawn(target, *args):
+    """Call `target` with `args` in a new daemon thread.
+
+    Returns the thread, which can be joined.
+    """
+    thread = threading.Thread(target=target, args=args)
+    thread.setDaemon(True)
+    thread.start()
+    return thread
+
+
 class ReplSetMonitor(mongo_replica_set_client.Monitor, threading.Thread):
     """Thread based replica set monitor.
     """
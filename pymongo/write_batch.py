@@ -0,0 +1,186 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Pipelined writes to a collection.
+
+Use :meth:`~pymongo.collection.Collection.write_batch` to get a
+:class:`WriteBatch`::
+
+  >>> with db.test.write_batch() as batch:
+  ...     for i in range(1000):
+  ...         batch.update({"_id": i}, {"$inc": {"n": 1}})
+  ...     batch.remove({"n": 0})
+
+.. versionadded:: 2.5+
+"""
+
+from pymongo.errors import InvalidOperation, OperationFailure
+
+
+class WriteBatch(object):
+    """Queues inserts, updates and removes on a collection and sends
+    them back to back on one socket.
+
+    Nothing is sent to the server until :meth:`flush` is called, or the
+    ``with`` block exits without an exception. All the queued writes are
+    then sent at once, followed by reading the responses to their
+    getLastError calls, so a batch of writes costs a single round trip.
+    Every queued write is sent even if an earlier one fails, and the
+    first error is raised once all the responses have been read. If the
+    ``with`` block raises, the queued writes are discarded.
+
+    Queued writes are sent early when they add up to more than the
+    server's maximum message size. An error from those writes is held
+    and raised by the next :meth:`flush`, so it is never blamed on the
+    write being queued.
+
+    Don't create instances of this class directly, use
+    :meth:`~pymongo.collection.Collection.write_batch` instead.
+    """
+
+    def __init__(self, collection, safe=None, **kwargs):
+        self.__collection = collection
+        self.__client = collection.database.connection
+        self.__safe, self.__options = collection._get_write_mode(safe,
+                                                                 **kwargs)
+        self.__messages = []
+        self.__size = 0
+        self.__error = None
+        self.__closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.flush()
+        self.__messages = []
+        self.__error = None
+        self.__closed = True
+        # Don't suppress exceptions.
+        return False
+
+    @property
+    def collection(self):
+        """The :class:`~pymongo.collection.Collection` this batch writes
+        to.
+        """
+        return self.__collection
+
+    # The limits and _send_message are used by Collection to build the
+    # queued messages, as it would with a client.
+    @property
+    def max_bson_size(self):
+        return self.__client.max_bson_size
+
+    @property
+    def max_message_size(self):
+        return self.__client.max_message_size
+
+    @property
+    def max_write_batch_size(self):
+        return self.__client.max_write_batch_size
+
+    def _send_message(self, message, with_last_error=False):
+        """Queue `message`, sending the queue first if it would grow
+        larger than the server's maximum message size.
+        """
+        if self.__closed:
+            raise InvalidOperation("cannot write to a closed write batch")
+        data = message[1]
+        if isinstance(data, list):
+            size = sum(map(len, data))
+        else:
+            size = len(data)
+        max_size = self.max_message_size
+        if self.__messages and max_size and self.__size + size > max_size:
+            error = self.__send()
+            if self.__error is None:
+                self.__error = error
+        self.__messages.append((message, with_last_error))
+        self.__size += size
+
+    def insert(self, doc_or_docs, manipulate=True,
+               check_keys=True, continue_on_error=False):
+        """Queue an insert of a document(s).
+
+        Takes the same arguments as
+        :meth:`~pymongo.collection.Collection.insert`, except the write
+        concern, which is set for the whole batch. Returns the ``'_id'``
+        value (or list of ``'_id'`` values) of `doc_or_docs`.
+
+        Documents that don't fit in one insert message are queued as
+        several messages. They are all sent, even if `continue_on_error`
+        is ``False`` and an earlier one fails, because no error is known
+        until the batch is flushed.
+        """
+        return self.__collection._insert(doc_or_docs, manipulate,
+                                         check_keys, self.__safe,
+                                         self.__options, continue_on_error,
+                                         self)
+
+    def update(self, spec, document, upsert=False, manipulate=False,
+               multi=False, check_keys=True):
+        """Queue an update of a document(s).
+
+        Takes the same arguments as
+        :meth:`~pymongo.collection.Collection.update`, except the write
+        concern, which is set for the whole batch.
+        """
+        self.__collection._update(spec, document, upsert, manipulate,
+                                  self.__safe, self.__options, multi,
+                                  check_keys, self)
+
+    def remove(self, spec_or_id=None):
+        """Queue a removal of a document(s).
+
+        Takes the same arguments as
+        :meth:`~pymongo.collection.Collection.remove`, except the write
+        concern, which is set for the whole batch.
+        """
+        self.__collection._remove(spec_or_id, self.__safe,
+                                  self.__options, self)
+
+    def flush(self):
+        """Send all the queued writes and wait for them to be
+        acknowledged.
+
+        Raises :class:`~pymongo.errors.OperationFailure` for the first
+        write that failed since the last flush, including writes sent
+        early because the queue was full, if write acknowledgement is
+        enabled.
+        """
+        held, self.__error = self.__error, None
+        error = self.__send()
+        if held is not None:
+            raise held
+        if error is not None:
+            raise error
+
+    def __send(self):
+        """Send all the queued writes, returning the
+        :class:`~pymongo.errors.OperationFailure` for the first that
+        failed, if write acknowledgement is enabled.
+        """
+        messages = self.__messages
+        self.__messages = []
+        self.__size = 0
+        if not messages:
+            return None
+        results = self.__client._send_messages(messages)
+        if self.__safe:
+            for result in results:
+                if isinstance(result, OperationFailure):
+                    return result
+        return None
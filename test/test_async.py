@@ -0,0 +1,358 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the async_client module against a fake server."""
+
+import struct
+import sys
+import unittest
+import uuid
+sys.path[0:0] = [""]
+
+from nose.plugins.skip import SkipTest
+
+from bson import BSON, decode_all
+from bson.binary import OLD_UUID_SUBTYPE, UUID_SUBTYPE
+from bson.py3compat import b
+from pymongo import common
+from pymongo.async_client import (asyncio,
+                                  AsyncCursor,
+                                  AsyncDatabase,
+                                  AsyncMongoClient,
+                                  HAS_ASYNCIO,
+                                  _Connection)
+from pymongo.errors import (AutoReconnect,
+                            ConfigurationError,
+                            DuplicateKeyError,
+                            OperationFailure)
+from test.test_helpers import make_reply
+
+if HAS_ASYNCIO:
+    _Protocol = asyncio.Protocol
+else:
+    _Protocol = object
+
+
+def reply_message(response_to, docs, cursor_id=0):
+    data = make_reply(docs, cursor_id=cursor_id)
+    return struct.pack("<iiii", 16 + len(data), 0,
+                       response_to, 1) + data
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.written = []
+        self.closed = False
+
+    def write(self, data):
+        self.written.append(data)
+
+    def writelines(self, data):
+        self.written.extend(data)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeServer(_Protocol):
+    """Just enough of a server to answer inserts, queries, getMores,
+    counts and getLastError.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.buffer = b("")
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.state["connections"] += 1
+
+    def data_received(self, data):
+        self.buffer += data
+        while len(self.buffer) >= 16:
+            length, request_id, _, op = struct.unpack("<iiii",
+                                                      self.buffer[:16])
+            if len(self.buffer) < length:
+                return
+            body = self.buffer[16:length]
+            self.buffer = self.buffer[length:]
+            self.handle(request_id, op, body)
+
+    def handle(self, request_id, op, body):
+        state = self.state
+        if op == 2002:  # Insert
+            state["inserts"] += 1
+            name_end = body.index(b("\x00"), 4)
+            docs = decode_all(body[name_end + 1:])
+            for doc in docs:
+                if doc["_id"] in [d["_id"] for d in state["docs"]]:
+                    state["last_error"] = {"err": "E11000 duplicate key",
+                                           "code": 11000, "ok": 1}
+                else:
+                    state["docs"].append(doc)
+        elif op == 2004:  # Query
+            name_end = body.index(b("\x00"), 4)
+            name = body[4:name_end]
+            skip, ntoreturn = struct.unpack("<ii",
+                                            body[name_end + 1:name_end + 9])
+            spec = BSON(body[name_end + 9:]).decode()
+            if name.endswith(b(".$cmd")):
+                if "getlasterror" in spec:
+                    doc = state["last_error"]
+                    state["last_error"] = {"err": None, "ok": 1}
+                elif "count" in spec:
+                    doc = {"n": len(state["docs"]), "ok": 1}
+                else:
+                    doc = {"errmsg": "no such cmd", "ok": 0}
+                self.reply(request_id, [doc])
+            else:
+                state["batches"] = [state["docs"][i:i + 2] for i in
+                                    range(0, len(state["docs"]), 2)]
+                self.reply_batch(request_id)
+        elif op == 2005:  # Get more
+            state["get_mores"] += 1
+            self.reply_batch(request_id)
+        elif op == 2007:  # Kill cursors
+            state["killed"] += 1
+
+    def reply_batch(self, request_id):
+        batches = self.state["batches"]
+        docs = batches and batches.pop(0) or []
+        self.reply(request_id, docs, batches and 42 or 0)
+
+    def reply(self, request_id, docs, cursor_id=0):
+        self.transport.write(reply_message(request_id, docs, cursor_id))
+
+
+class RecordingClient(common.BaseObject):
+    """Records the write messages sent through it, without asyncio."""
+
+    document_class = dict
+    tz_aware = False
+
+    def __init__(self):
+        super(RecordingClient, self).__init__()
+        self.sent = []
+
+    def _send_message(self, msg, with_last_error=False):
+        self.sent.append(msg)
+
+
+class TestAsyncCollection(unittest.TestCase):
+
+    def setUp(self):
+        self.client = RecordingClient()
+        self.coll = AsyncDatabase(self.client, "db").test
+
+    def test_uuid_subtype(self):
+        coll = self.coll
+        self.assertEqual(OLD_UUID_SUBTYPE, coll.uuid_subtype)
+        self.assertRaises(ConfigurationError, setattr,
+                          coll, "uuid_subtype", 42)
+        coll.uuid_subtype = UUID_SUBTYPE
+        self.assertEqual(UUID_SUBTYPE, coll.uuid_subtype)
+
+        # Writes and queries encode UUIDs with the collection's subtype.
+        value = uuid.uuid4()
+        encoded = struct.pack("<ib", 16, UUID_SUBTYPE) + value.bytes
+        coll.update({"u": value}, {"$set": {"x": 1}})
+        coll.remove({"u": value})
+        self.assertEqual(2, len(self.client.sent))
+        for msg in self.client.sent:
+            self.assertTrue(encoded in msg[1])
+        self.assertTrue(isinstance(coll.find({"u": value}), AsyncCursor))
+
+
+class TestConnection(unittest.TestCase):
+
+    def setUp(self):
+        if not HAS_ASYNCIO:
+            raise SkipTest("asyncio is not available")
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_route_by_response_to(self):
+        connection = _Connection(self.loop)
+        transport = FakeTransport()
+        connection.connection_made(transport)
+        first = connection.send(1, b("one"), True)
+        self.assertEqual(None, connection.send(2, [b("tw"), b("o")], False))
+        third = connection.send(3, b("three"), True)
+        self.assertEqual([b("one"), b("tw"), b("o"), b("three")],
+                         transport.written)
+
+        # Replies come back out of order and split across reads.
+        data = reply_message(3, [{"n": 3}]) + reply_message(1, [{"n": 1}])
+        connection.data_received(data[:5])
+        connection.data_received(data[5:30])
+        self.assertFalse(first.done())
+        self.assertFalse(third.done())
+        connection.data_received(data[30:])
+        self.assertEqual(make_reply([{"n": 1}]), first.result())
+        self.assertEqual(make_reply([{"n": 3}]), third.result())
+
+    def test_connection_lost(self):
+        connection = _Connection(self.loop)
+        connection.connection_made(FakeTransport())
+        pending = connection.send(1, b("one"), True)
+        connection.connection_lost(None)
+        self.assertTrue(isinstance(pending.exception(), AutoReconnect))
+        self.assertRaises(AutoReconnect, connection.send, 2, b("two"), True)
+
+
+class TestAsyncMongoClient(unittest.TestCase):
+
+    def setUp(self):
+        if not HAS_ASYNCIO:
+            raise SkipTest("asyncio is not available")
+        self.loop = asyncio.new_event_loop()
+        self.state = {"connections": 0, "docs": [], "killed": 0,
+                      "batches": [], "get_mores": 0, "inserts": 0,
+                      "last_error": {"err": None, "ok": 1}}
+        state = self.state
+        self.server = self.wait(self.loop.create_server(
+            lambda: FakeServer(state), "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def tearDown(self):
+        self.server.close()
+        self.wait(self.server.wait_closed())
+        self.loop.close()
+
+    def wait(self, future):
+        return self.loop.run_until_complete(future)
+
+    def client(self, **kwargs):
+        return AsyncMongoClient("127.0.0.1", self.port,
+                                loop=self.loop, **kwargs)
+
+    def test_insert_find_count(self):
+        client = self.client()
+        coll = client.db.test
+        ids = self.wait(coll.insert([{"x": i} for i in range(5)]))
+        self.assertEqual(5, len(ids))
+        self.assertEqual(5, self.wait(coll.count()))
+
+        # Three batches of two, with a getMore for each after the first.
+        cursor = coll.find()
+        docs = self.wait(cursor.to_list())
+        self.assertEqual(range(5), [doc["x"] for doc in docs])
+        self.assertFalse(cursor.alive)
+
+        self.assertEqual(0, self.wait(coll.find_one())["x"])
+        client.close()
+
+    def test_fetch_next(self):
+        client = self.client()
+        coll = client.db.test
+        self.wait(coll.insert([{"x": i} for i in range(3)]))
+        cursor = coll.find()
+        found = []
+        while self.wait(cursor.fetch_next()):
+            found.append(cursor.next_object()["x"])
+        self.assertEqual([0, 1, 2], found)
+        self.assertEqual(None, cursor.next_object())
+
+        # A cursor closed early is killed on the server.
+        cursor = coll.find()
+        self.assertTrue(self.wait(cursor.fetch_next()))
+        self.wait(cursor.close())
+        self.assertEqual(1, self.state["killed"])
+
+    def test_concurrent_fetch_next(self):
+        client = self.client()
+        coll = client.db.test
+        self.wait(coll.insert([{"x": i} for i in range(3)]))
+        cursor = coll.find()
+        # Only one query is sent, the second call waits for its reply.
+        self.assertEqual([True, True], self.wait(asyncio.gather(
+            cursor.fetch_next(), cursor.fetch_next())))
+        self.assertEqual([0, 1], [cursor.next_object()["x"]
+                                  for _ in range(2)])
+
+        # Likewise only one getMore.
+        self.assertEqual([True, True], self.wait(asyncio.gather(
+            cursor.fetch_next(), cursor.fetch_next())))
+        self.assertEqual(1, self.state["get_mores"])
+        self.assertEqual(2, cursor.next_object()["x"])
+        self.assertFalse(self.wait(cursor.fetch_next()))
+        self.assertFalse(cursor.alive)
+
+    def test_errors(self):
+        client = self.client()
+        coll = client.db.test
+        self.wait(coll.insert({"_id": 1}))
+        self.assertRaises(DuplicateKeyError, self.wait,
+                          coll.insert({"_id": 1}))
+        # Unacknowledged writes don't check for errors.
+        self.assertEqual(1, self.wait(coll.insert({"_id": 1}, w=0)))
+        self.assertRaises(OperationFailure, self.wait,
+                          client.db.command("foo"))
+
+    def test_insert_batches(self):
+        client = self.client()
+        coll = client.db.test
+        ids = self.wait(coll.insert([{"_id": i} for i in range(2500)]))
+        self.assertEqual(range(2500), ids)
+        self.assertEqual(3, self.state["inserts"])
+
+        # No more batches are sent after one fails.
+        self.state["inserts"] = 0
+        docs = [{"_id": 0}] + [{"_id": i} for i in range(3000, 4500)]
+        self.assertRaises(DuplicateKeyError, self.wait, coll.insert(docs))
+        self.assertEqual(1, self.state["inserts"])
+
+        # Even when the error isn't raised.
+        self.state["inserts"] = 0
+        docs = [{"_id": 0}] + [{"_id": i} for i in range(5000, 6500)]
+        self.wait(coll.insert(docs, w=0))
+        self.assertEqual(1, self.state["inserts"])
+
+        # Unless asked to continue.
+        self.state["inserts"] = 0
+        docs = [{"_id": 0}] + [{"_id": i} for i in range(7000, 8500)]
+        self.assertRaises(DuplicateKeyError, self.wait,
+                          coll.insert(docs, continue_on_error=True))
+        self.assertEqual(2, self.state["inserts"])
+
+    def test_many_operations_in_flight(self):
+        client = self.client(max_pool_size=5)
+        coll = client.db.test
+        self.wait(coll.insert({"_id": 1}))
+        futures = [coll.find_one() for _ in range(500)]
+        results = self.wait(asyncio.gather(*futures))
+        self.assertEqual([{"_id": 1}] * 500, results)
+        self.assertTrue(self.state["connections"] <= 5)
+
+    def test_connection_refused(self):
+        self.server.close()
+        self.wait(self.server.wait_closed())
+        client = self.client()
+        self.assertRaises(AutoReconnect, self.wait,
+                          client.db.test.find_one())
+
+    def test_options(self):
+        client = AsyncMongoClient("mongodb://127.0.0.1:%d/?w=0" % self.port,
+                                  loop=self.loop)
+        self.assertEqual(("127.0.0.1", self.port), (client.host, client.port))
+        self.assertEqual({"w": 0}, client.write_concern)
+        self.assertEqual({"w": 0}, client.db.test.write_concern)
+        self.assertRaises(ConfigurationError, self.client, foo=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
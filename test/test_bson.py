@@ -32,15 +32,18 @@ from nose.plugins.skip import SkipTest
 import bson
 from bson import (BSON,
                   decode_all,
+                  decode_file_iter,
+                  decode_iter,
                   is_valid)
 from bson.binary import Binary, UUIDLegacy
 from bson.code import Code
 from bson.objectid import ObjectId
 from bson.dbref import DBRef
-from bson.py3compat import b
+from bson.py3compat import b, StringIO
 from bson.son import SON
 from bson.timestamp import Timestamp
-from bson.errors import (InvalidDocument,
+from bson.errors import (InvalidBSON,
+                         InvalidDocument,
                          InvalidStringData)
 from bson.max_key import MaxKey
 from bson.min_key import MinKey
@@ -90,6 +93,60 @@ class TestBSON(unittest.TestCase):
                                       "\x6f\x20\x77\x6F\x72\x6C\x64\x00\x00"
                                       "\x05\x00\x00\x00\x00")))
 
+    def test_decode_iter(self):
+        docs = [{"_id": i, "x": u"y" * i} for i in range(10)]
+        data = b("").join([BSON.encode(doc) for doc in docs])
+
+        iterator = decode_iter(data)
+        self.assertEqual(docs[0], iterator.next())
+        self.assertEqual(docs[1:], list(iterator))
+        self.assertEqual([], list(decode_iter(b(""))))
+        self.assertEqual([SON], [type(doc) for doc in
+                                 decode_iter(BSON.encode({}), SON)])
+        self.assertRaises(InvalidBSON, list, decode_iter(data[:-1]))
+        self.assertRaises(InvalidBSON, list, decode_iter(data + b("\x01")))
+
+    def test_decode_buffer(self):
+        docs = [{"_id": i, "x": u"y" * i} for i in range(3)]
+        data = b("").join([BSON.encode(doc) for doc in docs])
+        first = len(BSON.encode(docs[0]))
+
+        buffers = [bytearray(data)]
+        if sys.version_info[:2] >= (2, 7):
+            buffers.append(memoryview(data))
+        if not PY3:
+            buffers.append(buffer(data))
+        for buf in buffers:
+            self.assertEqual(docs, decode_all(buf))
+            self.assertEqual(docs, list(decode_iter(buf)))
+            self.assertEqual(docs[1:], decode_all(buf, dict, True, 3, first))
+            self.assertEqual(docs[:1],
+                             decode_all(buf, dict, True, 3, 0, first))
+            self.assertEqual(docs[1:],
+                             list(decode_iter(buf, dict, True, 3, first)))
+            self.assertEqual(docs[0], bson._bson_to_dict(buf, dict, True, 3,
+                                                         0, first)[0])
+
+        self.assertRaises(TypeError, decode_all, u"test")
+        self.assertRaises(TypeError, decode_all, 100)
+        self.assertRaises(ValueError, decode_all, data, dict, True, 3, -1)
+        self.assertRaises(ValueError, decode_all, data, dict, True, 3,
+                          len(data) + 1)
+        self.assertRaises(ValueError, decode_all, data, dict, True, 3, 1,
+                          len(data))
+        self.assertRaises(InvalidBSON, decode_all, data, dict, True, 3, 1)
+
+    def test_decode_file_iter(self):
+        docs = [{"_id": i, "x": u"y" * i} for i in range(10)]
+        data = b("").join([BSON.encode(doc) for doc in docs])
+
+        self.assertEqual(docs, list(decode_file_iter(StringIO(data))))
+        self.assertEqual([], list(decode_file_iter(StringIO(b("")))))
+        self.assertRaises(InvalidBSON, list,
+                          decode_file_iter(StringIO(data[:-1])))
+        self.assertRaises(InvalidBSON, list,
+                          decode_file_iter(StringIO(data + b("\x01\x00"))))
+
     def test_data_timestamp(self):
         self.assertEqual({"test": Timestamp(4, 20)},
                          BSON(b("\x13\x00\x00\x00\x11\x74\x65\x73\x74\x00\x14"
@@ -99,7 +156,9 @@ class TestBSON(unittest.TestCase):
         self.assertRaises(TypeError, BSON.encode, 100)
         self.assertRaises(TypeError, BSON.encode, "hello")
         self.assertRaises(TypeError, BSON.encode, None)
-        self.assertRaises(TypeError, BSON.encode, [])
+        self.assertRaises(TypeError, BSON.encode, [1])
+        self.assertRaises(TypeError, BSON.encode, [("a", 1, 2)])
+        self.assertRaises(TypeError, BSON.encode, ["ab"])
 
         self.assertEqual(BSON.encode({}), BSON(b("\x05\x00\x00\x00\x00")))
         self.assertEqual(BSON.encode({"test": u"hello world"}),
@@ -432,6 +491,62 @@ class TestBSON(unittest.TestCase):
             self.assertEqual(type(value), orig_type)
             self.assertEqual(value, orig_type(value))
 
+    def test_encode_mapping(self):
+        class Mapping(object):
+            def __init__(self, items):
+                self.items = items
+
+            def keys(self):
+                return [key for key, _ in self.items]
+
+            def __getitem__(self, key):
+                for k, value in self.items:
+                    if k == key:
+                        return value
+                raise KeyError(key)
+
+        expected = BSON.encode(SON([("_id", 1), ("a", 2),
+                                    ("b", SON([("c", 3), ("_id", 4)]))]))
+        mapping = Mapping([("a", 2), ("_id", 1),
+                           ("b", Mapping([("c", 3), ("_id", 4)]))])
+        self.assertEqual(expected, BSON.encode(mapping))
+        self.assertEqual({"_id": 1, "a": 2, "b": {"c": 3, "_id": 4}},
+                         BSON.encode(mapping).decode())
+        self.assertEqual(BSON.encode({"m": {}}),
+                         BSON.encode({"m": Mapping([])}))
+
+        class Missing(Mapping):
+            def keys(self):
+                return ["a", "missing"]
+
+        self.assertRaises(KeyError, BSON.encode, Missing([("a", 1)]))
+
+    def test_encode_pairs(self):
+        expected = BSON.encode(SON([("_id", 1), ("a", 2)]))
+        self.assertEqual(expected, BSON.encode([("a", 2), ("_id", 1)]))
+        self.assertEqual(expected, BSON.encode((["a", 2], ["_id", 1])))
+        self.assertEqual(BSON.encode({}), BSON.encode([]))
+        self.assertRaises(InvalidDocument, BSON.encode, [(1, 2)])
+        self.assertRaises(InvalidDocument, BSON.encode, [("$a", 1)],
+                          check_keys=True)
+
+        # Lists in a document are still arrays.
+        self.assertEqual({"a": [["b", 1]]},
+                         BSON.encode([("a", [("b", 1)])]).decode())
+
+    def test_son_order(self):
+        son = SON([("a", 1), ("b", 2), ("c", 3)])
+        del son["a"]
+        son["a"] = 4
+        son["b"] = 5
+        encoded = BSON.encode(son)
+        self.assertEqual(BSON.encode(SON([("b", 5), ("c", 3), ("a", 4)])),
+                         encoded)
+        decoded = encoded.decode(as_class=SON)
+        self.assertEqual(son, decoded)
+        self.assertEqual(SON, type(decoded))
+        self.assertEqual(dict, type(encoded.decode()))
+
     def test_ordered_dict(self):
         try:
             from collections import OrderedDict
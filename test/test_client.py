@@ -30,11 +30,13 @@ from nose.plugins.skip import SkipTest
 
 from bson.son import SON
 from bson.tz_util import utc
+from pymongo import monitoring
 from pymongo.mongo_client import MongoClient
 from pymongo.database import Database
 from pymongo.pool import SocketInfo
 from pymongo.errors import (ConfigurationError,
                             ConnectionFailure,
+                            DuplicateKeyError,
                             InvalidName,
                             OperationFailure,
                             PyMongoError)
@@ -112,6 +114,99 @@ class TestClient(unittest.TestCase, TestRequestMixin):
         c = MongoClient(uri, connectTimeoutMS=1, _connect=False)
         self.assertRaises(ConnectionFailure, c.pymongo_test.test.find_one)
 
+    def test_multiplex(self):
+        c = MongoClient(host, port, multiplex=True)
+        self.assertTrue(c.multiplex)
+        self.assertFalse(MongoClient(host, port).multiplex)
+        c.pymongo_test.test.remove()
+        c.pymongo_test.test.insert([{"_id": i} for i in range(10)])
+
+        results = []
+
+        def find(i):
+            results.append(c.pymongo_test.test.find_one({"_id": i}))
+
+        threads = [threading.Thread(target=find, args=(i,))
+                   for i in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(range(10), sorted([doc["_id"] for doc in results]))
+
+        # The shared socket reconnects after disconnect.
+        c.disconnect()
+        self.assertEqual(10, c.pymongo_test.test.count())
+        c.pymongo_test.test.drop()
+
+    def test_event_listeners(self):
+        class Counter(monitoring.PoolListener):
+            checkouts = 0
+
+            def socket_checked_out(self, address):
+                self.checkouts += 1
+
+        self.assertRaises(TypeError, MongoClient, host, port,
+                          event_listeners=[object()])
+        counter = Counter()
+        c = MongoClient(host, port, event_listeners=[counter])
+        before = c.pool_stats.checkouts
+        c.pymongo_test.test.find_one()
+        stats = c.pool_stats
+        self.assertEqual(before + 1, stats.checkouts)
+        self.assertEqual(stats.checkouts, counter.checkouts)
+        self.assertEqual(0, stats.checked_out)
+
+    def test_operation_listeners(self):
+        class Recorder(monitoring.OperationListener):
+            def __init__(self):
+                self.events = []
+
+            def succeeded(self, event):
+                self.events.append(event)
+
+            def failed(self, event):
+                self.events.append(event)
+
+        recorder = Recorder()
+        c = MongoClient(host, port, event_listeners=[recorder])
+        coll = c.pymongo_test.test
+        coll.drop()
+        del recorder.events[:]
+        coll.insert({"_id": 1})
+        coll.find_one()
+        self.assertRaises(DuplicateKeyError, coll.insert, {"_id": 1})
+        self.assertEqual(["insert", "query", "insert"],
+                         [e.operation for e in recorder.events])
+        for event in recorder.events:
+            self.assertEqual("pymongo_test.test", event.namespace)
+            self.assertEqual((c.host, c.port), event.address)
+            self.assertTrue(event.duration >= 0)
+        self.assertEqual(None, recorder.events[1].error)
+        self.assertTrue(
+            isinstance(recorder.events[2].error, DuplicateKeyError))
+        coll.drop()
+
+    def test_latency_histograms(self):
+        self.assertEqual({}, MongoClient(host, port).get_latency_histograms())
+
+        c = MongoClient(host, port, latency_histograms=True)
+        coll = c.pymongo_test.test
+        coll.drop()
+        c.reset_latency_histograms()
+        for i in range(10):
+            coll.insert({"_id": i})
+        coll.find_one()
+        histograms = c.get_latency_histograms()
+        address = (c.host, c.port)
+        self.assertEqual(10, histograms[(address, "insert")].count)
+        self.assertEqual(1, histograms[(address, "query")].count)
+        self.assertTrue(histograms[(address, "insert")].percentile(99) > 0)
+
+        c.reset_latency_histograms()
+        self.assertEqual({}, c.get_latency_histograms())
+        coll.drop()
+
     def test_connect(self):
         # Check that the exception is a ConnectionFailure, not a subclass like
         # AutoReconnect
@@ -16,6 +16,7 @@
 
 """Test the collection module."""
 
+import datetime
 import itertools
 import re
 import sys
@@ -32,10 +33,13 @@ from bson.binary import Binary, UUIDLegacy, OLD_UUID_SUBTYPE, UUID_SUBTYPE
 from bson.code import Code
 from bson.objectid import ObjectId
 from bson.py3compat import b
+from bson.raw_bson import RawBSONDocument
 from bson.son import SON
 from pymongo import (ASCENDING, DESCENDING, GEO2D,
                      GEOHAYSTACK, GEOSPHERE, HASHED)
 from pymongo.collection import Collection
+from pymongo.mongo_client import MongoClient
+from pymongo.parallel import merge_cursors
 from pymongo.son_manipulator import SONManipulator
 from pymongo.errors import (ConfigurationError,
                             DuplicateKeyError,
@@ -45,6 +49,7 @@ from pymongo.errors import (ConfigurationError,
                             OperationFailure,
                             TimeoutError)
 from test.test_client import get_client
+from test.test_message import FakeClient
 from test.utils import is_mongos, joinall
 from test import (qcheck,
                   version)
@@ -755,6 +760,16 @@ class TestCollection(unittest.TestCase):
         self.assertTrue(isinstance(id, list))
         self.assertEqual(1, len(id))
 
+        # New _ids are generated in batches.
+        docs = [{"i": i} for i in range(2500)]
+        docs[1]["_id"] = "mine"
+        ids = db.test.insert(docs)
+        self.assertEqual("mine", ids[1])
+        self.assertEqual(2500, len(set(ids)))
+        self.assertEqual([doc["_id"] for doc in docs], ids)
+        self.assertTrue(isinstance(ids[2499], ObjectId))
+        self.assertEqual(2503, db.test.count())
+
         self.assertRaises(InvalidOperation, db.test.insert, [])
 
     def test_insert_multiple_with_duplicate(self):
@@ -819,6 +834,99 @@ class TestCollection(unittest.TestCase):
                                             itertools.repeat(None, 10)))
         self.assertEqual(db.test.find().count(), 10)
 
+    def test_insert_large_batch(self):
+        db = self.db
+        db.drop_collection("test")
+        max_message_size = self.client.max_message_size
+        max_bson_size = self.client.max_bson_size
+        big = "x" * (max_bson_size - 100)
+        # Needs more than one insert message.
+        n_docs = max_message_size // max_bson_size + 2
+        ids = db.test.insert(({"s": big} for _ in range(n_docs)))
+        self.assertEqual(n_docs, len(ids))
+        self.assertEqual(n_docs, db.test.count())
+
+        db.drop_collection("test")
+        n_docs = self.client.max_write_batch_size + 5
+        ids = db.test.insert(({"i": i} for i in xrange(n_docs)))
+        self.assertEqual(n_docs, len(ids))
+        self.assertEqual(n_docs, db.test.count())
+
+        # Errors in later batches are still reported.
+        db.drop_collection("test")
+        db.test.insert({"_id": n_docs - 1})
+        self.assertRaises(DuplicateKeyError, db.test.insert,
+                          [{"_id": i} for i in xrange(n_docs)])
+        self.assertEqual(n_docs, db.test.count())
+
+    def test_write_batch(self):
+        db = self.db
+        db.drop_collection("test")
+        batch = db.test.write_batch()
+        ids = batch.insert([{"_id": i, "n": 0} for i in range(100)])
+        self.assertEqual(range(100), ids)
+        for i in range(100):
+            batch.update({"_id": i}, {"$inc": {"n": 1}})
+        batch.remove({"_id": 0})
+        self.assertEqual(0, db.test.count())
+        batch.flush()
+        self.assertEqual(99, db.test.count())
+        self.assertEqual(99, db.test.find({"n": 1}).count())
+
+        # Every write is sent, the first error is raised.
+        batch = db.test.write_batch()
+        batch.insert({"_id": 1})
+        batch.insert({"_id": 2})
+        batch.insert({"_id": 100})
+        self.assertRaises(DuplicateKeyError, batch.flush)
+        self.assertEqual(100, db.test.count())
+
+        # Errors are ignored with w=0.
+        batch = db.test.write_batch(w=0)
+        batch.insert({"_id": 1})
+        batch.insert({"_id": 101})
+        batch.flush()
+
+    def test_parallel_find(self):
+        db = self.db
+        db.drop_collection("test")
+        self.assertRaises(TypeError, db.test.parallel_find, "4")
+        self.assertRaises(ValueError, db.test.parallel_find, 0)
+        self.assertEqual(1, len(db.test.parallel_find(4)))
+        self.assertEqual([], list(db.test.parallel_find(4)[0]))
+
+        # Integer ids.
+        db.test.insert([{"_id": i, "even": not i % 2} for i in range(100)])
+        cursors = db.test.parallel_find(4)
+        self.assertEqual(4, len(cursors))
+        results = [[doc["_id"] for doc in cursor] for cursor in cursors]
+        for ids in results:
+            self.assertTrue(ids)
+        self.assertEqual(range(100), sorted(sum(results, [])))
+
+        cursors = db.test.parallel_find(3, {"even": True}, ["_id"])
+        ids = sorted([doc["_id"] for doc in merge_cursors(cursors)])
+        self.assertEqual(range(0, 100, 2), ids)
+
+        # ObjectIds spread over time.
+        db.drop_collection("test")
+        start = datetime.datetime(2013, 1, 1)
+        docs = []
+        for i in range(100):
+            _id = ObjectId.from_datetime(
+                start + datetime.timedelta(hours=i))
+            # Make the ids unique within each second.
+            _id = ObjectId(_id.binary[:4] + ObjectId().binary[4:])
+            docs.append({"_id": _id})
+        db.test.insert(docs)
+        cursors = db.test.parallel_find(5)
+        self.assertEqual(5, len(cursors))
+        results = [[doc["_id"] for doc in cursor] for cursor in cursors]
+        for ids in results:
+            self.assertEqual(20, len(ids))
+        self.assertEqual(sorted([doc["_id"] for doc in docs]),
+                         sorted(sum(results, [])))
+
     def test_save(self):
         self.db.drop_collection("test")
 
@@ -1883,6 +1991,30 @@ class TestCollection(unittest.TestCase):
         self.assertEqual(2, c.find_one(manipulate=True)['foo'])
         c.remove({})
 
+    def test_raw_bson_document(self):
+        db = self.client.pymongo_test
+        db.test.drop()
+        db.test_copy.drop()
+        db.test.insert({"_id": 1, "x": {"y": [1, 2]}})
+
+        raw = db.test.find_one(as_class=RawBSONDocument)
+        self.assertTrue(isinstance(raw, RawBSONDocument))
+        self.assertEqual(1, raw["_id"])
+        self.assertTrue(isinstance(raw["x"], RawBSONDocument))
+        self.assertEqual([1, 2], raw["x"]["y"])
+
+        for doc in db.test.find(as_class=RawBSONDocument):
+            self.assertEqual(raw, doc)
+
+        # Raw documents are inserted as is, skipping SON manipulators.
+        self.assertEqual(1, db.test_copy.insert(raw))
+        self.assertEqual({"_id": 1, "x": {"y": [1, 2]}},
+                         db.test_copy.find_one())
+        self.assertEqual(raw.raw,
+                         db.test_copy.find_one(as_class=RawBSONDocument).raw)
+        db.test.drop()
+        db.test_copy.drop()
+
     def test_uuid_subtype(self):
         if not have_uuid:
             raise SkipTest("No uuid module")
@@ -2025,5 +2157,40 @@ class TestCollection(unittest.TestCase):
                                     {"count": 0}, reduce))
 
 
+
+class TestInsertIds(unittest.TestCase):
+    """Test how inserts assign "_id" values, without a server."""
+
+    def setUp(self):
+        self.db = MongoClient(_connect=False).pymongo_test
+        self.sender = FakeClient()
+
+    def insert(self, doc_or_docs):
+        return self.db.test._insert(doc_or_docs, True, True, True, {},
+                                    False, self.sender)
+
+    def test_batch_ids(self):
+        docs = [{"i": i} for i in range(2500)]
+        docs[1]["_id"] = "mine"
+        ids = self.insert(docs)
+        self.assertEqual("mine", ids[1])
+        self.assertEqual(2500, len(set(ids)))
+        self.assertEqual([doc["_id"] for doc in docs], ids)
+        self.assertTrue(isinstance(ids[2499], ObjectId))
+
+    def test_manipulator_sets_id(self):
+        class CustomId(SONManipulator):
+            def transform_incoming(self, son, collection):
+                son.setdefault("_id", "custom")
+                return son
+
+        self.db.add_son_manipulator(CustomId())
+        self.assertEqual("custom", self.insert({"a": 1}))
+        self.assertEqual(["custom", "custom"],
+                         self.insert([{"a": 1}, {"a": 2}]))
+        sent = self.sender.batches[-1][1]
+        self.assertEqual(["custom", "custom"], [doc["_id"] for doc in sent])
+
+
 if __name__ == "__main__":
     unittest.main()
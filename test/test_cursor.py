@@ -18,6 +18,8 @@ import itertools
 import random
 import re
 import sys
+import threading
+import time
 import unittest
 sys.path[0:0] = [""]
 
@@ -28,10 +30,13 @@ from bson.son import SON
 from pymongo import (ASCENDING,
                      DESCENDING)
 from pymongo.database import Database
-from pymongo.errors import (InvalidOperation,
+from pymongo.errors import (AutoReconnect,
+                            InvalidOperation,
                             OperationFailure)
+from pymongo.mongo_client import MongoClient
 from test import version
 from test.test_client import get_client
+from test.test_helpers import make_reply
 
 
 class TestCursor(unittest.TestCase):
@@ -779,6 +784,23 @@ class TestCursor(unittest.TestCase):
 
         self.assertEqual(["b", "c"], distinct)
 
+    def test_min_max(self):
+        db = self.db
+        db.test.drop()
+        db.test.insert([{"_id": i} for i in range(10)])
+
+        self.assertRaises(TypeError, db.test.find().min, {"_id": 1})
+        self.assertRaises(TypeError, db.test.find().max, {"_id": 1})
+
+        cursor = db.test.find().min([("_id", 3)]).max([("_id", 7)])
+        self.assertEqual([3, 4, 5, 6], sorted(doc["_id"] for doc in cursor))
+        self.assertEqual([3, 4, 5, 6],
+                         sorted(doc["_id"] for doc in cursor.clone()))
+
+        cursor = db.test.find().min([("_id", 8)])
+        self.assertEqual([8, 9], sorted(doc["_id"] for doc in cursor))
+        self.assertRaises(InvalidOperation, cursor.min, [("_id", 1)])
+
     def test_max_scan(self):
         if not version.at_least(self.db.connection, (1, 5, 1)):
             raise SkipTest("maxScan requires MongoDB >= 1.5.1")
@@ -812,5 +834,191 @@ self.assertFalse(c2.alive)
 """
         self.assertTrue(c1.alive)
 
+
+class BatchesClient(MongoClient):
+    """Answers a query with `batches` of documents, without a server."""
+
+    def __init__(self, batches, fail_on=None):
+        super(BatchesClient, self).__init__(_connect=False)
+        self.batches = batches
+        self.fail_on = fail_on
+        self.requests = []
+        self.closed = []
+
+    def _send_message_with_response(self, message, **kwargs):
+        self.requests.append(threading.currentThread())
+        n = len(self.requests)
+        if n == self.fail_on:
+            raise AutoReconnect("connection closed")
+        cursor_id = 0
+        if n < len(self.batches):
+            cursor_id = 42
+        starting_from = sum(map(len, self.batches[:n - 1]))
+        return make_reply(self.batches[n - 1],
+                          cursor_id=cursor_id, starting_from=starting_from)
+
+    def close_cursor(self, cursor_id, *args):
+        self.closed.append(cursor_id)
+
+    def wait_for_requests(self, n):
+        for _ in range(50):
+            if len(self.requests) >= n:
+                return
+            time.sleep(0.1)
+
+
+class BlockingGetMoreClient(BatchesClient):
+    """Doesn't answer a getmore until `release` is set."""
+
+    def __init__(self, batches):
+        super(BlockingGetMoreClient, self).__init__(batches)
+        self.release = threading.Event()
+
+    def _send_message_with_response(self, message, **kwargs):
+        if self.requests:
+            self.requests.append(threading.currentThread())
+            self.release.wait(5)
+            self.requests.pop()
+        return super(BlockingGetMoreClient,
+                     self)._send_message_with_response(message, **kwargs)
+
+    def wait_for_closed(self):
+        for _ in range(50):
+            if self.closed:
+                return
+            time.sleep(0.1)
+
+
+class TestCursorPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = [[{"i": i} for i in range(j * 10, (j + 1) * 10)]
+                        for j in range(3)]
+
+    def test_prefetch(self):
+        client = BatchesClient(self.batches)
+        cursor = client.db.test.find().prefetch()
+        self.assertEqual(0, cursor.next()["i"])
+        # The second batch is requested in the background.
+        client.wait_for_requests(2)
+        self.assertEqual(2, len(client.requests))
+        self.assertNotEqual(threading.currentThread(), client.requests[1])
+        self.assertEqual(range(1, 30), [doc["i"] for doc in cursor])
+        self.assertEqual(3, len(client.requests))
+        self.assertFalse(cursor.alive)
+
+    def test_no_prefetch(self):
+        client = BatchesClient(self.batches)
+        cursor = client.db.test.find()
+        self.assertEqual(0, cursor.next()["i"])
+        time.sleep(0.2)
+        self.assertEqual(1, len(client.requests))
+        self.assertEqual(range(1, 30), [doc["i"] for doc in cursor])
+        self.assertEqual([threading.currentThread()] * 3, client.requests)
+
+    def test_prefetch_options(self):
+        client = BatchesClient(self.batches)
+        cursor = client.db.test.find()
+        self.assertRaises(TypeError, cursor.prefetch, 1)
+        cursor.prefetch(False).prefetch()
+        self.assertEqual(0, cursor.next()["i"])
+        self.assertRaises(InvalidOperation, cursor.prefetch, False)
+
+        # The cursor's limit is respected.
+        client = BatchesClient(self.batches)
+        cursor = client.db.test.find(limit=10).prefetch()
+        self.assertEqual(10, len(list(cursor)))
+        time.sleep(0.2)
+        self.assertEqual(1, len(client.requests))
+
+    def test_prefetch_close(self):
+        client = BlockingGetMoreClient(self.batches)
+        cursor = client.db.test.find().prefetch()
+        cursor.next()
+        client.wait_for_requests(2)
+        # Closing doesn't wait for the getmore in flight, the cursor is
+        # killed once the getmore is done.
+        cursor.close()
+        self.assertEqual([], client.closed)
+        client.release.set()
+        client.wait_for_closed()
+        self.assertEqual(2, len(client.requests))
+        self.assertEqual([42], client.closed)
+
+    def test_prefetch_del(self):
+        client = BlockingGetMoreClient(self.batches)
+        cursor = client.db.test.find().prefetch()
+        cursor.next()
+        client.wait_for_requests(2)
+        del cursor
+        self.assertEqual([], client.closed)
+        client.release.set()
+        client.wait_for_closed()
+        self.assertEqual([42], client.closed)
+
+    def test_prefetch_error(self):
+        client = BatchesClient(self.batches, fail_on=2)
+        cursor = client.db.test.find().prefetch()
+        for _ in range(10):
+            cursor.next()
+        self.assertRaises(AutoReconnect, cursor.next)
+        self.assertFalse(cursor.alive)
+
+
+class TestCursorStats(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = [[{"i": i} for i in range(j * 10, (j + 1) * 10)]
+                        for j in range(3)]
+
+    def test_stats(self):
+        client = BatchesClient(self.batches)
+        cursor = client.db.test.find()
+        stats = cursor.stats
+        self.assertEqual(0, stats.queries)
+        self.assertEqual(None, stats.address)
+
+        cursor.next()
+        self.assertEqual(1, stats.queries)
+        self.assertEqual(0, stats.get_mores)
+        self.assertEqual(10, stats.documents)
+        self.assertEqual((client.host, client.port), stats.address)
+
+        list(cursor)
+        self.assertEqual(1, stats.queries)
+        self.assertEqual(2, stats.get_mores)
+        self.assertEqual(30, stats.documents)
+        self.assertEqual(
+            sum([len(make_reply(batch)) + 16 for batch in self.batches]),
+            stats.bytes_received)
+        self.assertTrue(stats.network_time >= 0)
+        self.assertTrue(stats.decode_time > 0)
+        # Documents aren't timed one by one.
+        self.assertEqual(0, stats.manipulate_time)
+
+        # Starts over when rewound.
+        cursor.rewind()
+        self.assertEqual(0, cursor.stats.documents)
+
+    def test_detailed_stats(self):
+        client = BatchesClient(self.batches)
+        cursor = client.db.test.find().detailed_stats()
+        self.assertEqual(range(30), [doc["i"] for doc in cursor])
+        self.assertTrue(cursor.stats.decode_time > 0)
+        self.assertTrue(cursor.stats.manipulate_time > 0)
+
+        cursor = BatchesClient(self.batches).db.test.find()
+        self.assertRaises(TypeError, cursor.detailed_stats, 1)
+        cursor.next()
+        self.assertRaises(InvalidOperation, cursor.detailed_stats)
+
+    def test_no_manipulate(self):
+        client = BatchesClient(self.batches)
+        cursor = client.db.test.find(manipulate=False).detailed_stats()
+        list(cursor)
+        self.assertEqual(30, cursor.stats.documents)
+        self.assertEqual(0, cursor.stats.manipulate_time)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -135,6 +135,31 @@ class TestDBRef(unittest.TestCase):
             dbr2 = pickle.loads(pkl)
             self.assertEqual(dbr, dbr2)
 
+    def test_pickle_backwards_compatibility(self):
+        # Pickled with protocols 0 and 2 before DBRef had __slots__.
+        pickles = [
+            b("ccopy_reg\n_reconstructor\np0\n(cbson.dbref\nDBRef\np1\n"
+              "c__builtin__\nobject\np2\nNtp3\nRp4\n(dp5\n"
+              "S'_DBRef__kwargs'\np6\n(dp7\nS'foo'\np8\nS'bar'\np9\n"
+              "ssS'_DBRef__collection'\np10\nS'coll'\np11\n"
+              "sS'_DBRef__database'\np12\nS'db'\np13\n"
+              "sS'_DBRef__id'\np14\nI5\nsb."),
+            b("\x80\x02cbson.dbref\nDBRef\nq\x00)\x81q\x01}q\x02("
+              "U\x0e_DBRef__kwargsq\x03}q\x04U\x03fooq\x05U\x03barq\x06s"
+              "U\x12_DBRef__collectionq\x07U\x04collq\x08"
+              "U\x10_DBRef__databaseq\tU\x02dbq\n"
+              "U\n_DBRef__idq\x0bK\x05ub."),
+        ]
+        for pkl in pickles:
+            self.assertEqual(DBRef('coll', 5, 'db', foo='bar'),
+                             pickle.loads(pkl))
+
+    def test_slots(self):
+        dbr = DBRef('coll', 5, foo='bar')
+        self.assertFalse(hasattr(dbr, '__dict__'))
+        self.assertRaises(AttributeError, getattr, dbr, 'baz')
+        self.assertRaises(AttributeError, setattr, dbr, 'baz', 1)
+
     def test_dbref_hash(self):
         dbref_1a = DBRef('collection', 'id', 'database')
         dbref_1b = DBRef('collection', 'id', 'database')
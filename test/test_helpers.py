@@ -0,0 +1,135 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the helpers module."""
+
+import socket
+import struct
+import sys
+import threading
+import unittest
+sys.path[0:0] = [""]
+
+from nose.plugins.skip import SkipTest
+
+from bson import BSON, decode_all
+from bson.py3compat import b
+from pymongo import helpers, message
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+
+def make_reply(docs, flags=0, cursor_id=0, starting_from=0):
+    data = b("").join([BSON.encode(doc) for doc in docs])
+    return struct.pack("<iqii", flags, cursor_id,
+                       starting_from, len(docs)) + data
+
+
+class TestHelpers(unittest.TestCase):
+
+    def setUp(self):
+        if not hasattr(socket, "socketpair"):
+            raise SkipTest("socket.socketpair is not available")
+        self.reader, self.writer = socket.socketpair()
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+
+    def test_receive_data_on_socket(self):
+        data = b("x") * 100000 + b("y") * 100000
+
+        def write():
+            # Send in pieces so the reader has to call recv_into repeatedly.
+            for i in range(0, len(data), 4096):
+                self.writer.sendall(data[i:i + 4096])
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        received = helpers._receive_data_on_socket(self.reader, len(data))
+        writer.join()
+        self.assertEqual(len(data), len(received))
+        self.assertEqual(data, bytes(received))
+
+    def test_receive_data_on_closed_socket(self):
+        self.writer.sendall(b("abc"))
+        self.writer.close()
+        self.assertRaises(ConnectionFailure,
+                          helpers._receive_data_on_socket, self.reader, 4)
+
+    def test_send_data_on_socket(self):
+        small = b("a") * 10
+        large = b("b") * (helpers._SEND_CHUNK_SIZE + 1)
+        segments = [small] * 5000 + [large, small, large] + [small] * 3
+        expected = b("").join(segments)
+
+        received = []
+
+        def read():
+            received.append(helpers._receive_data_on_socket(self.reader,
+                                                            len(expected)))
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        helpers._send_data_on_socket(self.writer, segments)
+        helpers._send_data_on_socket(self.writer, small)
+        reader.join()
+        self.assertEqual(expected, bytes(received[0]))
+        self.assertEqual(small, bytes(helpers._receive_data_on_socket(
+            self.reader, len(small))))
+
+    def test_send_insert_message(self):
+        docs = [{"_id": i, "x": u"y" * i} for i in range(100)]
+        request_id, data, max_size = message.insert(
+            "db.coll", docs, True, True, {"w": 1}, False, 3)
+        self.assertEqual(max([len(BSON.encode(doc)) for doc in docs]),
+                         max_size)
+        helpers._send_data_on_socket(self.writer, data)
+
+        header = helpers._receive_data_on_socket(self.reader, 16)
+        length, _, _, op = struct.unpack("<iiii", bytes(header))
+        self.assertEqual(2002, op)
+        body = helpers._receive_data_on_socket(self.reader, length - 16)
+        # Skip the flags and the collection name.
+        offset = 4 + len(b("db.coll")) + 1
+        self.assertEqual(docs, decode_all(body, dict, False, 3, offset))
+
+        # The getlasterror query follows the insert.
+        header = helpers._receive_data_on_socket(self.reader, 16)
+        length, rqst_id, _, op = struct.unpack("<iiii", bytes(header))
+        self.assertEqual((2004, request_id), (op, rqst_id))
+
+    def test_unpack_received_response(self):
+        docs = [{"_id": i} for i in range(5)]
+        reply = make_reply(docs, cursor_id=42)
+        self.writer.sendall(reply)
+        response = helpers._receive_data_on_socket(self.reader, len(reply))
+
+        result = helpers._unpack_response(response)
+        self.assertEqual(42, result["cursor_id"])
+        self.assertEqual(docs, result["data"])
+
+        batch = helpers._unpack_response(response, lazy=True)["data"]
+        self.assertEqual(5, len(batch))
+        self.assertEqual(docs, [batch.popleft() for _ in range(5)])
+
+        error_reply = make_reply([{"$err": "oops"}], flags=2)
+        self.writer.sendall(error_reply)
+        response = helpers._receive_data_on_socket(self.reader,
+                                                   len(error_reply))
+        self.assertRaises(OperationFailure, helpers._unpack_response,
+                          response)
+
+
+if __name__ == "__main__":
+    unittest.main()
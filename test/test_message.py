@@ -0,0 +1,174 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the message module."""
+
+import struct
+import sys
+import unittest
+sys.path[0:0] = [""]
+
+from bson import BSON, decode_all
+from bson.binary import OLD_UUID_SUBTYPE
+from bson.py3compat import b
+from pymongo import message
+from pymongo.errors import (InvalidDocument,
+                            InvalidOperation,
+                            OperationFailure)
+
+
+class FakeClient(object):
+    """Records the insert messages it is asked to send."""
+
+    def __init__(self, max_bson_size=4 * 1024 * 1024,
+                 max_message_size=8 * 1024 * 1024,
+                 max_write_batch_size=1000, fail_on=()):
+        self.max_bson_size = max_bson_size
+        self.max_message_size = max_message_size
+        self.max_write_batch_size = max_write_batch_size
+        self.fail_on = fail_on
+        self.batches = []
+        self.safe = []
+
+    def _send_message(self, msg, with_last_error=False):
+        (request_id, segments, max_doc_size) = msg
+        data = b("").join(segments)
+        length, _, _, op_code = struct.unpack("<iiii", data[:16])
+        assert op_code == 2002
+        # Skip the options and the collection name.
+        start = data.index(b("\x00"), 20) + 1
+        docs = decode_all(data[start:length])
+        self.batches.append((length, docs))
+        self.safe.append(with_last_error)
+        if with_last_error and len(self.batches) in self.fail_on:
+            raise OperationFailure("batch %d failed" % len(self.batches))
+
+
+def insert(client, docs, safe=True, continue_on_error=False):
+    message._do_batched_insert("test.test", docs, True, safe, {},
+                               continue_on_error, OLD_UUID_SUBTYPE, client)
+
+
+def unpack_header(data):
+    return struct.unpack("<iiii", data[:16])
+
+
+class TestMessages(unittest.TestCase):
+
+    def test_delete(self):
+        spec = {"_id": 1}
+        request_id, data, max_size = message.delete("test.test", spec, False,
+                                                    {}, OLD_UUID_SUBTYPE)
+        encoded = BSON.encode(spec)
+        self.assertEqual(len(encoded), max_size)
+        self.assertEqual((len(data), request_id, 0, 2006),
+                         unpack_header(data))
+        self.assertEqual(b("\x00\x00\x00\x00test.test\x00"
+                           "\x00\x00\x00\x00") + encoded, data[16:])
+
+        request_id, data, _ = message.delete("test.test", spec, True,
+                                             {"w": 2}, OLD_UUID_SUBTYPE)
+        length = unpack_header(data)[0]
+        # The getLastError query follows the delete.
+        self.assertEqual((len(data) - length, request_id, 0, 2004),
+                         unpack_header(data[length:]))
+        self.assertEqual([{"getlasterror": 1, "w": 2}],
+                         decode_all(data[length + 38:]))
+
+    def test_kill_cursors(self):
+        request_id, data = message.kill_cursors([1, 2 ** 40, -5])
+        self.assertEqual((len(data), request_id, 0, 2007),
+                         unpack_header(data))
+        self.assertEqual((0, 3, 1, 2 ** 40, -5),
+                         struct.unpack("<iiqqq", data[16:]))
+
+    def test_reuse(self):
+        # Build a large message then a small one, the small one must not
+        # include anything from the large one.
+        message.delete("test.test", {"s": "x" * 100000}, False, {},
+                       OLD_UUID_SUBTYPE)
+        message.update("test.test", False, False, {"s": "x" * 1000},
+                       {"y": 1}, False, {}, True, OLD_UUID_SUBTYPE)
+        _, data, _ = message.delete("test.test", {}, False, {},
+                                    OLD_UUID_SUBTYPE)
+        self.assertEqual(16 + 4 + 10 + 4 + 5, len(data))
+        self.assertEqual(len(data), unpack_header(data)[0])
+
+
+class TestBatchedInsert(unittest.TestCase):
+
+    def test_single_batch(self):
+        client = FakeClient()
+        docs = [{"_id": i} for i in range(10)]
+        insert(client, docs)
+        self.assertEqual(1, len(client.batches))
+        self.assertEqual(docs, client.batches[0][1])
+        self.assertEqual([True], client.safe)
+
+    def test_split_by_count(self):
+        client = FakeClient(max_write_batch_size=3)
+        insert(client, ({"_id": i} for i in range(10)))
+        self.assertEqual([3, 3, 3, 1],
+                         [len(docs) for _, docs in client.batches])
+        self.assertEqual(range(10),
+                         [doc["_id"] for _, batch in client.batches
+                          for doc in batch])
+
+    def test_split_by_size(self):
+        doc_size = len(BSON.encode({"_id": 0, "s": "x" * 1000}))
+        client = FakeClient(max_message_size=5 * doc_size + 100)
+        insert(client, ({"_id": i, "s": "x" * 1000} for i in range(12)))
+        self.assertEqual([5, 5, 2],
+                         [len(docs) for _, docs in client.batches])
+        for length, _ in client.batches:
+            self.assertTrue(length <= client.max_message_size)
+
+    def test_document_too_large(self):
+        client = FakeClient(max_bson_size=100)
+        self.assertRaises(InvalidDocument, insert,
+                          client, [{"s": "x" * 100}])
+
+    def test_empty(self):
+        self.assertRaises(InvalidOperation, insert, FakeClient(), [])
+        self.assertRaises(InvalidOperation, insert, FakeClient(), iter([]))
+
+    def test_stop_on_error(self):
+        client = FakeClient(max_write_batch_size=2, fail_on=(2,))
+        self.assertRaises(OperationFailure, insert,
+                          client, [{"_id": i} for i in range(10)])
+        self.assertEqual(2, len(client.batches))
+
+        # Unacknowledged inserts still stop at the first failed batch,
+        # without raising.
+        client = FakeClient(max_write_batch_size=2, fail_on=(2,))
+        insert(client, [{"_id": i} for i in range(10)], safe=False)
+        self.assertEqual(2, len(client.batches))
+        self.assertEqual([True, True], client.safe)
+
+    def test_continue_on_error(self):
+        client = FakeClient(max_write_batch_size=2, fail_on=(2,))
+        self.assertRaises(OperationFailure, insert,
+                          client, [{"_id": i} for i in range(10)],
+                          continue_on_error=True)
+        self.assertEqual(5, len(client.batches))
+
+        client = FakeClient(max_write_batch_size=2, fail_on=(2,))
+        insert(client, [{"_id": i} for i in range(10)],
+               safe=False, continue_on_error=True)
+        self.assertEqual(5, len(client.batches))
+        self.assertEqual([False] * 5, client.safe)
+
+
+if __name__ == "__main__":
+    unittest.main()
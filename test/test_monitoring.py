@@ -0,0 +1,202 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the monitoring module."""
+
+import socket
+import sys
+import unittest
+sys.path[0:0] = [""]
+
+from bson.binary import OLD_UUID_SUBTYPE
+from bson.son import SON
+from pymongo import message, monitoring
+from pymongo.errors import OperationFailure
+
+
+class Recorder(monitoring.OperationListener):
+    def __init__(self):
+        self.events = []
+
+    def started(self, event):
+        self.events.append(("started", event))
+
+    def succeeded(self, event):
+        self.events.append(("succeeded", event))
+
+    def failed(self, event):
+        self.events.append(("failed", event))
+
+
+class TestOperationEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = Recorder()
+        self.listeners = [self.recorder]
+
+    def started(self, msg):
+        return monitoring._started(self.listeners, msg, ("a", 1))
+
+    def test_query(self):
+        msg = message.query(0, "db.coll", 0, 1, {"x": 1})
+        event = self.started(msg)
+        self.assertEqual("query", event.operation)
+        self.assertEqual("db.coll", event.namespace)
+        self.assertEqual(msg[0], event.request_id)
+        self.assertEqual(len(msg[1]), event.size)
+        self.assertEqual(("a", 1), event.address)
+        self.assertEqual(None, event.duration)
+        self.assertEqual([("started", event)], self.recorder.events)
+
+    def test_command(self):
+        msg = message.query(0, "admin.$cmd", 0, -1, SON([("ping", 1)]))
+        event = self.started(msg)
+        self.assertEqual("command", event.operation)
+        self.assertEqual("admin.$cmd", event.namespace)
+
+    def test_writes(self):
+        msg = message.insert("db.coll", [{"x": 1}, {"x": 2}], False,
+                             True, {}, False, OLD_UUID_SUBTYPE)
+        event = self.started(msg)
+        self.assertEqual("insert", event.operation)
+        self.assertEqual("db.coll", event.namespace)
+        self.assertEqual(len(msg[1]), event.size)
+
+        msg = message.update("db.coll", False, False, {}, {"x": 1},
+                             False, {}, False, OLD_UUID_SUBTYPE)
+        self.assertEqual("update", self.started(msg).operation)
+
+        msg = message.delete("db.coll", {}, True, {}, OLD_UUID_SUBTYPE)
+        self.assertEqual("delete", self.started(msg).operation)
+
+    def test_cursor_messages(self):
+        event = self.started(message.get_more("db.coll", 0, 42))
+        self.assertEqual("get_more", event.operation)
+        self.assertEqual("db.coll", event.namespace)
+
+        event = self.started(message.kill_cursors([42]))
+        self.assertEqual("kill_cursors", event.operation)
+        self.assertEqual(None, event.namespace)
+
+    def test_finished(self):
+        event = self.started(message.get_more("db.coll", 0, 42))
+        monitoring._succeeded(self.listeners, event, None)
+        self.assertEqual(("a", 1), event.address)
+        self.assertTrue(event.duration >= 0)
+        self.assertEqual(None, event.error)
+
+        event = self.started(message.get_more("db.coll", 0, 42))
+        error = OperationFailure("boom")
+        monitoring._failed(self.listeners, event, ("b", 2), error)
+        self.assertEqual(("b", 2), event.address)
+        self.assertEqual(error, event.error)
+        self.assertEqual(["started", "succeeded", "started", "failed"],
+                         [name for name, _ in self.recorder.events])
+
+    def test_listener_errors_ignored(self):
+        class Broken(monitoring.OperationListener):
+            def started(self, event):
+                raise ZeroDivisionError()
+
+        self.listeners.insert(0, Broken())
+        self.started(message.get_more("db.coll", 0, 42))
+        self.assertEqual(1, len(self.recorder.events))
+
+    def test_get_listeners(self):
+        pool_listener = monitoring.PoolListener()
+        listeners = [pool_listener, self.recorder]
+        self.assertEqual([self.recorder], monitoring._get_listeners(
+            listeners, monitoring.OperationListener))
+        self.assertEqual([pool_listener], monitoring._get_listeners(
+            listeners, monitoring.PoolListener))
+
+        self.assertRaises(TypeError, monitoring.register, object())
+        monitoring.register(self.recorder)
+        try:
+            self.assertEqual([self.recorder], monitoring._get_listeners(
+                None, monitoring.OperationListener))
+        finally:
+            monitoring._LISTENERS.remove(self.recorder)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_buckets(self):
+        for seconds in (1e-6, 3.3e-5, 0.001, 0.25, 1, 7.5, 100):
+            index = monitoring._bucket(seconds)
+            lower = monitoring._bucket_bound(index)
+            upper = monitoring._bucket_bound(index + 1)
+            self.assertTrue(lower <= seconds < upper)
+            self.assertTrue(upper - lower <= lower / 8.0)
+
+        self.assertEqual(0, monitoring._bucket(0))
+        self.assertEqual(0, monitoring._bucket(1e-9))
+        self.assertEqual(monitoring._NUM_BUCKETS - 1,
+                         monitoring._bucket(1e6))
+
+    def test_percentile(self):
+        histogram = monitoring.LatencyHistogram()
+        self.assertEqual(None, histogram.percentile(50))
+        self.assertEqual(None, histogram.mean)
+
+        for _ in range(98):
+            histogram.record(0.001)
+        histogram.record(0.1)
+        histogram.record(1)
+        self.assertEqual(100, histogram.count)
+        self.assertAlmostEqual(1.198 / 100, histogram.mean)
+
+        p50 = histogram.percentile(50)
+        self.assertTrue(0.001 < p50 <= 0.001 * 9 / 8)
+        self.assertEqual(p50, histogram.percentile(98))
+        p99 = histogram.percentile(99)
+        self.assertTrue(0.1 < p99 <= 0.1 * 9 / 8)
+        self.assertTrue(1 < histogram.percentile(100) <= 9 / 8.0)
+
+        self.assertEqual([98, 1, 1],
+                         [count for _, _, count in histogram.buckets()])
+
+    def test_copy(self):
+        histogram = monitoring.LatencyHistogram()
+        histogram.record(0.5)
+        copy = histogram.copy()
+        histogram.record(0.5)
+        self.assertEqual(1, copy.count)
+        self.assertEqual(2, histogram.count)
+
+    def test_tracker(self):
+        tracker = monitoring._LatencyTracker()
+        msg = message.query(0, "db.coll", 0, 1, {})
+        for address in (("a", 1), ("a", 1), ("b", 2)):
+            event = monitoring._started([], msg, address)
+            monitoring._succeeded([], event, None, tracker)
+
+        # Network errors aren't recorded, server errors are.
+        event = monitoring._started([], msg, ("b", 2))
+        monitoring._failed([], event, None, socket.error(), tracker)
+        event = monitoring._started([], msg, ("b", 2))
+        monitoring._failed([], event, None, OperationFailure("x"), tracker)
+
+        snapshot = tracker.snapshot()
+        self.assertEqual(2, len(snapshot))
+        self.assertEqual(2, snapshot[(("a", 1), "query")].count)
+        self.assertEqual(2, snapshot[(("b", 2), "query")].count)
+
+        tracker.reset()
+        self.assertEqual({}, tracker.snapshot())
+        self.assertEqual(2, snapshot[(("a", 1), "query")].count)
+
+
+if __name__ == "__main__":
+    unittest.main()
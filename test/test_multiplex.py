@@ -0,0 +1,144 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the multiplex module."""
+
+import socket
+import struct
+import sys
+import threading
+import unittest
+sys.path[0:0] = [""]
+
+from nose.plugins.skip import SkipTest
+
+from bson.py3compat import b
+from pymongo import helpers, thread_util_threading
+from pymongo.errors import AutoReconnect, ConfigurationError
+from pymongo.mongo_client import MongoClient
+from pymongo.mongo_replica_set_client import MongoReplicaSetClient
+from pymongo.multiplex import MultiplexedSocket
+from pymongo.pool import SocketInfo
+
+
+def request(request_id, payload):
+    return struct.pack("<iiii", 16 + len(payload), request_id,
+                       0, 2004) + payload
+
+
+def reply(response_to, payload):
+    return struct.pack("<iiii", 16 + len(payload), 0,
+                       response_to, 1) + payload
+
+
+def read_request(sock):
+    header = helpers._receive_data_on_socket(sock, 16)
+    length, request_id = struct.unpack("<ii", header[:8])
+    return request_id, helpers._receive_data_on_socket(sock, length - 16)
+
+
+class TestMultiplexedSocket(unittest.TestCase):
+
+    def setUp(self):
+        if not hasattr(socket, "socketpair"):
+            raise SkipTest("socket.socketpair is not available")
+        client_sock, self.server = socket.socketpair()
+        self.sock_info = SocketInfo(client_sock, 0)
+        self.mux = MultiplexedSocket(self.sock_info, thread_util_threading)
+
+    def tearDown(self):
+        self.mux.close()
+        self.server.close()
+
+    def call_in_threads(self, n):
+        results = {}
+
+        def call(i):
+            try:
+                results[i] = self.mux.send_and_receive(
+                    i, request(i, b("request %d" % i)))
+            except Exception, e:
+                results[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,))
+                   for i in range(n)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_replies_out_of_order(self):
+        threads, results = self.call_in_threads(10)
+
+        requests = [read_request(self.server) for _ in range(10)]
+        self.assertEqual(range(10), sorted([i for i, _ in requests]))
+        # Reply in reverse order.
+        for request_id, payload in reversed(requests):
+            self.server.sendall(reply(request_id, b("re: ") + payload))
+
+        for thread in threads:
+            thread.join()
+        for i in range(10):
+            self.assertEqual(b("re: request %d" % i), results[i])
+
+    def test_send(self):
+        self.mux.send(request(1, b("fire and forget")))
+        self.assertEqual((1, b("fire and forget")),
+                         read_request(self.server))
+
+    def test_error_fails_waiters(self):
+        threads, results = self.call_in_threads(5)
+        for _ in range(5):
+            read_request(self.server)
+        self.server.close()
+        for thread in threads:
+            thread.join()
+        for i in range(5):
+            self.assertTrue(isinstance(results[i], AutoReconnect))
+        self.assertTrue(self.mux.closed)
+        self.assertRaises(AutoReconnect, self.mux.send, b("x"))
+
+    def test_retire(self):
+        threads, results = self.call_in_threads(2)
+        for _ in range(2):
+            read_request(self.server)
+        self.mux.retire()
+        self.assertTrue(self.mux.closed)
+        self.assertRaises(AutoReconnect, self.mux.send_and_receive,
+                          3, request(3, b("too late")))
+
+        # Replies to requests already sent are still read.
+        self.server.sendall(reply(0, b("zero")) + reply(1, b("one")))
+        for thread in threads:
+            thread.join()
+        self.assertEqual(b("zero"), results[0])
+        self.assertEqual(b("one"), results[1])
+
+        # Then the socket is closed.
+        self.server.settimeout(5)
+        self.assertEqual(b(""), self.server.recv(1))
+
+
+
+class TestMultiplexOption(unittest.TestCase):
+
+    def test_only_mongo_client_multiplexes(self):
+        self.assertTrue(MongoClient(multiplex=True, _connect=False).multiplex)
+        self.assertRaises(ConfigurationError, MongoClient,
+                          multiplex="yes", _connect=False)
+        self.assertRaises(ConfigurationError, MongoReplicaSetClient,
+                          replicaSet="rs", multiplex=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
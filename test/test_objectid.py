@@ -15,7 +15,9 @@
 """Tests for the objectid module."""
 
 import datetime
+import os
 import pickle
+import struct
 import warnings
 import unittest
 import sys
@@ -24,6 +26,7 @@ sys.path[0:0] = [""]
 
 from nose.plugins.skip import SkipTest
 
+from bson import BSON
 from bson.errors import InvalidId
 from bson.objectid import ObjectId
 from bson.py3compat import b, binary_type
@@ -31,6 +34,7 @@ from bson.tz_util import (FixedOffset,
                           utc)
 
 PY3 = sys.version_info[0] == 3
+ZERO = b("\x00")
 
 
 def oid(x):
@@ -66,6 +70,9 @@ class TestObjectId(unittest.TestCase):
         ObjectId("123456789012123456789012")
         self.assertRaises(InvalidId, ObjectId, "123456789012123456789G12")
         self.assertRaises(InvalidId, ObjectId, u"123456789012123456789G12")
+        self.assertRaises(InvalidId, ObjectId, u"12345678901212345678901\xe9")
+        self.assertEqual(ObjectId("ABCDEF0123456789abcdef01"),
+                         ObjectId("abcdef0123456789abcdef01"))
 
     def test_repr_str(self):
         self.assertEqual(repr(ObjectId("1234567890abcdef12345678")),
@@ -119,6 +126,68 @@ class TestObjectId(unittest.TestCase):
             self.assertTrue(id not in map)
             map[id] = True
 
+    def test_generation(self):
+        a, b_ = ObjectId().binary, ObjectId().binary
+        self.assertEqual(ObjectId._machine_bytes, a[4:7])
+        self.assertEqual(os.getpid() % 0xFFFF,
+                         struct.unpack(">H", a[7:9])[0])
+        inc = struct.unpack(">i", ZERO + a[9:])[0]
+        self.assertEqual((inc + 1) % 0xFFFFFF,
+                         struct.unpack(">i", ZERO + b_[9:])[0])
+
+    def test_generate_batch(self):
+        self.assertRaises(TypeError, ObjectId.generate_batch, "1")
+        self.assertRaises(ValueError, ObjectId.generate_batch, -1)
+        self.assertRaises(ValueError, ObjectId.generate_batch, 0x1000000)
+        self.assertEqual([], ObjectId.generate_batch(0))
+
+        oids = ObjectId.generate_batch(1000)
+        self.assertEqual(1000, len(oids))
+        self.assertEqual(1000, len(set(oids)))
+        first = struct.unpack(">i", ZERO + oids[0].binary[9:])[0]
+        for i, oid in enumerate(oids):
+            self.assertTrue(isinstance(oid, ObjectId))
+            self.assertEqual(oids[0].binary[:9], oid.binary[:9])
+            self.assertEqual((first + i) % 0xFFFFFF,
+                             struct.unpack(">i", ZERO + oid.binary[9:])[0])
+
+        # The next ObjectId follows the batch.
+        self.assertEqual((first + 1000) % 0xFFFFFF,
+                         struct.unpack(">i", ZERO + ObjectId().binary[9:])[0])
+
+        class MyObjectId(ObjectId):
+            pass
+
+        oids = MyObjectId.generate_batch(2)
+        self.assertTrue(isinstance(oids[1], MyObjectId))
+        self.assertNotEqual(oids[0], oids[1])
+
+    def test_pid_after_fork(self):
+        if sys.platform == "win32":
+            raise SkipTest("Can't fork on Windows")
+
+        ObjectId()
+        read, write = os.pipe()
+        pid = os.fork()
+        if not pid:
+            try:
+                os.write(write, ObjectId().binary)
+            finally:
+                os._exit(0)
+        os.close(write)
+        child = os.read(read, 12)
+        os.close(read)
+        os.waitpid(pid, 0)
+        self.assertEqual(pid % 0xFFFF, struct.unpack(">H", child[7:9])[0])
+
+    def test_decode(self):
+        a = ObjectId()
+        decoded = BSON.encode({"_id": a}).decode()["_id"]
+        self.assertTrue(isinstance(decoded, ObjectId))
+        self.assertEqual(a, decoded)
+        self.assertEqual(a.binary, decoded.binary)
+        self.assertEqual(str(a), str(decoded))
+
     def test_generation_time(self):
         d1 = datetime.datetime.utcnow()
         d2 = ObjectId().generation_time
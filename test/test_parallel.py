@@ -0,0 +1,102 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the parallel module."""
+
+import sys
+import time
+import traceback
+import unittest
+sys.path[0:0] = [""]
+
+from pymongo import thread_util_threading
+from pymongo.parallel import merge_cursors
+
+
+class TestMergeCursors(unittest.TestCase):
+
+    def test_merge(self):
+        sources = [range(0, 1000), range(1000, 1500), [], range(1500, 3000)]
+        merged = list(merge_cursors(sources, max_buffered=10))
+        self.assertEqual(3000, len(merged))
+        self.assertEqual(range(3000), sorted(merged))
+
+        # Order within each source is kept.
+        merged = list(merge_cursors([range(100), range(100, 200)]))
+        first = [x for x in merged if x < 100]
+        self.assertEqual(range(100), first)
+
+    def test_empty(self):
+        self.assertEqual([], list(merge_cursors([])))
+        self.assertEqual([], list(merge_cursors([[], []])))
+
+    def test_error(self):
+        def failing():
+            yield 1
+            raise ValueError("oops")
+
+        merged = merge_cursors([failing(), range(10)])
+        self.assertRaises(ValueError, list, merged)
+
+        # The traceback of the failed read is kept.
+        merged = merge_cursors([failing()])
+        try:
+            list(merged)
+        except ValueError:
+            frames = traceback.extract_tb(sys.exc_info()[2])
+            self.assertEqual("failing", frames[-1][2])
+        else:
+            self.fail("ValueError not raised")
+
+    def test_thread_support_module(self):
+        class RecordingModule(object):
+            Event = thread_util_threading.Event
+            spawned = []
+
+            def spawn(self, target, *args):
+                self.spawned.append(args[0])
+                return thread_util_threading.spawn(target, *args)
+
+        module = RecordingModule()
+        sources = [range(10), range(10, 20)]
+        merged = merge_cursors(iter(sources), thread_support_module=module)
+        self.assertEqual(range(20), sorted(merged))
+        self.assertEqual(sources, module.spawned)
+
+    def test_close(self):
+        class Endless(object):
+            calls = 0
+
+            def __iter__(self):
+                return self
+
+            def next(self):
+                self.calls += 1
+                return 1
+
+        endless = Endless()
+        merged = merge_cursors([endless], max_buffered=5)
+        self.assertEqual(1, merged.next())
+        merged.close()
+        self.assertRaises(StopIteration, merged.next)
+        # The thread stops reading the source.
+        time.sleep(0.5)
+        calls = endless.calls
+        time.sleep(0.5)
+        self.assertEqual(calls, endless.calls)
+        self.assertTrue(calls < 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
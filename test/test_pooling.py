@@ -14,6 +14,8 @@
 
 """Test built in connection-pooling with threads."""
 
+import os
+import socket
 import sys
 import thread
 import time
@@ -23,6 +25,7 @@ sys.path[0:0] = [""]
 
 from nose.plugins.skip import SkipTest
 
+from pymongo import monitoring, pool, thread_util_threading
 from test import host, port
 from test.test_pooling_base import (
     _TestPooling, _TestMaxPoolSize, _TestMaxOpenSockets,
@@ -181,5 +184,308 @@ class TestWaitQueueMultipleThreads(_TestWaitQueueMultiple, unittest.TestCase):
     use_greenlets = False
 
 
+class TestPoolMaintenance(unittest.TestCase):
+    """Test idle socket handling against a listening socket, so no server
+    is needed.
+    """
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(50)
+        self.pair = self.listener.getsockname()
+
+    def tearDown(self):
+        self.listener.close()
+
+    def get_pool(self, **kwargs):
+        return pool.Pool(self.pair, 10, None, None, False,
+                         thread_util_threading, **kwargs)
+
+    def test_min_size(self):
+        p = self.get_pool(min_size=3)
+        p.maintain()
+        self.assertEqual(3, len(p.sockets))
+
+        # Sockets in use count toward min_size.
+        sock_info = p.get_socket()
+        p.maintain()
+        self.assertEqual(2, len(p.sockets))
+        self.assertEqual(1, p.active_sockets)
+        p.maybe_return_socket(sock_info)
+        self.assertEqual(0, p.active_sockets)
+
+        # Refilled in the background after a reset.
+        p.reset()
+        self.assertEqual(0, len(p.sockets))
+        for _ in range(50):
+            if len(p.sockets) == 3:
+                break
+            time.sleep(0.1)
+        self.assertEqual(3, len(p.sockets))
+
+    def test_min_size_respects_max_size(self):
+        p = pool.Pool(self.pair, 2, None, None, False,
+                      thread_util_threading, min_size=5)
+        p.maintain()
+        self.assertEqual(2, len(p.sockets))
+
+    def test_request_socket_reconnect(self):
+        p = self.get_pool()
+        p.start_request()
+        s1 = p.get_socket()
+        s1.close()
+        # A closed request socket gives back its slot.
+        p.maybe_return_socket(s1)
+        self.assertEqual(0, p.active_sockets)
+
+        # Its replacement takes one.
+        s2 = p.get_socket()
+        self.assertNotEqual(s1, s2)
+        self.assertEqual(1, p.active_sockets)
+        p.maybe_return_socket(s2)
+        self.assertEqual(1, p.active_sockets)
+        p.end_request()
+        self.assertEqual(0, p.active_sockets)
+
+        p.min_size = 2
+        p.maintain()
+        self.assertEqual(2, len(p.sockets))
+
+    def test_reconnect_fails(self):
+        p = pool.Pool(self.pair, 1, None, None, False, thread_util_threading)
+        sock_info = p.get_socket()
+        p.maybe_return_socket(sock_info)
+        sock_info.close()
+
+        # The pooled socket is closed and it can't be replaced.
+        self.listener.close()
+        self.assertRaises(socket.error, p.get_socket)
+        self.assertEqual(0, p.active_sockets)
+        self.assertTrue(p._socket_semaphore.acquire(False))
+
+    def test_lifo(self):
+        p = self.get_pool(max_idle_time=60)
+        s1, s2, s3 = [p.get_socket() for _ in range(3)]
+        for sock_info in (s1, s2, s3):
+            p.maybe_return_socket(sock_info)
+
+        # The most recently used socket is reused.
+        for _ in range(3):
+            sock_info = p.get_socket()
+            self.assertEqual(s3, sock_info)
+            p.maybe_return_socket(sock_info)
+
+        # So the least recently used ones are reaped first.
+        s1.last_checkin -= 120
+        p.maintain()
+        self.assertEqual([s2, s3], list(p.sockets))
+        self.assertTrue(s1.closed)
+
+    def test_max_idle_time(self):
+        p = self.get_pool(max_idle_time=0.5)
+        s1 = p.get_socket()
+        s2 = p.get_socket()
+        p.maybe_return_socket(s1)
+        p.maybe_return_socket(s2)
+        self.assertEqual(2, len(p.sockets))
+        s1.last_checkin -= 1
+
+        # The stale socket is closed instead of being checked out.
+        socks = [p.get_socket(), p.get_socket()]
+        self.assertEqual(s2, socks[0])
+        self.assertFalse(s1 in socks)
+        self.assertTrue(s1.closed)
+        for sock_info in socks:
+            p.maybe_return_socket(sock_info)
+
+        for sock_info in p.sockets:
+            sock_info.last_checkin -= 1
+        p.maintain()
+        self.assertEqual(0, len(p.sockets))
+        self.assertTrue(s2.closed)
+
+
+    def test_sweep(self):
+        p = self.get_pool(max_idle_time=60)
+        s1 = p.get_socket()
+        s2 = p.get_socket()
+        peers = [self.listener.accept()[0] for _ in range(2)]
+        for peer in peers:
+            if peer.getpeername() == s1.sock.getsockname():
+                peer.close()
+        p.maybe_return_socket(s1)
+        p.maybe_return_socket(s2)
+
+        p.maintain()
+        self.assertEqual([s2], list(p.sockets))
+        self.assertTrue(s1.closed)
+
+    def test_closed_high_fd(self):
+        # select() fails for file descriptors above FD_SETSIZE.
+        try:
+            import resource
+            if resource.getrlimit(resource.RLIMIT_NOFILE)[0] <= 4096:
+                raise SkipTest("Can't open file descriptors above 4096")
+        except ImportError:
+            raise SkipTest("No resource module")
+
+        sock = socket.socket()
+        sock.connect(self.pair)
+        os.dup2(sock.fileno(), 4096)
+
+        class HighFd(object):
+            def fileno(self):
+                return 4096
+
+        try:
+            self.assertFalse(pool._closed(HighFd()))
+        finally:
+            os.close(4096)
+            sock.close()
+        self.assertTrue(pool._closed(HighFd()))
+
+
+class EventRecorder(monitoring.PoolListener):
+    def __init__(self):
+        self.events = []
+
+    def connection_created(self, address, duration):
+        self.events.append(("created", address))
+
+    def connection_closed(self, address, reason):
+        self.events.append(("closed", reason))
+
+    def socket_checked_out(self, address):
+        self.events.append(("out", address))
+
+    def socket_checked_in(self, address):
+        self.events.append(("in", address))
+
+    def wait_queue_timeout(self, address, duration):
+        self.events.append(("timeout", address))
+
+
+class TestPoolEvents(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(50)
+        self.pair = self.listener.getsockname()
+        self.recorder = EventRecorder()
+
+    def tearDown(self):
+        self.listener.close()
+
+    def get_pool(self, max_size=10, **kwargs):
+        return pool.Pool(self.pair, max_size, None, None, False,
+                         thread_util_threading,
+                         listeners=[self.recorder], **kwargs)
+
+    def test_stats(self):
+        p = self.get_pool()
+        s1 = p.get_socket()
+        s2 = p.get_socket()
+        stats = p.get_stats()
+        self.assertEqual(2, stats.checked_out)
+        self.assertEqual(0, stats.idle)
+        self.assertEqual(2, stats.checkouts)
+        self.assertEqual(2, stats.connections_created)
+        self.assertTrue(stats.connect_time >= stats.max_connect_time > 0)
+
+        p.maybe_return_socket(s1)
+        p.maybe_return_socket(s2)
+        stats = p.get_stats()
+        self.assertEqual(0, stats.checked_out)
+        self.assertEqual(2, stats.idle)
+        self.assertEqual(2, stats.checkins)
+
+        p.reset()
+        stats = p.get_stats()
+        self.assertEqual(0, stats.idle)
+        self.assertEqual(2, stats.connections_closed)
+
+    def test_stats_request_socket_reconnect(self):
+        p = self.get_pool()
+        p.start_request()
+        s1 = p.get_socket()
+        s1.close()
+        p.maybe_return_socket(s1)
+        s2 = p.get_socket()
+        stats = p.get_stats()
+        self.assertEqual(1, stats.checked_out)
+        self.assertEqual(2, stats.checkouts)
+        self.assertEqual(1, stats.checkins)
+
+        p.maybe_return_socket(s2)
+        p.end_request()
+        stats = p.get_stats()
+        self.assertEqual(0, stats.checked_out)
+        self.assertEqual(1, stats.idle)
+        self.assertEqual(2, stats.checkouts)
+        self.assertEqual(2, stats.checkins)
+        self.assertEqual(["out", "in", "out", "in"],
+                         [e[0] for e in self.recorder.events
+                          if e[0] in ("out", "in")])
+
+    def test_events(self):
+        p = self.get_pool(max_idle_time=60)
+        sock_info = p.get_socket()
+        p.maybe_return_socket(sock_info)
+        sock_info.last_checkin -= 120
+        p.maintain()
+        self.assertEqual([("created", self.pair),
+                          ("out", self.pair),
+                          ("in", self.pair),
+                          ("closed", "idle")], self.recorder.events)
+
+        # Closing twice is one event.
+        sock_info.close()
+        self.assertEqual(4, len(self.recorder.events))
+
+    def test_close_reasons(self):
+        p = self.get_pool(max_size=1)
+        s1 = p.get_socket()
+        # Not counted in max_size.
+        s2 = p.get_socket(force=True)
+        p.maybe_return_socket(s1)
+        p.maybe_return_socket(s2)
+        p.get_socket().close()
+        p.reset()
+        self.assertEqual([("closed", "full"), ("closed", "error")],
+                         [e for e in self.recorder.events
+                          if e[0] == "closed"])
+
+    def test_wait_queue_timeout(self):
+        p = self.get_pool(max_size=1, wait_queue_timeout=0.1)
+        sock_info = p.get_socket()
+        self.assertRaises(socket.timeout, p.get_socket)
+        self.assertEqual(("timeout", self.pair), self.recorder.events[-1])
+        stats = p.get_stats()
+        self.assertEqual(1, stats.wait_queue_timeouts)
+        self.assertEqual(0, stats.waiting)
+        p.maybe_return_socket(sock_info)
+
+    def test_listener_errors_ignored(self):
+        class Broken(monitoring.PoolListener):
+            def socket_checked_out(self, address):
+                raise ZeroDivisionError()
+
+        p = pool.Pool(self.pair, 10, None, None, False,
+                      thread_util_threading, listeners=[Broken()])
+        p.maybe_return_socket(p.get_socket())
+        self.assertEqual(1, p.get_stats().checkins)
+
+    def test_register(self):
+        self.assertRaises(TypeError, monitoring.register, object())
+        monitoring.register(self.recorder)
+        try:
+            p = pool.Pool(self.pair, 10, None, None, False,
+                          thread_util_threading)
+            p.maybe_return_socket(p.get_socket())
+        finally:
+            monitoring._LISTENERS.remove(self.recorder)
+        self.assertEqual(3, len(self.recorder.events))
+
+
 if __name__ == "__main__":
     unittest.main()
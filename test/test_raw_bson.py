@@ -0,0 +1,133 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the raw_bson module."""
+
+import datetime
+import sys
+import unittest
+sys.path[0:0] = [""]
+
+import bson
+from bson import BSON, decode_all
+from bson.dbref import DBRef
+from bson.errors import InvalidBSON
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from bson.son import SON
+from bson.tz_util import utc
+
+
+class TestRawBSONDocument(unittest.TestCase):
+
+    def setUp(self):
+        self.oid = ObjectId()
+        self.document = SON([("_id", self.oid),
+                             ("name", u"Sherlock"),
+                             ("address", SON([("street", u"Baker"),
+                                              ("number", 221)])),
+                             ("friends", [{"name": u"Watson"}]),
+                             ("ref", DBRef("coll", 1))])
+        self.bson_string = BSON.encode(self.document)
+
+    def test_decode(self):
+        doc = BSON(self.bson_string).decode(as_class=RawBSONDocument)
+        self.assertTrue(isinstance(doc, RawBSONDocument))
+        self.assertEqual(self.bson_string, doc.raw)
+        self.assertEqual(self.oid, doc["_id"])
+        self.assertEqual(u"Sherlock", doc["name"])
+        self.assertEqual(u"Sherlock", doc.get("name"))
+        self.assertEqual(None, doc.get("missing"))
+        self.assertTrue("name" in doc)
+        self.assertFalse("missing" in doc)
+        self.assertRaises(KeyError, lambda: doc["missing"])
+        self.assertEqual(5, len(doc))
+        self.assertEqual(["_id", "name", "address", "friends", "ref"],
+                         list(doc))
+
+    def test_decode_all(self):
+        docs = decode_all(self.bson_string * 3, RawBSONDocument)
+        self.assertEqual(3, len(docs))
+        for doc in docs:
+            self.assertTrue(isinstance(doc, RawBSONDocument))
+            self.assertEqual(self.bson_string, doc.raw)
+
+    def test_embedded_documents_stay_raw(self):
+        doc = RawBSONDocument(self.bson_string)
+        address = doc["address"]
+        self.assertTrue(isinstance(address, RawBSONDocument))
+        self.assertEqual(221, address["number"])
+        self.assertTrue(isinstance(doc["friends"][0], RawBSONDocument))
+        self.assertEqual(u"Watson", doc["friends"][0]["name"])
+        # DBRefs aren't recognized inside a RawBSONDocument.
+        self.assertTrue(isinstance(doc["ref"], RawBSONDocument))
+        self.assertEqual({"$ref": "coll", "$id": 1}, doc["ref"].to_dict())
+
+    def test_to_dict(self):
+        doc = RawBSONDocument(self.bson_string)
+        expected = {"_id": self.oid,
+                    "name": u"Sherlock",
+                    "address": {"street": u"Baker", "number": 221},
+                    "friends": [{"name": u"Watson"}],
+                    "ref": {"$ref": u"coll", "$id": 1}}
+        self.assertEqual(expected, doc.to_dict())
+        self.assertTrue(isinstance(doc.to_dict()["address"], dict))
+
+        simple = {"_id": self.oid, "name": u"Sherlock"}
+        self.assertEqual(simple, RawBSONDocument(BSON.encode(simple)))
+
+    def test_equality(self):
+        doc = RawBSONDocument(self.bson_string)
+        self.assertEqual(doc, RawBSONDocument(self.bson_string))
+        self.assertNotEqual(doc, RawBSONDocument(BSON.encode({})))
+        self.assertNotEqual(doc, {})
+
+    def test_encode_does_not_reencode(self):
+        # Key checking is skipped for raw documents; the bytes are copied.
+        raw = BSON.encode({"$bad.key": 1})
+        doc = RawBSONDocument(raw)
+        self.assertEqual(raw, BSON.encode(doc, check_keys=True))
+        self.assertEqual(raw, bson._dict_to_bson(doc, True, 3))
+
+        outer = BSON.encode({"inner": doc})
+        self.assertEqual({"inner": {"$bad.key": 1}}, BSON(outer).decode())
+
+    def test_tz_aware(self):
+        now = datetime.datetime(2013, 1, 1, 12, 30, tzinfo=utc)
+        raw = BSON.encode({"date": now})
+        self.assertEqual(now, decode_all(raw, RawBSONDocument, True)[0]["date"])
+        naive = decode_all(raw, RawBSONDocument, False)[0]["date"]
+        self.assertEqual(None, naive.tzinfo)
+
+    def test_immutable(self):
+        doc = RawBSONDocument(self.bson_string)
+
+        def set_item():
+            doc["name"] = u"Mycroft"
+        self.assertRaises(TypeError, set_item)
+
+    def test_invalid_bson(self):
+        doc = RawBSONDocument(self.bson_string[:-1])
+        self.assertRaises(InvalidBSON, lambda: doc["name"])
+
+    def test_pure_python_inflation(self):
+        doc = RawBSONDocument(self.bson_string)
+        inflated = bson._elements_to_dict(self.bson_string[4:-1],
+                                          RawBSONDocument, False, 3)
+        self.assertEqual(dict(doc.items()), inflated)
+        self.assertTrue(isinstance(inflated["address"], RawBSONDocument))
+
+
+if __name__ == "__main__":
+    unittest.main()
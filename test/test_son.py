@@ -113,6 +113,57 @@ class TestSON(unittest.TestCase):
         son_2_1_1 = pickle.loads(pickled_with_2_1_1)
         self.assertEqual(son_2_1_1, SON([]))
 
+    def test_pickle_items_backwards_compatibility(self):
+        # Pickled with protocols 0 and 2 before SON was an OrderedDict.
+        pickles = [
+            b("ccopy_reg\n_reconstructor\np0\n(cbson.son\nSON\np1\n"
+              "c__builtin__\ndict\np2\n(dp3\nS'a'\np4\nI2\nsS'b'\np5\n"
+              "I1\nstp6\nRp7\n(dp8\nS'_SON__keys'\np9\n(lp10\ng5\n"
+              "ag4\nasb."),
+            b("\x80\x02cbson.son\nSON\nq\x00)\x81q\x01(U\x01bq\x02K\x01"
+              "U\x01aq\x03K\x02u}q\x04U\n_SON__keysq\x05]q\x06(h\x02h\x03"
+              "esb."),
+        ]
+        for pkl in pickles:
+            son = pickle.loads(pkl)
+            self.assertEqual(SON([("b", 1), ("a", 2)]), son)
+            son["c"] = 3
+            del son["b"]
+            self.assertEqual([("a", 2), ("c", 3)], list(son.items()))
+
+    def test_pickle_reflexive(self):
+        son = SON([("a", 1)])
+        son["self"] = son
+        for protocol in xrange(pickle.HIGHEST_PROTOCOL + 1):
+            pickled = pickle.loads(pickle.dumps(son, protocol=protocol))
+            self.assertEqual(["a", "self"], list(pickled.keys()))
+            self.assertTrue(pickled["self"] is pickled)
+
+    def test_delete(self):
+        son = SON([("a", 1), ("b", 2), ("c", 3), ("d", 4)])
+        del son["b"]
+        self.assertEqual(["a", "c", "d"], list(son.keys()))
+        self.assertEqual(3, son.pop("c"))
+        self.assertEqual(None, son.pop("c", None))
+        self.assertRaises(KeyError, son.pop, "c")
+        son["b"] = 5
+        self.assertEqual([("a", 1), ("d", 4), ("b", 5)], list(son.items()))
+
+        # popitem removes the first item unless last is True.
+        self.assertEqual(("a", 1), son.popitem())
+        self.assertEqual(("b", 5), son.popitem(last=True))
+        self.assertEqual(SON([("d", 4)]), son)
+        son.clear()
+        self.assertRaises(KeyError, son.popitem)
+        self.assertEqual("SON([])", repr(son))
+
+        son.setdefault("x", 1)
+        son.setdefault("x", 2)
+        son.update([("y", 3)], z=4)
+        self.assertEqual("SON([('x', 1), ('y', 3), ('z', 4)])", repr(son))
+        self.assertTrue("y" in son)
+        self.assertFalse("w" in son)
+
     def test_copying(self):
         simple_son = SON([])
         complex_son = SON([('son', simple_son),
@@ -234,5 +234,23 @@ class TestCounter(unittest.TestCase):
 
         self._test_counter(True)
 
+
+class TestSpawn(unittest.TestCase):
+
+    def test_spawn(self):
+        from pymongo import thread_util_threading
+
+        class NoSpawn(object):
+            """A thread support module from the application, without
+            spawn."""
+
+        for module in (thread_util_threading, NoSpawn()):
+            done = []
+            thread = thread_util.spawn(module, done.append, 1)
+            thread.join()
+            self.assertEqual([1], done)
+            self.assertTrue(thread.isDaemon())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -21,6 +21,7 @@ import copy
 import pickle
 sys.path[0:0] = [""]
 
+from bson.py3compat import b
 from bson.timestamp import Timestamp
 from bson.tz_util import utc
 
@@ -54,6 +55,25 @@ class TestTimestamp(unittest.TestCase):
             dp = pickle.loads(pkl)
             self.assertEqual(dp, t.as_datetime())
 
+    def test_pickling(self):
+        t = Timestamp(1273017600, 7)
+        for protocol in [0, 1, 2, -1]:
+            self.assertEqual(t, pickle.loads(pickle.dumps(t, protocol)))
+
+        # Pickled with protocols 0 and 2 before Timestamp had __slots__.
+        pickles = [
+            b("ccopy_reg\n_reconstructor\np0\n(cbson.timestamp\n"
+              "Timestamp\np1\nc__builtin__\nobject\np2\nNtp3\nRp4\n"
+              "(dp5\nS'_Timestamp__time'\np6\nI1273017600\n"
+              "sS'_Timestamp__inc'\np7\nI7\nsb."),
+            b("\x80\x02cbson.timestamp\nTimestamp\nq\x00)\x81q\x01}q\x02("
+              "U\x10_Timestamp__timeq\x03J\x00\xb5\xe0K"
+              "U\x0f_Timestamp__incq\x04K\x07ub."),
+        ]
+        for pkl in pickles:
+            self.assertEqual(t, pickle.loads(pkl))
+        self.assertFalse(hasattr(t, '__dict__'))
+
     def test_exceptions(self):
         self.assertRaises(TypeError, Timestamp)
         self.assertRaises(TypeError, Timestamp, None, 123)
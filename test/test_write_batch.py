@@ -0,0 +1,140 @@
+# Copyright 2013 10gen, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the write_batch module."""
+
+import sys
+import unittest
+sys.path[0:0] = [""]
+
+from pymongo.errors import (DuplicateKeyError,
+                            InvalidOperation,
+                            OperationFailure)
+from pymongo.mongo_client import MongoClient
+
+
+class RecordingClient(MongoClient):
+    """A client that records the messages it is asked to pipeline."""
+
+    def __init__(self, fail_on=(), **kwargs):
+        super(RecordingClient, self).__init__(_connect=False, **kwargs)
+        self.fail_on = fail_on
+        self.calls = []
+
+    def _send_messages(self, messages):
+        self.calls.append(messages)
+        results = []
+        for i, (_, with_last_error) in enumerate(messages):
+            if not with_last_error:
+                results.append(None)
+            elif i in self.fail_on:
+                results.append(DuplicateKeyError("dup %d" % i, 11000))
+            else:
+                results.append({"err": None, "ok": 1})
+        return results
+
+
+class TestWriteBatch(unittest.TestCase):
+
+    def test_pipelined(self):
+        client = RecordingClient()
+        batch = client.db.test.write_batch()
+        batch.insert({"_id": 1})
+        batch.update({"_id": 1}, {"$set": {"a": 1}})
+        batch.remove({"_id": 1})
+        self.assertEqual([], client.calls)
+        batch.flush()
+        self.assertEqual(1, len(client.calls))
+        self.assertEqual([True, True, True],
+                         [safe for _, safe in client.calls[0]])
+
+        # Nothing left to send.
+        batch.flush()
+        self.assertEqual(1, len(client.calls))
+
+    def test_context_manager(self):
+        client = RecordingClient()
+        batch = client.db.test.write_batch()
+        try:
+            batch.__enter__()
+            for i in range(100):
+                batch.update({"_id": i}, {"$inc": {"n": 1}})
+        finally:
+            batch.__exit__(None, None, None)
+        self.assertEqual(1, len(client.calls))
+        self.assertEqual(100, len(client.calls[0]))
+        self.assertRaises(InvalidOperation, batch.remove)
+
+        # Queued writes are discarded if the block raises.
+        batch = client.db.test.write_batch()
+        batch.__enter__()
+        batch.remove({"_id": 1})
+        batch.__exit__(ValueError, ValueError(), None)
+        self.assertEqual(1, len(client.calls))
+
+    def test_first_error(self):
+        client = RecordingClient(fail_on=(1, 2))
+        batch = client.db.test.write_batch()
+        for i in range(4):
+            batch.update({"_id": i}, {"$inc": {"n": 1}})
+        try:
+            batch.flush()
+        except OperationFailure, e:
+            self.assertEqual("dup 1", str(e))
+        else:
+            self.fail("OperationFailure not raised")
+        self.assertEqual(4, len(client.calls[0]))
+
+    def test_unacknowledged(self):
+        client = RecordingClient(fail_on=(0,))
+        batch = client.db.test.write_batch(w=0)
+        batch.insert([{"_id": 1}, {"_id": 2}])
+        batch.remove({"_id": 1})
+        batch.flush()
+        self.assertEqual([False, False],
+                         [safe for _, safe in client.calls[0]])
+
+    def test_flush_when_full(self):
+        client = RecordingClient()
+        batch = client.db.test.write_batch()
+        big = "x" * (1024 * 1024)
+        n_docs = client.max_message_size // len(big) + 1
+        for _ in range(n_docs):
+            batch.insert({"s": big})
+        self.assertEqual(1, len(client.calls))
+        batch.flush()
+        self.assertEqual(n_docs, sum(map(len, client.calls)))
+
+    def test_error_held_when_full(self):
+        client = RecordingClient(fail_on=(0,))
+        batch = client.db.test.write_batch()
+        batch.remove({"_id": 1})
+        big = "x" * (1024 * 1024)
+        n_docs = client.max_message_size // len(big) + 1
+
+        # The failed remove is sent early, but its error isn't raised
+        # until the flush, and this insert's messages are all still sent.
+        batch.insert([{"s": big} for _ in range(n_docs)],
+                     continue_on_error=True)
+        self.assertEqual(1, len(client.calls))
+        self.assertRaises(DuplicateKeyError, batch.flush)
+        self.assertEqual(2, len(client.calls))
+        self.assertEqual(3, sum(map(len, client.calls)))
+
+        # The error is only raised once.
+        batch.flush()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,21 +12,79 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""MongoDB benchmarking suite."""
+"""MongoDB benchmarking suite.
+
+Micro-benchmarks time BSON encoding and decoding, building wire protocol
+messages, generating ObjectIds and :mod:`bson.json_util` on several
+corpora of documents: flat, deeply nested, wide, large arrays and binary
+heavy. With ``--server`` the suite also times inserts and queries against
+a mongod on localhost. With ``--memory`` it also measures the size of
+ObjectId, DBRef and Timestamp instances.
+
+Usage::
+
+  python tools/benchmark.py [options] [pattern ...]
+
+Only benchmarks whose name contains one of the patterns are run, e.g.
+``python tools/benchmark.py decode/deep``. Options:
+
+  --no-c          use the pure Python implementations of bson and
+                  pymongo.message
+  --compare       run the micro-benchmarks with and without the C
+                  extensions, and show the speedup
+  --json FILE     also write the results as JSON to FILE, "-" for stdout
+  --quick         run shorter trials
+  --server        also run the end-to-end benchmarks against a server
+  --memory        also measure the memory used by BSON type instances
+  --profile       run under cProfile and print the profile
+"""
 
-import time
 import sys
 sys.path[0:0] = [""]
 
-import datetime
+if "--no-c" in sys.argv:
+    # Hide the C extensions before bson and pymongo are imported.
+    sys.modules["bson._cbson"] = None
+    sys.modules["pymongo._cmessage"] = None
+
 import cProfile
+import datetime
+import optparse
+import os
+import subprocess
+import time
+
+try:
+    import json
+except ImportError:
+    try:
+        import simplejson as json
+    except ImportError:
+        json = None
 
-from pymongo import mongo_client
+import bson
+import pymongo
+from bson import BSON, decode_all
+from bson.binary import Binary, OLD_UUID_SUBTYPE
+from bson.dbref import DBRef
+from bson.objectid import ObjectId
+from bson.son import SON
+from bson.timestamp import Timestamp
+from pymongo import message, mongo_client
 from pymongo import ASCENDING
 
+if json is not None:
+    from bson import json_util
+
 trials = 2
 per_trial = 5000
 batch_size = 100
+
+# Each micro-benchmark runs for at least this many seconds per trial, the
+# best of micro_trials is reported.
+min_time = 0.2
+micro_trials = 3
+
 small = {}
 medium = {"integer": 5,
           "number": 5.05,
@@ -52,6 +110,194 @@ large = {"base_url": "http://www.example.com/test-me",
          }
 
 
+def flat_document():
+    """A typical record: a few dozen scalar fields of mixed types."""
+    doc = SON([("_id", ObjectId("51b1f2d7fa5bd84ba3e52d4c"))])
+    for i in range(5):
+        doc["int%d" % i] = i * 1000
+        doc["float%d" % i] = i * 3.14159
+        doc["string%d" % i] = "value number %d of the flat document" % i
+        doc["bool%d" % i] = bool(i % 2)
+        doc["date%d" % i] = datetime.datetime(2013, 6, 7, 12, i)
+        doc["none%d" % i] = None
+    return doc
+
+
+def deep_document(depth=50):
+    """Subdocuments nested `depth` levels deep."""
+    doc = {"leaf": "bottom", "n": depth}
+    for i in range(depth):
+        doc = {"level": i, "name": "level %d" % i, "child": doc}
+    return doc
+
+
+def wide_document(width=1000):
+    """One level with `width` keys."""
+    return dict([("field%04d" % i, i) for i in range(width)])
+
+
+def array_document(length=10000):
+    """Large arrays of numbers, strings and subdocuments."""
+    return {"numbers": range(length),
+            "strings": ["item %d" % i for i in range(length / 10)],
+            "points": [{"x": i, "y": i * 2.0} for i in range(length / 10)]}
+
+
+def binary_document(count=8, size=64 * 1024):
+    """A few large binary fields."""
+    blob = "".join([chr(i % 256) for i in range(size)])
+    return {"name": "attachments",
+            "blobs": [Binary(blob) for _ in range(count)]}
+
+
+CORPORA = [
+    ("flat", flat_document),
+    ("deep", deep_document),
+    ("wide", wide_document),
+    ("array", array_document),
+    ("binary", binary_document),
+]
+
+
+def micro_benchmarks():
+    """Yield a ``(name, function, ops_per_call)`` triple for each
+    micro-benchmark. `function` takes no arguments and does `ops_per_call`
+    operations.
+    """
+    yield ("objectid", ObjectId, 1)
+    for corpus, make_document in CORPORA:
+        doc = make_document()
+        encoded = BSON.encode(doc)
+        # Enough documents to make about a megabyte.
+        batch = max(1, (1024 * 1024) / len(encoded))
+        stream = encoded * batch
+        docs = [doc] * batch
+
+        def encode(doc=doc):
+            BSON.encode(doc)
+
+        def decode(encoded=BSON(encoded)):
+            encoded.decode()
+
+        def decode_all_docs(stream=stream):
+            decode_all(stream)
+
+        def insert_message(docs=docs):
+            message.insert("benchmark.test", docs, False, False, {}, False,
+                           OLD_UUID_SUBTYPE)
+
+        def query_message(doc=doc):
+            message.query(0, "benchmark.test", 0, 0, doc)
+
+        yield ("encode/%s" % corpus, encode, 1)
+        yield ("decode/%s" % corpus, decode, 1)
+        yield ("decode_all/%s" % corpus, decode_all_docs, batch)
+        yield ("message.insert/%s" % corpus, insert_message, batch)
+        yield ("message.query/%s" % corpus, query_message, 1)
+
+        # json_util can't dump Binary under Python 2, where it's a str.
+        if json is not None and corpus != "binary":
+            dumped = json.dumps(doc, default=json_util.default)
+
+            def dumps(doc=doc):
+                json.dumps(doc, default=json_util.default)
+
+            def loads(dumped=dumped):
+                json.loads(dumped, object_hook=json_util.object_hook)
+
+            yield ("json_util.dumps/%s" % corpus, dumps, 1)
+            yield ("json_util.loads/%s" % corpus, loads, 1)
+
+
+def time_micro(function, ops_per_call):
+    """Get the best rate, in operations per second, of running `function`
+    repeatedly for `min_time` seconds, `micro_trials` times.
+    """
+    # Find how many calls take long enough to time reliably.
+    calls = 1
+    while True:
+        start = time.time()
+        for _ in xrange(calls):
+            function()
+        elapsed = time.time() - start
+        if elapsed >= min_time / 10:
+            break
+        calls *= 10
+    calls = max(1, int(calls * min_time / max(elapsed, 1e-9)))
+
+    best = None
+    for _ in range(micro_trials):
+        start = time.time()
+        for _ in xrange(calls):
+            function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return calls * ops_per_call / max(best, 1e-9)
+
+
+def run_micro(patterns):
+    results = []
+    for name, function, ops_per_call in micro_benchmarks():
+        if not selected(name, patterns):
+            continue
+        rate = time_micro(function, ops_per_call)
+        print "%s%12.0f ops/s" % (name + (48 - len(name)) * ".", rate)
+        sys.stdout.flush()
+        results.append({"name": name, "ops_per_sec": rate,
+                        "c_extensions": bson.has_c()})
+    return results
+
+
+class Unslotted(object):
+    """An object that keeps its attributes in a __dict__, like ObjectId,
+    DBRef and Timestamp did before they defined __slots__.
+    """
+
+
+def instance_size(obj):
+    """The size in bytes of `obj` and its __dict__, not counting the
+    attribute values, which are the same with or without __slots__.
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def memory_benchmarks():
+    """Yield a ``(name, instance, attributes)`` triple for each memory
+    benchmark, where `attributes` are the instance's private attributes.
+    """
+    oid = ObjectId()
+    yield ("memory/ObjectId", oid, {"_ObjectId__id": oid.binary})
+    dbref = DBRef("collection", oid)
+    yield ("memory/DBRef", dbref, dbref.__getstate__())
+    timestamp = Timestamp(int(time.time()), 1)
+    yield ("memory/Timestamp", timestamp, timestamp.__getstate__())
+
+
+def run_memory(patterns):
+    if not hasattr(sys, "getsizeof"):
+        print "measuring memory needs Python 2.6 or later"
+        return []
+    results = []
+    for name, instance, attributes in memory_benchmarks():
+        if not selected(name, patterns):
+            continue
+        size = instance_size(instance)
+        unslotted = Unslotted()
+        unslotted.__dict__.update(attributes)
+        dict_size = instance_size(unslotted)
+        print ("%s%6d bytes, %6d with a __dict__ (%.1fx), "
+               "%4d MB per million" % (
+                   name + (48 - len(name)) * ".", size, dict_size,
+                   float(dict_size) / size, size * 1000000 / (1024 * 1024)))
+        results.append({"name": name, "bytes": size,
+                        "dict_bytes": dict_size})
+    return results
+
+
 def setup_insert(db, collection, object):
     db.drop_collection(collection)
 
@@ -89,77 +335,154 @@ def timed(name, function, args=[], setup=None):
         times.append(time.time() - start)
     best_time = min(times)
     print "%s%d" % (name + (60 - len(name)) * ".", per_trial / best_time)
-    return best_time
+    return {"name": name, "ops_per_sec": per_trial / best_time,
+            "c_extensions": bson.has_c()}
 
 
-def main():
+def server_benchmarks():
+    """Yield ``(name, function, args, setup)`` for each end-to-end
+    benchmark, in the order they must run.
+    """
+    for size in ("small", "medium", "large"):
+        yield ("insert (%s, no index)" % size, insert,
+               [size + "_none", globals()[size]], setup_insert)
+    for size in ("small", "medium", "large"):
+        yield ("insert (%s, indexed)" % size, insert,
+               [size + "_index", globals()[size]], None)
+    for size in ("small", "medium", "large"):
+        yield ("batch insert (%s, no index)" % size, insert_batch,
+               [size + "_bulk", globals()[size]], setup_insert)
+    for operation, function in (("find_one", find_one), ("find", find)):
+        for index in ("no index", "indexed"):
+            suffix = {"no index": "_none", "indexed": "_index"}[index]
+            for size in ("small", "medium", "large"):
+                yield ("%s (%s, %s)" % (operation, size, index), function,
+                       [size + suffix, per_trial / 2], None)
+    for size in ("small", "medium", "large"):
+        yield ("find range (%s, indexed)" % size, find,
+               [size + "_index",
+                {"$gt": per_trial / 2, "$lt": per_trial / 2 + batch_size}],
+               None)
+
+
+def run_server(patterns):
     c = mongo_client.MongoClient(connectTimeoutMS=60*1000)  # jack up timeout
     c.drop_database("benchmark")
     db = c.benchmark
+    for size in ("small", "medium", "large"):
+        db[size + "_index"].create_index("x", ASCENDING)
+
+    results = []
+    for name, function, args, setup in server_benchmarks():
+        if selected(name, patterns):
+            results.append(timed(name, function, [db] + args, setup))
+    c.drop_database("benchmark")
+    return results
+
+
+def selected(name, patterns):
+    if not patterns:
+        return True
+    for pattern in patterns:
+        if pattern in name:
+            return True
+    return False
+
+
+def compare(options, patterns):
+    """Run the micro-benchmarks in a child process without the C
+    extensions, then in this one with them.
+    """
+    if not (bson.has_c() and pymongo.has_c()):
+        sys.exit("the C extensions aren't available, there's nothing to "
+                 "compare")
+    if json is None:
+        sys.exit("--compare needs the json or simplejson module")
+    args = [sys.executable, os.path.abspath(__file__), "--no-c",
+            "--json", "-"]
+    if options.quick:
+        args.append("--quick")
+    print "Pure Python:"
+    sys.stdout.flush()
+    child = subprocess.Popen(args + patterns, stdout=subprocess.PIPE)
+    output = child.communicate()[0]
+    if child.returncode:
+        sys.exit("benchmarking without the C extensions failed")
+    python_results = json.loads(output.splitlines()[-1])
+
+    print "C extensions:"
+    c_results = run_micro(patterns)
+
+    print
+    print "%-48s%14s%14s%9s" % ("", "python", "c", "speedup")
+    rates = dict([(result["name"], result["ops_per_sec"])
+                  for result in python_results])
+    for result in c_results:
+        python_rate = rates.get(result["name"])
+        if python_rate:
+            print "%-48s%14.0f%14.0f%8.1fx" % (
+                result["name"], python_rate, result["ops_per_sec"],
+                result["ops_per_sec"] / python_rate)
+    return python_results + c_results
+
+
+def main():
+    global min_time, micro_trials, trials, per_trial
+
+    parser = optparse.OptionParser(usage="%prog [options] [pattern ...]")
+    parser.add_option("--no-c", action="store_true", default=False,
+                      help="use the pure Python implementations")
+    parser.add_option("--compare", action="store_true", default=False,
+                      help="compare the C and pure Python implementations")
+    parser.add_option("--json", metavar="FILE",
+                      help='write the results as JSON to FILE, "-" for stdout')
+    parser.add_option("--quick", action="store_true", default=False,
+                      help="run shorter trials")
+    parser.add_option("--server", action="store_true", default=False,
+                      help="also run end-to-end benchmarks against mongod")
+    parser.add_option("--memory", action="store_true", default=False,
+                      help="also measure the memory used by BSON types")
+    parser.add_option("--profile", action="store_true", default=False,
+                      help="run under cProfile")
+    options, patterns = parser.parse_args()
+
+    if options.quick:
+        min_time = 0.02
+        micro_trials = 1
+        trials = 1
+        per_trial = 500
+    if options.json and json is None:
+        parser.error("--json needs the json or simplejson module")
+
+    stdout = sys.stdout
+    if options.json == "-":
+        # Keep stdout for the results.
+        sys.stdout = sys.stderr
+
+    if options.compare:
+        results = compare(options, patterns)
+    elif options.profile:
+        profile = cProfile.Profile()
+        results = profile.runcall(run_micro, patterns)
+        profile.print_stats("cumulative")
+    else:
+        results = run_micro(patterns)
+    if options.memory:
+        results.extend(run_memory(patterns))
+    if options.server:
+        results.extend(run_server(patterns))
 
-    timed("insert (small, no index)", insert,
-          [db, 'small_none', small], setup_insert)
-    timed("insert (medium, no index)", insert,
-          [db, 'medium_none', medium], setup_insert)
-    timed("insert (large, no index)", insert,
-          [db, 'large_none', large], setup_insert)
-
-    db.small_index.create_index("x", ASCENDING)
-    timed("insert (small, indexed)", insert, [db, 'small_index', small])
-    db.medium_index.create_index("x", ASCENDING)
-    timed("insert (medium, indexed)", insert, [db, 'medium_index', medium])
-    db.large_index.create_index("x", ASCENDING)
-    timed("insert (large, indexed)", insert, [db, 'large_index', large])
-
-    timed("batch insert (small, no index)", insert_batch,
-          [db, 'small_bulk', small], setup_insert)
-    timed("batch insert (medium, no index)", insert_batch,
-          [db, 'medium_bulk', medium], setup_insert)
-    timed("batch insert (large, no index)", insert_batch,
-          [db, 'large_bulk', large], setup_insert)
-
-    timed("find_one (small, no index)", find_one,
-          [db, 'small_none', per_trial / 2])
-    timed("find_one (medium, no index)", find_one,
-          [db, 'medium_none', per_trial / 2])
-    timed("find_one (large, no index)", find_one,
-          [db, 'large_none', per_trial / 2])
-
-    timed("find_one (small, indexed)", find_one,
-          [db, 'small_index', per_trial / 2])
-    timed("find_one (medium, indexed)", find_one,
-          [db, 'medium_index', per_trial / 2])
-    timed("find_one (large, indexed)", find_one,
-          [db, 'large_index', per_trial / 2])
-
-    timed("find (small, no index)", find, [db, 'small_none', per_trial / 2])
-    timed("find (medium, no index)", find, [db, 'medium_none', per_trial / 2])
-    timed("find (large, no index)", find, [db, 'large_none', per_trial / 2])
-
-    timed("find (small, indexed)", find, [db, 'small_index', per_trial / 2])
-    timed("find (medium, indexed)", find, [db, 'medium_index', per_trial / 2])
-    timed("find (large, indexed)", find, [db, 'large_index', per_trial / 2])
-
-#     timed("find range (small, no index)", find,
-#           [db, 'small_none',
-#            {"$gt": per_trial / 4, "$lt": 3 * per_trial / 4}])
-#     timed("find range (medium, no index)", find,
-#           [db, 'medium_none',
-#            {"$gt": per_trial / 4, "$lt": 3 * per_trial / 4}])
-#     timed("find range (large, no index)", find,
-#           [db, 'large_none',
-#            {"$gt": per_trial / 4, "$lt": 3 * per_trial / 4}])
-
-    timed("find range (small, indexed)", find,
-          [db, 'small_index',
-           {"$gt": per_trial / 2, "$lt": per_trial / 2 + batch_size}])
-    timed("find range (medium, indexed)", find,
-          [db, 'medium_index',
-           {"$gt": per_trial / 2, "$lt": per_trial / 2 + batch_size}])
-    timed("find range (large, indexed)", find,
-          [db, 'large_index',
-           {"$gt": per_trial / 2, "$lt": per_trial / 2 + batch_size}])
+    sys.stdout = stdout
+    if options.json:
+        output = json.dumps(results)
+        if options.json == "-":
+            print output
+        else:
+            f = open(options.json, "w")
+            try:
+                f.write(output + "\n")
+            finally:
+                f.close()
 
 if __name__ == "__main__":
-#    cProfile.run("main()")
     main()